@@ -3,16 +3,234 @@
 import logging
 import argparse
 import os
+import stat
 import sys
 import re
-from pathlib import Path
 import datetime
 import json
+import functools
+import concurrent.futures
+import io
+import time
+import hashlib
+import threading
+import queue
+import heapq
+import math
+import base64
+import collections
+import fnmatch
+import itertools
+import socket
 
 
 # global variables
 logger = None
 
+# files bigger than this can be split into byte ranges analyzed in parallel
+MIN_CHUNK_SIZE = 64 * 1024 * 1024
+
+# size of blocks read from log files, memory used for reading a file is bounded by it (and the longest line)
+BLOCK_SIZE = 1024 * 1024
+
+# the automatic engine analyzes files (or byte ranges) at least this big with numpy, it does not pay off for smaller ones
+AUTO_ENGINE_SIZE = 32 * 1024 * 1024
+
+# number of blocks read ahead when decompressing log files
+PREFETCH_DEPTH = 4
+
+# tasks bigger than this are not read ahead with --io-depth, the parsers stream them as usual
+PREFETCH_MAX_SIZE = 8 * 1024 * 1024
+
+# magic bytes at the start of compressed log files
+COMPRESSION_MAGIC = {
+    'gzip': b'\x1f\x8b',
+    'bz2': b'BZh',
+    'xz': b'\xfd7zXZ\x00',
+    'zstd': b'\x28\xb5\x2f\xfd'
+}
+
+# number of bytes at the start of a file used to recognize it in the saved state
+FINGERPRINT_SIZE = 4096
+
+# version of the format of state files
+STATE_VERSION = 4
+
+# version of the format of partial aggregate files written with --partial and combined by the merge command
+PARTIAL_VERSION = 3
+
+# fields of the header of partial aggregates which have to be the same to merge them and their descriptions
+PARTIAL_HEADER = {
+    'engine': 'a different engine',
+    'parser_version': 'a different version of the parsers',
+    'options': 'different options (--exclude-header-sizes or --approx)',
+    'operations': 'different operations'
+}
+
+# version of the parsers and the format of cache entries, entries of other versions are not used
+CACHE_VERSION = 4
+
+# maximum total size of cache entries in bytes, least recently used entries are removed first
+CACHE_MAX_SIZE = 256 * 1024 * 1024
+
+# files smaller than this are analyzed faster than their cache entries are loaded
+CACHE_MIN_SIZE = 1024 * 1024
+
+# version of the format of columnar stores created by the ingest command
+STORE_VERSION = 3
+
+# numeric columns of stores and the indexes of their fields
+STORE_NUMBERS = {
+    'epoch': 0,
+    'headers': 1,
+    'body': 4
+}
+
+# index of the field of client addresses, which are stored as the high and low 64 bits of their packed keys in the
+# columns client_high and client_low (see pack_ip_key()), values that are not IP addresses are kept in a dictionary
+STORE_CLIENT_FIELD = 2
+
+# dictionary-encoded columns of stores and the indexes of their fields
+STORE_DICTIONARIES = {
+    'status': 3,
+    'method': 5,
+    'url': 6,
+    'user': 7,
+    'destination': 8,
+    'mimetype': 9
+}
+
+# seconds between checks of log files when inotify is not available
+POLL_INTERVAL = 1.0
+
+# inotify events of watched directories: IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_MASK = 0x2 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200
+
+# packed IPv4 addresses are IPv4-mapped IPv6 addresses (::ffff:0:0/96)
+IPV4_MAPPED = 0xFFFF << 32
+
+# upper 64 bits of packed keys of values that are not IP addresses (the lower 64 bits are an index into a list of names)
+NAME_KEY = 0xFFFFFFFFFFFFFFFF
+
+# data type of packed IP addresses
+IP_KEY_DTYPE = [('high', '<u8'), ('low', '<u8')]
+
+# number of distinct IP addresses counted in dicts or in tables of blocks before they are merged into the table of a file
+IP_BATCH = 65536
+
+# allowed error of approximate counts of IP addresses as a fraction of all events
+APPROX_ERROR = 0.0001
+
+# fields of log lines whose distinct values can be counted and their indexes
+DISTINCT_FIELDS = {
+    'client': 2,
+    'url': 6,
+    'destination': 8
+}
+
+# fields of log lines which events can be grouped by and their indexes, hosts are extracted from URLs and destinations
+# and cache results from statuses (see GROUP_EXTRACTORS)
+GROUP_FIELDS = {
+    'client': 2,
+    'status': 3,
+    'method': 5,
+    'url': 6,
+    'user': 7,
+    'destination': 8,
+    'mimetype': 9,
+    'domain': 6,
+    'destination_host': 8,
+    'result': 3
+}
+
+# maximum number of memoized hosts of URLs and destinations
+HOST_CACHE_SIZE = 262144
+
+# columns accumulated by groupings of traffic by hosts (--top-domains and --top-destinations)
+TRAFFIC_COLUMNS = [['count', None], ['sum', 'bytes']]
+
+# columns accumulated by the grouping of cache results (--percentiles), histograms of elapsed times and body sizes
+PERCENTILE_COLUMNS = [['count', None], ['hist', 'elapsed'], ['hist', 'body']]
+
+# percentiles reported by --percentiles
+PERCENTILES = [0.5, 0.9, 0.99]
+
+# significant bits of values counted by histograms, buckets are at most 2^-(precision - 1) of their values wide
+# and a histogram of values below 2^32 has at most (34 - precision) * 2^(precision - 1) buckets
+HISTOGRAM_PRECISION = 8
+
+# numeric fields which can be aggregated, bytes are the sum of headers and body, elapsed is the same field as headers
+# (Squid's native format logs the elapsed milliseconds there)
+AGGREGATE_FIELDS = ['headers', 'body', 'bytes', 'elapsed']
+
+# functions aggregating numeric fields of groups, count only counts their events
+AGGREGATE_FUNCTIONS = ['count', 'sum', 'min', 'max', 'avg']
+
+# default precision of HyperLogLog sketches, they use 2^precision bytes and have a standard error of 1.04 / sqrt(2^precision)
+HLL_PRECISION = 12
+
+# number of distinct values collected before they are hashed and added to a HyperLogLog sketch
+DISTINCT_BATCH = 65536
+
+# units of time series resolutions in seconds
+RESOLUTION_UNITS = {
+    's': 1,
+    'm': 60,
+    'h': 3600,
+    'd': 86400
+}
+
+# log lines are written in the order of time, but can be this many seconds out of order
+TIME_SLACK = 60
+
+# binary search of log files by time stops when the searched range is smaller than this
+TIME_SEARCH_GRANULARITY = 64 * 1024
+
+# number of rows read at once by the pandas parser
+PANDAS_CHUNK_ROWS = 250000
+
+# names of the fields of a log line
+LOG_COLUMNS = ['Timestamp', 'Headers size', 'Source IP address', 'Response code', 'Body size', 'Request method', 'URL', 'Username', 'Destination IP address', 'Mimetype']
+
+# data types of the fields used by the pandas parser
+LOG_COLUMN_DTYPES = {
+    'Timestamp': 'float64',
+    'Headers size': 'float64',
+    'Source IP address': 'object',
+    'Body size': 'float64'
+}
+
+# operations of an analysis and their defaults, operations missing from a dictionary of operations are not analyzed
+DEFAULT_OPERATIONS = {
+    # the most and least frequent IP addresses, the number of events per second and the number of bytes transmitted
+    'mfip': False,
+    'lfip': False,
+    'eps': False,
+    'count_bytes': False,
+    'exclude_header_sizes': False,
+    # numbers of the most and least frequent IP addresses
+    'top': 0,
+    'bottom': 0,
+    # maximum number of IP addresses counted at once, counts are approximate when set
+    'ip_capacity': None,
+    # fields whose distinct values are counted (see DISTINCT_FIELDS) and the precision of their sketches
+    'distinct': [],
+    'hll_precision': HLL_PRECISION,
+    # resolution of the time series of events and bytes in seconds
+    'timeseries': None,
+    # epoch times of the start and the (exclusive) end of the time window
+    'since': None,
+    'until': None,
+    # fields of every grouping of events (see GROUP_FIELDS) and aggregations of every group (see parse_aggregations())
+    'group_by': [],
+    'aggregations': [],
+    # numbers of domains and destinations with the most traffic
+    'top_domains': 0,
+    'top_destinations': 0,
+    # percentiles of elapsed times and body sizes of cache results
+    'percentiles': False
+}
+
 
 def prepare_filters(filters = []):
     """Prepare regex pattern by combining all filters in an or statement.
@@ -40,88 +258,165 @@ def prepare_filters(filters = []):
         sys.exit(1)
 
 
-def get_files_from_paths(paths, recurse = False, pattern_filter = re.compile('.*')):
-    """Get a list of files to process form a list of paths.
+def match_globs(path, patterns):
+    """Check if a path matches any of glob-style patterns.
+
+    Patterns containing a path separator are matched against the whole path, other patterns against the file name.
+
+    Args:
+        path (str): Absolute path.
+        patterns (list): List of glob-style patterns.
+
+    Returns:
+        bool: Whether the path matches.
+    """
+
+    for pattern in patterns:
+        if fnmatch.fnmatch(path if os.sep in pattern else os.path.basename(path), pattern):
+            return True
+
+    return False
+
+
+def iter_files_from_paths(paths, recurse = False, pattern_filter = re.compile('.*'), include = None, exclude = None):
+    """Discover files to process from a list of paths.
+
+    Directories are walked breadth-first with os.scandir() in the order of names and files are yielded as soon
+    as they are found, so they can be analyzed while the rest of the tree is being walked. Files and directories are
+    only visited once, even if they are reached through symlinks (symlink loops are not followed).
 
     Args:
         paths (list): List of paths.
         recurse (bool, optional): Whether to look for files in subdirectories or not. Defaults to False.
         pattern_filter (re.Pattern, optional): RegEx pattern to filter discovered file paths. Defaults to re.compile('.*').
+        include (list, optional): Glob-style patterns of files to process, all files if empty. Defaults to None.
+        exclude (list, optional): Glob-style patterns of files and directories to skip. Defaults to None.
 
-    Returns:
-        list: A list of file paths to process.
+    Yields:
+        str: Absolute paths of files to process.
     """
 
     global logger
-    to_process = []
 
-    # go through all input paths
-    for p in paths:
+    # visited files and directories by their device and inode
+    seen = set()
 
-        # if path is a regular file, add it
-        if os.path.isfile(p):
-            absolute_path = os.path.abspath(p)
+    def accept_file(path, identity):
+        absolute_path = os.path.abspath(path)
 
-            # if a path does not match pattern, skip it
-            if not pattern_filter.search(absolute_path):
-                logger.debug(f'Pattern \'{pattern_filter.pattern}\' does not match \'{absolute_path}\'.')
-                continue
+        # check if the file has already been added
+        if identity in seen:
+            return None
 
-            # check if the file has already been added
-            if absolute_path in to_process:
-                continue
+        # if a path does not match pattern, skip it
+        if not pattern_filter.search(absolute_path):
+            logger.debug(f'Pattern \'{pattern_filter.pattern}\' does not match \'{absolute_path}\'.')
+            return None
 
-            # check if the file can be opened
-            try:
-                with open(absolute_path, 'r') as f:
-                    f.close()
-            except:
-                logger.debug(f'Unable to read file \'{absolute_path}\'!')
-                continue
+        if include and not match_globs(absolute_path, include):
+            logger.debug(f'File \'{absolute_path}\' is not included.')
+            return None
+
+        if exclude and match_globs(absolute_path, exclude):
+            logger.debug(f'File \'{absolute_path}\' is excluded.')
+            return None
 
-            # add file
-            logger.debug(f'Adding file \'{p}\'.')
-            to_process.append(absolute_path)
+        # check if the file can be read
+        if not os.access(absolute_path, os.R_OK):
+            logger.debug(f'Unable to read file \'{absolute_path}\'!')
+            return None
+
+        # only accepted files hide other paths to the same file
+        seen.add(identity)
+
+        logger.debug(f'Adding file \'{path}\'.')
+        return absolute_path
+
+    directories = collections.deque()
+
+    # go through all input paths
+    for p in paths:
+        try:
+            path_stat = os.stat(p)
+        except OSError:
+            logger.debug(f'Unable to access path \'{p}\'!')
             continue
 
-        # if path is a directory, search through it
-        if os.path.isdir(p):
+        # if path is a regular file, add it
+        if stat.S_ISREG(path_stat.st_mode):
+            absolute_path = accept_file(p, (path_stat.st_dev, path_stat.st_ino))
+            if absolute_path:
+                yield absolute_path
+            continue
 
-            # go through paths in directory
-            for pp in os.listdir(p):
-                subpath = os.path.join(p, pp)
+        # if path is a directory, search through it
+        if stat.S_ISDIR(path_stat.st_mode):
+            directories.append(p)
 
-                # process files
-                if os.path.isfile(subpath):
-                    if subpath in paths:
-                        continue
+        # go through the directories found so far, subdirectories are added to the end
+        while directories:
+            directory = directories.popleft()
 
-                    paths.append(subpath)
+            try:
+                directory_stat = os.stat(directory)
+                if (directory_stat.st_dev, directory_stat.st_ino) in seen:
                     continue
+                seen.add((directory_stat.st_dev, directory_stat.st_ino))
 
-                # process directories
-                if os.path.isdir(subpath):
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                logger.debug(f'Unable to access path \'{directory}\'!')
+                continue
 
-                    # skip directory if recursion not allowed
-                    if not recurse:
-                        logger.debug(f'Skipping subdirectory \'{subpath}\'.')
-                        continue
+            for entry in entries:
+                try:
+                    # process directories
+                    if entry.is_dir():
 
-                    # check if the directory has already been added
-                    if subpath in paths:
+                        # skip directory if recursion not allowed
+                        if not recurse:
+                            logger.debug(f'Skipping subdirectory \'{entry.path}\'.')
+                        elif exclude and match_globs(os.path.abspath(entry.path), exclude):
+                            logger.debug(f'Directory \'{entry.path}\' is excluded.')
+                        else:
+                            directories.append(entry.path)
                         continue
 
-                    # also process files in subdirectory recursively
-                    paths.append(subpath)
-                    continue
+                    # process files, the inode of an entry is known without calling stat unless it is a symlink
+                    if entry.is_file():
+                        if entry.is_symlink():
+                            entry_stat = entry.stat()
+                            identity = (entry_stat.st_dev, entry_stat.st_ino)
+                        else:
+                            identity = (directory_stat.st_dev, entry.inode())
+
+                        absolute_path = accept_file(entry.path, identity)
+                        if absolute_path:
+                            yield absolute_path
+                        continue
+                except OSError:
+                    pass
 
                 # if path does not exist, show error
-                logger.debug(f'Unable to access path \'{subpath}\'!')
+                logger.debug(f'Unable to access path \'{entry.path}\'!')
+
+
+def get_files_from_paths(paths, recurse = False, pattern_filter = re.compile('.*'), include = None, exclude = None):
+    """Get a list of files to process form a list of paths.
+
+    Args:
+        paths (list): List of paths.
+        recurse (bool, optional): Whether to look for files in subdirectories or not. Defaults to False.
+        pattern_filter (re.Pattern, optional): RegEx pattern to filter discovered file paths. Defaults to re.compile('.*').
+        include (list, optional): Glob-style patterns of files to process, all files if empty. Defaults to None.
+        exclude (list, optional): Glob-style patterns of files and directories to skip. Defaults to None.
 
-        # if path does not exist, show error
-        logger.debug(f'Unable to access path \'{p}\'!')
+    Returns:
+        list: A list of file paths to process.
+    """
 
-    return to_process
+    return list(iter_files_from_paths(paths, recurse=recurse, pattern_filter=pattern_filter, include=include, exclude=exclude))
 
 
 def prepare_output_file(file_path, force):
@@ -138,6 +433,8 @@ def prepare_output_file(file_path, force):
     if file_path == '-':
         return None
 
+    from pathlib import Path
+
     output_file_path = Path(file_path)
 
     # if the output file is a directory, add /output.json to the path
@@ -170,10 +467,11 @@ def init_argparser():
         argparse.ArgumentParser: Initialized ArgumentParser object.
     """
 
-    parser = argparse.ArgumentParser(description='Squid log analyzer.')
+    parser = argparse.ArgumentParser(description='Squid log analyzer.', epilog='Log files can be converted into a columnar store analyzed faster by repeated runs, see \'%(prog)s ingest --help\'. '
+                                     'Partial aggregates written with --partial on several machines are combined by \'%(prog)s merge\'.')
 
     parser.add_argument('input_paths', metavar='INPUT', type=str, nargs='+',
-                        help='path to log files or a directory containing files')
+                        help='path to log files, a directory containing files or a store created by the ingest command')
     parser.add_argument('output_file', metavar='OUTPUT', type=str,
                         help='path to a JSON output file')
 
@@ -181,12 +479,44 @@ def init_argparser():
                         help='show verbose log output')
     parser.add_argument('--filter', action='append', type=str,
                         help='filter input files based on regex patterns')
+    parser.add_argument('--include', action='append', type=str, metavar='GLOB',
+                        help='only analyze files matching glob-style patterns (like \'access.log*\')')
+    parser.add_argument('--exclude', action='append', type=str, metavar='GLOB',
+                        help='skip files and directories matching glob-style patterns (like \'*.tmp\')')
     parser.add_argument('-r', '--recurse', action='store_true',
                         help='recursively search for files in sub-directories')
     parser.add_argument('-f', '--force', action='store_true',
                         help='overwrite output file if already exists')
     parser.add_argument('--fast', action='store_true',
-                        help='use a fast regex-based analysis')
+                        help='use a fast regex-based analysis (same as --engine regex)')
+    parser.add_argument('--engine', choices=['auto', 'pandas', 'regex', 'split', 'numpy'],
+                        help='engine used to analyze the log files (defaults to auto)')
+    parser.add_argument('--state', type=str, metavar='FILE',
+                        help='keep the analysis state in a file and only analyze data appended since the last run')
+    parser.add_argument('--follow', action='store_true',
+                        help='keep analyzing the log files as they grow and periodically write the results')
+    parser.add_argument('--interval', type=float, default=10,
+                        help='number of seconds between result snapshots in --follow mode')
+    parser.add_argument('--http', type=str, metavar='[HOST:]PORT',
+                        help='serve result snapshots in --follow mode over HTTP')
+    parser.add_argument('--block-size', type=int, default=BLOCK_SIZE,
+                        help='size of blocks read from log files in bytes when using the regex, split or numpy engine')
+    parser.add_argument('--no-mmap', action='store_true',
+                        help='read log files instead of memory-mapping them when using the regex, split or numpy engine')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes to analyze files in parallel (0 = number of CPUs)')
+    parser.add_argument('--io-depth', type=int, default=0, metavar='DEPTH',
+                        help='number of files read ahead concurrently, for logs on network filesystems (0 = disabled)')
+    parser.add_argument('--cache', action='store_true',
+                        help='cache analyzed files, so later runs only analyze new or changed files')
+    parser.add_argument('--cache-dir', type=str, metavar='DIR',
+                        help='directory of the cache of analyzed files, implies --cache (defaults to ~/.cache/squid-log-analyzer)')
+    parser.add_argument('--stats', action='store_true',
+                        help='add a _meta section with statistics of the analysis to the results')
+    parser.add_argument('--profile', type=str, metavar='FILE',
+                        help='profile the analysis with cProfile and write the profile to a file')
+    parser.add_argument('--partial', action='store_true',
+                        help='write a partial aggregate instead of the results, to be combined with others by the merge command')
 
     operations = parser.add_argument_group('operations')
     operations.add_argument('--mfip', action='store_true',
@@ -197,9 +527,93 @@ def init_argparser():
                             help='analyze the number of events per second')
     operations.add_argument('--bytes', action='store_true',
                             help='analyze the total number of bytes exchanged')
+    operations.add_argument('--top', type=int, default=0, metavar='K',
+                            help='analyze the K most frequent IP addresses')
+    operations.add_argument('--bottom', type=int, default=0, metavar='K',
+                            help='analyze the K least frequent IP addresses')
+    operations.add_argument('--distinct', action='append', choices=list(DISTINCT_FIELDS), metavar='FIELD',
+                            help='estimate the number of distinct values of a field (client, url or destination)')
+    operations.add_argument('--timeseries', type=parse_resolution, metavar='RESOLUTION',
+                            help='analyze events and bytes in time buckets (like 1s, 5m or 1h) and the peak events per second')
+    operations.add_argument('--group-by', action='append', type=parse_group_by, metavar='FIELD[,FIELD]',
+                            help=f'aggregate events grouped by fields ({", ".join(GROUP_FIELDS)}), can be used multiple times')
+    operations.add_argument('--top-domains', type=int, default=0, metavar='K',
+                            help='analyze the K domains of requested URLs with the most bytes exchanged')
+    operations.add_argument('--top-destinations', type=int, default=0, metavar='K',
+                            help='analyze the K destination hosts (like parent proxies or origin servers) with the most bytes exchanged')
+    operations.add_argument('--percentiles', action='store_true',
+                            help='analyze percentiles of elapsed times and body sizes of every cache result (like TCP_HIT) and the cache hit ratio')
 
+    parser.add_argument('--since', type=parse_time, metavar='TIME',
+                        help='only analyze events at or after this time (epoch time or ISO 8601, like 2020-01-23T14:00)')
+    parser.add_argument('--until', type=parse_time, metavar='TIME',
+                        help='only analyze events before this time (epoch time or ISO 8601)')
     parser.add_argument('--exclude-header-sizes', action='store_true',
                         help='exclude HTTP header sizes from the number of bytes exchanged')
+    parser.add_argument('--approx', action='store_true',
+                        help='count IP addresses approximately with bounded memory (only --mfip and --top)')
+    parser.add_argument('--approx-error', type=float, default=APPROX_ERROR, metavar='EPSILON',
+                        help='maximum error of approximate counts as a fraction of all events')
+    parser.add_argument('--hll-precision', type=int, default=HLL_PRECISION, metavar='P',
+                        help='precision of the --distinct estimates, sketches use 2^P bytes (4 - 18)')
+    parser.add_argument('--agg', type=parse_aggregations, metavar='AGGREGATIONS',
+                        help='aggregations of every --group-by group, like count,sum(body),avg(bytes) (defaults to count)')
+
+    return parser
+
+
+def init_ingest_argparser():
+    """Initialize the ArgumentParser library to accept commandline options of the ingest command.
+
+    Returns:
+        argparse.ArgumentParser: Initialized ArgumentParser object.
+    """
+
+    parser = argparse.ArgumentParser(prog=f'{os.path.basename(sys.argv[0])} ingest', description='Convert Squid log files into a columnar store, which can be analyzed instead of the log files.')
+
+    parser.add_argument('input_paths', metavar='INPUT', type=str, nargs='+',
+                        help='path to log files or a directory containing files')
+    parser.add_argument('store', metavar='STORE', type=str,
+                        help='path to the store directory, it is created or updated')
+
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='show verbose log output')
+    parser.add_argument('--filter', action='append', type=str,
+                        help='filter input files based on regex patterns')
+    parser.add_argument('--include', action='append', type=str, metavar='GLOB',
+                        help='only ingest files matching glob-style patterns (like \'access.log*\')')
+    parser.add_argument('--exclude', action='append', type=str, metavar='GLOB',
+                        help='skip files and directories matching glob-style patterns (like \'*.tmp\')')
+    parser.add_argument('-r', '--recurse', action='store_true',
+                        help='recursively search for files in sub-directories')
+    parser.add_argument('--block-size', type=int, default=BLOCK_SIZE,
+                        help='size of blocks read from log files in bytes')
+    parser.add_argument('--no-mmap', action='store_true',
+                        help='read log files instead of memory-mapping them')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes to ingest files in parallel (0 = number of CPUs)')
+
+    return parser
+
+
+def init_merge_argparser():
+    """Initialize the ArgumentParser library to accept commandline options of the merge command.
+
+    Returns:
+        argparse.ArgumentParser: Initialized ArgumentParser object.
+    """
+
+    parser = argparse.ArgumentParser(prog=f'{os.path.basename(sys.argv[0])} merge', description='Combine partial aggregates written with --partial into the analysis results.')
+
+    parser.add_argument('partial_files', metavar='PARTIAL', type=str, nargs='+',
+                        help='path to a partial aggregate, they are merged in the given order')
+    parser.add_argument('output_file', metavar='OUTPUT', type=str,
+                        help='path to a JSON output file')
+
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='show verbose log output')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='overwrite output file if already exists')
 
     return parser
 
@@ -220,256 +634,4905 @@ def init_logger(level):
     logger.addHandler(logger_handler)
 
 
-def parse_files_pandas(to_process, mfip = False, lfip = False, eps = False, count_bytes = False, exclude_header_sizes = False):
-    """Parse and analyze files with pandas.
+def new_partial():
+    """Create an empty partial aggregate.
+
+    A partial aggregate holds the analysis state of one file (or a byte range of a file).
+    Partial aggregates can be merged together, so files can be analyzed independently.
+
+    Returns:
+        dict: Empty partial aggregate.
+    """
+
+    return {
+        'events': 0,
+        'lines': 0,
+        'epoch_start': None,
+        'epoch_end': None,
+        'ip_frequencies': None,
+        'bytes_body': 0,
+        'bytes_headers': 0,
+        'distinct': {},
+        'seconds': None,
+        'groups': None
+    }
+
+
+def merge_partials(target, other):
+    """Merge a partial aggregate into another one.
+
+    Partials have to be merged in the order of the analyzed data to keep the order of first occurence of IP addresses.
 
     Args:
-        to_process (list): List of file paths to analyze.
-        mfip (bool, optional): Analyze the most frequent IP addresses. Defaults to False.
-        lfip (bool, optional): Analyze the least frequent IP addresses. Defaults to False.
-        eps (bool, optional): Analyze the number of events and number of events per second. Defaults to False.
-        count_bytes (bool, optional): Count the total number of bytes transmitted. Defaults to False.
-        exclude_header_sizes (bool, optional): Whether to exclude HTTP header sizes. Defaults to False.
+        target (dict): Partial aggregate to merge into. It is modified in place.
+        other (dict): Partial aggregate to be merged.
 
     Returns:
-        dict: Dictionary containing the analysis results.
+        dict: The merged partial aggregate (target).
     """
 
-    import pandas
+    target['events'] += other['events']
+    target['lines'] += other['lines']
+    target['bytes_body'] += other['bytes_body']
+    target['bytes_headers'] += other['bytes_headers']
 
-    all_data = pandas.DataFrame()
-    result = {}
+    # keep the epoch time start and end of all events
+    if other['epoch_start'] is not None:
+        if target['epoch_start'] is None or target['epoch_start'] > other['epoch_start']:
+            target['epoch_start'] = other['epoch_start']
+    if other['epoch_end'] is not None:
+        if target['epoch_end'] is None or target['epoch_end'] < other['epoch_end']:
+            target['epoch_end'] = other['epoch_end']
 
-    # add all data into one dataframe
-    for f in to_process:
-        # read data from log file
-        data = pandas.read_csv(f, delimiter=r'\s+', usecols=range(10), names=['Timestamp', 'Headers size', 'Source IP address', 'Response code', 'Body size', 'Request method', 'URL', 'Username', 'Destination IP address', 'Mimetype'], skip_blank_lines=True)
-        all_data = pandas.concat([all_data, data])
+    # sum the frequencies of IPs
+    target['ip_frequencies'] = merge_ip_frequencies(target['ip_frequencies'], other['ip_frequencies'])
 
-    # if no data has been read - exit
-    if not len(all_data):
-        logger.info('Nothing to do - no data supplied.')
-        sys.exit(0)
+    # merge the sketches of distinct values, the merged partial does not share them with other partials
+    distinct = dict(target['distinct'])
+    for field, registers in other['distinct'].items():
+        distinct[field] = merge_hll(distinct[field], registers) if field in distinct else registers
+    target['distinct'] = distinct
 
-    # count the number of bytes transmitted
-    if count_bytes:
-        headers = 0
+    # sum the events and bytes of every second
+    target['seconds'] = merge_seconds(target['seconds'], other['seconds'])
 
-        # get all body sizes
-        bodies = all_data[all_data['Body size'] > 0]['Body size'].sum()
+    # accumulate the rows of the same groups
+    target['groups'] = merge_groups(target['groups'], other['groups'])
 
-        result['bytes'] = {
-            'body': int(bodies)
-        }
+    # statistics of analyzed tasks are only collected with --stats
+    if 'tasks' in other:
+        target.setdefault('tasks', []).extend(other['tasks'])
 
-        # get all header sizes
-        if not exclude_header_sizes:
-            headers = all_data[all_data['Headers size'] > 0]['Headers size'].sum()
-            result['bytes']['headers'] = int(headers)
-
-        result['bytes']['total'] = int(bodies + headers)
-
-    # count the occurence of source IP addresses
-    if mfip or lfip:
-        counts = all_data['Source IP address'].value_counts()
-
-        # most frequent IP
-        if mfip:
-            result['mfip'] = {
-                'ip_address': counts.head(1).index[0],
-                'count': int(counts.head(1).values[0])
-            }
-
-        # least frequent IP
-        if lfip:
-            result['lfip'] = {
-                'ip_address': counts.tail(1).index[0],
-                'count': int(counts.tail(1).values[0])
-            }
-
-    # count the number of events every second and get the average
-    if eps:
-        all_data['Timestamp'] = pandas.to_datetime(all_data.Timestamp, unit='s')
-        events = all_data.groupby(pandas.Grouper(key='Timestamp', freq='S'))['Timestamp'].count()
+    return target
 
-        result['events'] = {
-            'count': len(all_data.values),
-            'eps': sum(events.values) / len(events.values)
-        }
 
-    return result
+def prune_frequencies(frequencies, capacity):
+    """Prune frequencies to at most `capacity` items (Misra-Gries summary).
+
+    The (capacity + 1)-th highest count is subtracted from all counts and items that drop to zero are removed,
+    so every remaining count is lower than the true count by at most the subtracted value.
+
+    Args:
+        frequencies (dict): Frequencies of items. It is modified in place and keeps the order of the items.
+        capacity (int): Maximum number of items kept.
+
+    Returns:
+        int: The value subtracted from all counts (0 if nothing was pruned).
+    """
 
+    if len(frequencies) <= capacity:
+        return 0
 
-def parse_files_regex(to_process, mfip = False, lfip = False, eps = False, count_bytes = False, exclude_header_sizes = False):
-    """Parse and analyze files with regex.
+    decrement = heapq.nlargest(capacity + 1, frequencies.values())[-1]
+    for item in list(frequencies):
+        count = frequencies[item] - decrement
+        if count > 0:
+            frequencies[item] = count
+        else:
+            del frequencies[item]
+
+    return decrement
+
+
+def pack_ip(ip):
+    """Pack an IP address into a 128-bit integer, IPv4 addresses as IPv4-mapped IPv6 addresses.
 
     Args:
-        to_process (list): List of file paths to analyze.
-        mfip (bool, optional): Analyze the most frequent IP addresses. Defaults to False.
-        lfip (bool, optional): Analyze the least frequent IP addresses. Defaults to False.
-        eps (bool, optional): Analyze the number of events and number of events per second. Defaults to False.
-        count_bytes (bool, optional): Count the total number of bytes transmitted. Defaults to False.
-        exclude_header_sizes (bool, optional): Whether to exclude HTTP header sizes. Defaults to False.
+        ip (str): The IP address.
 
     Returns:
-        dict: Dictionary containing the analysis results.
+        int: The packed address or None if the value is not an IP address.
     """
 
-    result = {}
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big') | IPV4_MAPPED
+    except (OSError, ValueError):
+        pass
 
-    ip_frequencies = {}
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+    except (OSError, ValueError):
+        return None
 
-    event_num = 0
-    epoch_start = None
-    epoch_end = 0
 
-    # too slow regex
-    #regex_timestmap = r'(\d+.?\d+?)'
-    #regex_ip = r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
-    #regex_http_method = r'(CONNECT|HEAD|OPTIONS|GET|POST|PUT|DELETE|PATCH|TRACE)'
-    #regex_url = r'(((http|https)\:\/\/)?[a-zA-Z0-9\.\/\?\:@\-_=#]+\.([a-zA-Z]){2,6}([a-zA-Z0-9\.\&\/\?\:@\-_=#])*)'
-    # regex = re.compile(r'^' + regex_timestmap + r'\s+(\-?\d+)\s+' + regex_ip + r'\s+([A-Z0-9_/]+)\s+\-?(\d+)\s+' + regex_http_method + r'\s+' + regex_url + r'\s+([a-zA-Z\-_]+)\s+(([A-Z_/]+)' + regex_ip + r')\s+([a-z\-/]+)$')
-    
-    # the regex below this comment should be used, but it does not process a row that has more than 10 fields
-    # https://www.secrepo.com/squid/access.log.gz on line 82948 has two log events merged into one line
-    # and that yields different results, because without the --fast option, it also processes that line
-    # regex = re.compile(r'^(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)$')
+def pack_ip_frequencies(frequencies, capacity = None, error = 0):
+    """Pack frequencies of IP addresses into a compact table.
 
-    # simpler regex is much faster
-    regex = re.compile(r'^(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+).*')
+    Addresses are packed into 128-bit integers (IPv4 addresses as IPv4-mapped IPv6 addresses) stored as two
+    64-bit columns of NumPy arrays, in the order of their first occurence. Values that are not IP addresses
+    (like host names) are kept in a list of names and referenced by their index. Different forms of the same
+    address (like 10.0.0.1 and ::ffff:10.0.0.1) are counted together.
 
-    # prepare result byte count
-    if count_bytes:
-        result['bytes'] = {'body': 0}
-        if not exclude_header_sizes:
-            result['bytes']['headers'] = 0
+    Args:
+        frequencies (dict): Frequencies of IP addresses (str or bytes) in the order of their first occurence.
+        capacity (int, optional): Maximum number of addresses kept by approximate counting. Defaults to None (exact counting).
+        error (int, optional): Maximum error of the approximate counts. Defaults to 0.
 
-    # process all
-    for f in to_process:
-        # read data from log file
-        with open(f, 'r') as ff:
-            # go through all lines
-            for line in ff.readlines():
-                # try to match regex pattern
-                match = regex.search(line)
-
-                # if the line does not match, skip it
-                if not match:
-                    continue
+    Returns:
+        dict: Table of frequencies with 'keys', 'counts', 'names', 'capacity' and 'error' or None if there are no addresses.
+    """
 
-                # count events
-                event_num += 1
-
-                if eps:
-                    # keep the epoch time start and end of all events
-                    epoch = int(match.groups()[0].split('.')[0])
-                    if not epoch_start or epoch_start > epoch:
-                        epoch_start = epoch
-                    if epoch > epoch_end:
-                        epoch_end = epoch
-
-                # count the frequency for IPs
-                if mfip or lfip:
-                    if not match.groups()[2] in ip_frequencies:
-                        ip_frequencies[match.groups()[2]] = 1
-                    else:
-                        ip_frequencies[match.groups()[2]] += 1
-
-                # add bytes from header and body
-                if count_bytes:
-                    body = int(match.groups()[4])
-                    headers = int(match.groups()[1])
-
-                    # sometimes the value can be -1
-                    result['bytes']['body'] += body if body > 0 else 0
-
-                    if not exclude_header_sizes:
-                        # sometimes the value can be -1
-                        result['bytes']['headers'] += headers if headers > 0 else 0
-
-    # count the total number of bytes
-    if count_bytes:
-        result['bytes']['total'] = result['bytes']['body'] + result['bytes']['headers']
-
-    # sort IP frequencies
-    if mfip or lfip:
-        ip_frequencies = sorted(ip_frequencies.items(), key=lambda x: x[1])
-        ip_frequencies_len = len(ip_frequencies)
-
-    # add the most frequent IP to the result
-    if mfip:
-        result['mfip'] = {
-            'ip_address': ip_frequencies[ip_frequencies_len - 1][0],
-            'count': ip_frequencies[ip_frequencies_len - 1][1]
-        }
+    # approximate counting can prune all addresses, but the error has to be kept
+    if not frequencies and not error:
+        return None
 
-    # add the least frequent IP to the result
-    if lfip:
-        result['lfip'] = {
-            'ip_address': ip_frequencies[0][0],
-            'count': ip_frequencies[0][1]
-        }
+    import numpy
 
-    # add the number of events per second to the result
-    if eps:
-        result['events'] = {
-            'count': event_num,
-            'eps': event_num / (epoch_end - epoch_start + 1)
-        }
+    names = {}
+    packed = [pack_ip_key(ip, names) for ip in frequencies]
+    keys = numpy.empty(len(packed), dtype=IP_KEY_DTYPE)
+    keys['high'] = [key >> 64 for key in packed]
+    keys['low'] = [key & 0xFFFFFFFFFFFFFFFF for key in packed]
 
-    return result
+    counts = numpy.fromiter(frequencies.values(), dtype=numpy.int64, count=len(frequencies))
 
+    return pack_ip_table(keys, counts, names, capacity=capacity, error=error)
 
-def run():
-    """Main function for setting up the tool and running the analysis.
+
+def pack_ip_key(ip, names):
+    """Pack an IP address into a key of a table of frequencies (see pack_ip_frequencies()).
+
+    Args:
+        ip (str): The IP address (str or bytes).
+        names (dict): Indexes of the values that are not IP addresses by the values, new values are added with the next index.
+
+    Returns:
+        int: The packed key.
     """
 
-    # initialize argument parser
-    parser = init_argparser()
-    # parse arguments
-    args = parser.parse_args()
+    if isinstance(ip, bytes):
+        ip = ip.decode()
+    elif not isinstance(ip, str):
+        ip = str(ip)
 
-    # set up logging
-    init_logger(logging.DEBUG if args.verbose else logging.INFO)
+    # values that are not IP addresses are referenced by their index
+    packed = pack_ip(ip)
+    if packed is None:
+        packed = (NAME_KEY << 64) | names.setdefault(ip, len(names))
 
-    # check if at least one operation was set
-    if not args.mfip and not args.lfip and not args.eps and not args.bytes:
-        logger.info('Nothing to do - no operation supplied.')
-        sys.exit(0)
+    return packed
 
-    # prepare pattern filter
-    pattern_filter = prepare_filters(args.filter)
 
-    # files to process
-    to_process = get_files_from_paths(args.input_paths, recurse=args.recurse, pattern_filter=pattern_filter)
+def pack_ip_table(keys, counts, names, capacity = None, error = 0):
+    """Build a table of frequencies of IP addresses from packed keys, which can repeat.
 
-    # exit if no files were specified
-    if not to_process:
-        logger.warning(f'No log files specified!')
-        sys.exit(1)
+    Args:
+        keys (numpy.ndarray): Packed keys of IP_KEY_DTYPE in the order of their first occurence.
+        counts (numpy.ndarray): int64 counts of the keys.
+        names (dict): Indexes of the values that are not IP addresses by the values.
+        capacity (int, optional): Maximum number of addresses kept by approximate counting. Defaults to None (exact counting).
+        error (int, optional): Maximum error of the approximate counts. Defaults to 0.
 
-    # get output file path
-    output_file_path = prepare_output_file(args.output_file, args.force)
+    Returns:
+        dict: Table of frequencies as returned by pack_ip_frequencies().
+    """
 
-    # use regex parser if --fast option is set
-    file_parser = parse_files_pandas
-    if args.fast:
-        file_parser = parse_files_regex
+    import numpy
 
-    result = file_parser(to_process, mfip=args.mfip, lfip=args.lfip, eps=args.eps, count_bytes=args.bytes, exclude_header_sizes=args.exclude_header_sizes)
+    keys, counts = sum_ip_keys(numpy, keys, counts)
 
-    # print to stdout if '-' was supplied as output file path
-    if not output_file_path:
-        print(json.dumps(result, indent=4), flush=True)
-        sys.exit(0)
+    return {
+        'keys': keys,
+        'counts': counts,
+        'names': list(names),
+        'capacity': capacity,
+        'error': error
+    }
 
-    # write results to the output file
-    try:
-        with open(output_file_path, 'w') as output:
-            output.write(json.dumps(result, indent=4))
-    except:
-        logger.debug(f'Unable to write output file \'{output_file_path}\'!')
-        sys.exit(1)
+
+def sum_ip_keys(numpy, keys, counts):
+    """Sum the counts of equal packed keys of IP addresses, keeping the order of their first occurence.
+
+    Keys are sorted by their two 64-bit parts, which is much faster than sorting the structured keys.
+
+    Args:
+        numpy (module): The numpy module.
+        keys (numpy.ndarray): Packed keys of IP_KEY_DTYPE in the order of their first occurence.
+        counts (numpy.ndarray): int64 counts of the keys.
+
+    Returns:
+        tuple: Arrays of the distinct keys and of their summed counts.
+    """
+
+    if not len(keys):
+        return keys, counts
+
+    # the sort is stable, so the first of equal keys is their first occurence
+    order = numpy.lexsort((keys['low'], keys['high']))
+    high = keys['high'][order]
+    low = keys['low'][order]
+    starts = numpy.flatnonzero(numpy.concatenate(([True], (high[1:] != high[:-1]) | (low[1:] != low[:-1]))))
+    if len(starts) == len(keys):
+        return keys, counts
+
+    summed = numpy.add.reduceat(counts[order], starts)
+    first = order[starts]
+    by_occurence = numpy.argsort(first, kind='stable')
+
+    return keys[first[by_occurence]], summed[by_occurence]
+
+
+def merge_ip_frequencies(first, second):
+    """Merge two tables of frequencies of IP addresses.
+
+    Addresses of the second table that are not in the first one are added after the addresses of the first table,
+    so the order of first occurence is kept. Approximate tables are pruned back to their capacity after merging.
+
+    Args:
+        first (dict): Table of frequencies as returned by pack_ip_frequencies() or None.
+        second (dict): Table of frequencies as returned by pack_ip_frequencies() or None.
+
+    Returns:
+        dict: Merged table of frequencies or None if both tables are empty.
+    """
+
+    if first is None:
+        return second
+    if second is None:
+        return first
+
+    return merge_ip_tables([first, second])
+
+
+def merge_ip_tables(tables):
+    """Merge a list of tables of frequencies of IP addresses at once (see merge_ip_frequencies()).
+
+    Args:
+        tables (list): Tables of frequencies as returned by pack_ip_frequencies() in the order of the analyzed data.
+
+    Returns:
+        dict: Merged table of frequencies or None if there are no tables.
+    """
+
+    if not tables:
+        return None
+    if len(tables) == 1:
+        return prune_ip_frequencies(tables[0])
+
+    import numpy
+
+    # names of the other tables get new indexes after the names of the first table
+    names = list(tables[0]['names'])
+    indexes = {name: index for index, name in enumerate(names)}
+    all_keys = [tables[0]['keys']]
+    for table in tables[1:]:
+        keys = table['keys']
+        if table['names']:
+            remap = numpy.empty(len(table['names']), dtype=numpy.uint64)
+            for index, name in enumerate(table['names']):
+                if name not in indexes:
+                    indexes[name] = len(names)
+                    names.append(name)
+                remap[index] = indexes[name]
+
+            keys = keys.copy()
+            is_name = keys['high'] == NAME_KEY
+            keys['low'][is_name] = remap[keys['low'][is_name].astype(numpy.int64)]
+        all_keys.append(keys)
+
+    # sum the counts of the same addresses in the order of first occurence
+    keys, counts = sum_ip_keys(numpy, numpy.concatenate(all_keys), numpy.concatenate([table['counts'] for table in tables]))
+
+    return prune_ip_frequencies({
+        'keys': keys,
+        'counts': counts,
+        'names': names,
+        'capacity': next((table['capacity'] for table in tables if table['capacity']), None),
+        'error': sum(table['error'] for table in tables)
+    })
+
+
+def add_ip_table(tables, table):
+    """Add a table of frequencies of IP addresses of a block to the tables of a file.
+
+    The tables are merged once the tables added since the last merge are as big as the merged one, so a file is counted
+    in packed tables and every address is only merged a few times, however many blocks there are.
+
+    Args:
+        tables (list): Tables of frequencies of the file, the merged table first. It is modified in place.
+        table (dict): Table of frequencies as returned by pack_ip_frequencies() or None.
+    """
+
+    if table is None:
+        return
+
+    tables.append(table)
+    if sum(len(added['counts']) for added in tables[1:]) >= max(len(tables[0]['counts']), IP_BATCH):
+        tables[:] = [merge_ip_tables(tables)]
+
+
+def prune_ip_frequencies(table):
+    """Prune an approximate table of frequencies of IP addresses to its capacity.
+
+    It is the same as prune_frequencies(), so merged approximate tables keep their error guarantee.
+
+    Args:
+        table (dict): Table of frequencies as returned by pack_ip_frequencies().
+
+    Returns:
+        dict: The pruned table or the same table if it is exact or not over its capacity.
+    """
+
+    capacity = table['capacity']
+    counts = table['counts']
+    if capacity is None or len(counts) <= capacity:
+        return table
+
+    import numpy
+
+    # subtract the (capacity + 1)-th highest count
+    decrement = int(numpy.partition(counts, len(counts) - capacity - 1)[len(counts) - capacity - 1])
+    counts = counts - decrement
+    kept = counts > 0
+    keys = table['keys'][kept]
+
+    # drop names that are no longer referenced
+    names = []
+    if table['names']:
+        is_name = keys['high'] == NAME_KEY
+        names = [table['names'][index] for index in keys['low'][is_name].tolist()]
+        keys['low'][is_name] = numpy.arange(len(names), dtype=numpy.uint64)
+
+    return {
+        'keys': keys,
+        'counts': counts[kept],
+        'names': names,
+        'capacity': capacity,
+        'error': table['error'] + decrement
+    }
+
+
+def unpack_ip(key, names):
+    """Convert a packed key of an IP address back to text.
+
+    Args:
+        key (numpy.void): Packed key with 'high' and 'low' 64-bit parts.
+        names (list): Names referenced by keys of values that are not IP addresses.
+
+    Returns:
+        str: The IP address (or name).
+    """
+
+    import ipaddress
+
+    high = int(key['high'])
+    low = int(key['low'])
+
+    if high == NAME_KEY:
+        return names[low]
+
+    packed = (high << 64) | low
+    if packed & ~0xFFFFFFFF == IPV4_MAPPED:
+        return str(ipaddress.IPv4Address(packed & 0xFFFFFFFF))
+
+    return str(ipaddress.IPv6Address(packed))
+
+
+def unpack_ip_frequencies(table):
+    """Convert a table of frequencies of IP addresses to a dictionary.
+
+    Args:
+        table (dict): Table of frequencies as returned by pack_ip_frequencies() or None.
+
+    Returns:
+        dict: Frequencies of IP addresses in the order of their first occurence.
+    """
+
+    if table is None:
+        return {}
+
+    return {unpack_ip(key, table['names']): int(count) for key, count in zip(table['keys'], table['counts'])}
+
+
+def select_ip(table, most_frequent = True):
+    """Select the most or least frequent IP address with a linear scan.
+
+    When more addresses have the same count, the address that occured first in the analyzed data is selected.
+    All engines follow this rule, so they always select the same address.
+
+    Args:
+        table (dict): Table of frequencies as returned by pack_ip_frequencies().
+        most_frequent (bool, optional): Whether to select the most or the least frequent address. Defaults to True.
+
+    Returns:
+        tuple: The IP address and its count.
+    """
+
+    # argmax and argmin return the first of equal values
+    index = int(table['counts'].argmax() if most_frequent else table['counts'].argmin())
+
+    return unpack_ip(table['keys'][index], table['names']), int(table['counts'][index])
+
+
+def select_ips(table, number, most_frequent = True):
+    """Select the most or least frequent IP addresses ordered by their counts.
+
+    Addresses with the same count are ordered by their first occurence in the analyzed data, the same as in select_ip().
+
+    Args:
+        table (dict): Table of frequencies as returned by pack_ip_frequencies() or None.
+        number (int): Number of addresses to select.
+        most_frequent (bool, optional): Whether to select the most or the least frequent addresses. Defaults to True.
+
+    Returns:
+        list: List of (IP address, count) tuples.
+    """
+
+    if table is None or number <= 0:
+        return []
+
+    import numpy
+
+    counts = table['counts']
+    number = min(number, len(counts))
+
+    # candidates include all addresses with the same count as the last selected one, so ties are ordered correctly
+    if most_frequent:
+        kth = numpy.partition(counts, len(counts) - number)[len(counts) - number]
+        candidates = numpy.flatnonzero(counts >= kth)
+        selected = candidates[numpy.argsort(-counts[candidates], kind='stable')][:number]
+    else:
+        kth = numpy.partition(counts, number - 1)[number - 1]
+        candidates = numpy.flatnonzero(counts <= kth)
+        selected = candidates[numpy.argsort(counts[candidates], kind='stable')][:number]
+
+    return [(unpack_ip(table['keys'][index], table['names']), int(counts[index])) for index in selected.tolist()]
+
+
+def summarize_ips(result, table, mfip = False, lfip = False, top = 0, bottom = 0):
+    """Add the selected IP addresses to the analysis results.
+
+    Args:
+        result (dict): Dictionary containing the analysis results. It is modified in place.
+        table (dict): Table of frequencies as returned by pack_ip_frequencies().
+        mfip (bool, optional): Add the most frequent IP address. Defaults to False.
+        lfip (bool, optional): Add the least frequent IP address. Defaults to False.
+        top (int, optional): Number of the most frequent IP addresses to add. Defaults to 0.
+        bottom (int, optional): Number of the least frequent IP addresses to add. Defaults to 0.
+    """
+
+    # most frequent IP, approximate counting may not keep any address when there are no frequent ones
+    if mfip:
+        ip_address, count = select_ip(table, most_frequent=True) if len(table['counts']) else (None, 0)
+        result['mfip'] = {
+            'ip_address': ip_address,
+            'count': count
+        }
+
+    # least frequent IP
+    if lfip:
+        ip_address, count = select_ip(table, most_frequent=False)
+        result['lfip'] = {
+            'ip_address': ip_address,
+            'count': count
+        }
+
+    # most and least frequent IPs ordered by their counts
+    if top:
+        result['top'] = [{'ip_address': ip_address, 'count': count} for ip_address, count in select_ips(table, top, most_frequent=True)]
+
+    if bottom:
+        result['bottom'] = [{'ip_address': ip_address, 'count': count} for ip_address, count in select_ips(table, bottom, most_frequent=False)]
+
+    # approximate counts are lower bounds, true counts are at most the error higher
+    if table is not None and table['capacity'] is not None:
+        result['approx'] = {
+            'counters': table['capacity'],
+            'max_error': int(table['error'])
+        }
+
+
+def new_hll(precision = HLL_PRECISION):
+    """Create an empty HyperLogLog sketch.
+
+    Args:
+        precision (int, optional): Number of bits of hashes used to select a register (4 - 18). Defaults to HLL_PRECISION.
+
+    Returns:
+        numpy.ndarray: Array of 2^precision registers.
+    """
+
+    import numpy
+
+    return numpy.zeros(1 << precision, dtype=numpy.uint8)
+
+
+def bit_length_numpy(numpy, values):
+    """Get the bit length of every value of an array of 64-bit unsigned integers.
+
+    Args:
+        numpy (module): The numpy module.
+        values (numpy.ndarray): Array of uint64 values.
+
+    Returns:
+        numpy.ndarray: Array of bit lengths.
+    """
+
+    lengths = numpy.zeros(len(values), dtype=numpy.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = values >= numpy.uint64(1 << shift)
+        lengths[big] += shift
+        values = numpy.where(big, values >> numpy.uint64(shift), values)
+
+    return lengths + (values > 0)
+
+
+def add_hll(registers, values):
+    """Add values to a HyperLogLog sketch.
+
+    Values are hashed with BLAKE2 instead of hash(), which is randomized, so sketches built by different processes
+    and runs can be merged.
+
+    Args:
+        registers (numpy.ndarray): Registers of the sketch as returned by new_hll(). They are modified in place.
+        values (collection): Values (bytes) to add.
+    """
+
+    import numpy
+
+    if not values:
+        return
+
+    precision = len(registers).bit_length() - 1
+    hashes = numpy.fromiter((int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'little') for value in values), dtype=numpy.uint64, count=len(values))
+
+    # the first bits select a register, which keeps the highest position of the first 1 bit of the rest
+    indexes = (hashes >> numpy.uint64(64 - precision)).astype(numpy.int64)
+    rest = hashes & numpy.uint64((1 << (64 - precision)) - 1)
+    ranks = (64 - precision + 1) - bit_length_numpy(numpy, rest)
+    numpy.maximum.at(registers, indexes, ranks.astype(numpy.uint8))
+
+
+def merge_hll(first, second):
+    """Merge two HyperLogLog sketches.
+
+    Args:
+        first (numpy.ndarray): Registers of a sketch.
+        second (numpy.ndarray): Registers of a sketch with the same precision.
+
+    Raises:
+        ValueError: If the sketches have a different precision.
+
+    Returns:
+        numpy.ndarray: Registers of the merged sketch.
+    """
+
+    import numpy
+
+    if len(first) != len(second):
+        raise ValueError('Unable to merge HyperLogLog sketches with a different precision!')
+
+    return numpy.maximum(first, second)
+
+
+def count_hll(registers):
+    """Estimate the number of distinct values added to a HyperLogLog sketch.
+
+    Args:
+        registers (numpy.ndarray): Registers of the sketch.
+
+    Returns:
+        int: Estimated number of distinct values.
+    """
+
+    import numpy
+
+    size = len(registers)
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(size, 0.7213 / (1 + 1.079 / size))
+    estimate = alpha * size * size / float(numpy.sum(numpy.ldexp(1.0, -registers.astype(numpy.int64))))
+
+    # linear counting is more precise for small cardinalities
+    zeros = int(numpy.count_nonzero(registers == 0))
+    if estimate <= 2.5 * size and zeros:
+        estimate = size * math.log(size / zeros)
+
+    return int(round(estimate))
+
+
+def normalize_distinct(field, value):
+    """Normalize a value of a field whose distinct values are counted.
+
+    Destinations are logged together with the hierarchy code (like HIER_DIRECT/1.2.3.4), only the host is counted.
+    Clients are counted by their packed addresses, so different forms of an address are the same client.
+
+    Args:
+        field (str): Name of the field (see DISTINCT_FIELDS).
+        value (bytes): Value of the field.
+
+    Returns:
+        bytes: Normalized value.
+    """
+
+    if field == 'destination':
+        return value.rpartition(b'/')[2]
+
+    if field == 'client':
+        packed = pack_ip(value.decode(errors='replace'))
+        if packed is not None:
+            return packed.to_bytes(16, 'big')
+
+    return value
+
+
+def add_distinct(registers, field, values):
+    """Normalize values of a field and add them to a HyperLogLog sketch.
+
+    Args:
+        registers (numpy.ndarray): Registers of the sketch. They are modified in place.
+        field (str): Name of the field (see DISTINCT_FIELDS).
+        values (iterable): Values of the field (str or bytes).
+    """
+
+    add_hll(registers, {normalize_distinct(field, value if isinstance(value, bytes) else str(value).encode()) for value in values})
+
+
+def summarize_distinct(result, sketches, distinct):
+    """Add the estimated numbers of distinct values to the analysis results.
+
+    Args:
+        result (dict): Dictionary containing the analysis results. It is modified in place.
+        sketches (dict): HyperLogLog sketches of the fields.
+        distinct (list): Names of the fields.
+    """
+
+    counts = {field: count_hll(sketches[field]) if field in sketches else 0 for field in distinct}
+    precision = max((len(registers).bit_length() - 1 for registers in sketches.values()), default=HLL_PRECISION)
+
+    result['distinct'] = {
+        'counts': counts,
+        'standard_error': 1.04 / math.sqrt(1 << precision)
+    }
+
+
+def parse_resolution(value):
+    """Parse a time series resolution like 1s, 5m, 1h or 1d (plain numbers are seconds).
+
+    Args:
+        value (str): The resolution.
+
+    Raises:
+        argparse.ArgumentTypeError: If the resolution is not valid.
+
+    Returns:
+        int: The resolution in seconds.
+    """
+
+    match = re.fullmatch(r'(\d+)([smhd]?)', value.strip().lower())
+    if not match or not int(match.group(1)):
+        raise argparse.ArgumentTypeError(f'invalid resolution \'{value}\' (use for example 1s, 5m, 1h or 1d)')
+
+    return int(match.group(1)) * RESOLUTION_UNITS[match.group(2) or 's']
+
+
+def average_eps(events, epoch_start, epoch_end):
+    """Get the average number of events per second.
+
+    Every second between the first and the last event is counted, including seconds without any events.
+
+    Args:
+        events (int): Number of events.
+        epoch_start (int): Epoch time of the first event in whole seconds.
+        epoch_end (int): Epoch time of the last event in whole seconds.
+
+    Returns:
+        float: Average number of events per second.
+    """
+
+    return events / (epoch_end - epoch_start + 1)
+
+
+def reduce_seconds(seconds, events, sizes):
+    """Sum the events and bytes of the same seconds.
+
+    Args:
+        seconds (numpy.ndarray): Epoch times in whole seconds.
+        events (numpy.ndarray): Number of events of every epoch time.
+        sizes (numpy.ndarray): Number of bytes of every epoch time.
+
+    Returns:
+        dict: Table with sorted unique 'seconds' and their 'events' and 'bytes' or None if there are no seconds.
+    """
+
+    if not len(seconds):
+        return None
+
+    import numpy
+
+    unique, inverse = numpy.unique(seconds, return_inverse=True)
+    summed_events = numpy.zeros(len(unique), dtype=numpy.int64)
+    summed_sizes = numpy.zeros(len(unique), dtype=numpy.int64)
+    numpy.add.at(summed_events, inverse.ravel(), events)
+    numpy.add.at(summed_sizes, inverse.ravel(), sizes)
+
+    return {
+        'seconds': unique,
+        'events': summed_events,
+        'bytes': summed_sizes
+    }
+
+
+def pack_seconds(events, sizes):
+    """Pack events and bytes of every second into a table.
+
+    Args:
+        events (dict): Number of events by epoch times in whole seconds.
+        sizes (dict): Number of bytes by epoch times, with the same keys in the same order as events.
+
+    Returns:
+        dict: Table as returned by reduce_seconds() or None if there are no seconds.
+    """
+
+    if not events:
+        return None
+
+    import numpy
+
+    seconds = numpy.fromiter(events.keys(), dtype=numpy.int64, count=len(events))
+    order = numpy.argsort(seconds, kind='stable')
+
+    return {
+        'seconds': seconds[order],
+        'events': numpy.fromiter(events.values(), dtype=numpy.int64, count=len(events))[order],
+        'bytes': numpy.fromiter(sizes.values(), dtype=numpy.int64, count=len(sizes))[order]
+    }
+
+
+def merge_seconds(first, second):
+    """Merge two tables of events and bytes of every second.
+
+    Args:
+        first (dict): Table as returned by reduce_seconds() or None.
+        second (dict): Table as returned by reduce_seconds() or None.
+
+    Returns:
+        dict: Merged table or None if both tables are empty.
+    """
+
+    if first is None:
+        return second
+    if second is None:
+        return first
+
+    import numpy
+
+    columns = {column: numpy.concatenate([first[column], second[column]]) for column in ('seconds', 'events', 'bytes')}
+
+    # log files are usually analyzed in the order of time, so the tables do not overlap
+    if first['seconds'][-1] < second['seconds'][0]:
+        return columns
+
+    return reduce_seconds(columns['seconds'], columns['events'], columns['bytes'])
+
+
+def summarize_timeseries(result, table, resolution):
+    """Add the events and bytes of every time bucket and the distribution of events per second to the analysis results.
+
+    Buckets are aligned to multiples of the resolution since the epoch and only buckets with events are listed, so stray
+    timestamps far from the others do not add empty buckets in between. Percentiles of events per second include the seconds
+    without any events between the first and the last event, the same way as the average does.
+
+    Args:
+        result (dict): Dictionary containing the analysis results. It is modified in place.
+        table (dict): Table as returned by reduce_seconds() or None.
+        resolution (int): Size of the buckets in seconds.
+    """
+
+    if table is None:
+        result['timeseries'] = None
+        return
+
+    import numpy
+
+    seconds = table['seconds']
+    events = table['events']
+
+    # sum the sorted seconds into the buckets they start
+    buckets = seconds // resolution
+    starts = numpy.flatnonzero(numpy.concatenate(([True], buckets[1:] != buckets[:-1])))
+    bucket_events = numpy.add.reduceat(events, starts)
+    bucket_sizes = numpy.add.reduceat(table['bytes'], starts)
+
+    # nearest-rank percentiles, seconds without events are the lowest values
+    span = int(seconds[-1] - seconds[0]) + 1
+    empty = span - len(seconds)
+    ordered = numpy.sort(events)
+
+    def percentile(fraction):
+        rank = max(1, math.ceil(fraction * span))
+        return 0 if rank <= empty else int(ordered[rank - empty - 1])
+
+    # argmax returns the first of equal values, so the earliest busiest second is selected
+    busiest = int(events.argmax())
+
+    result['timeseries'] = {
+        'resolution': resolution,
+        'buckets': [list(row) for row in zip((buckets[starts] * resolution).tolist(), bucket_events.tolist(), bucket_sizes.tolist())],
+        'eps': {
+            'average': average_eps(int(events.sum()), int(seconds[0]), int(seconds[-1])),
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': int(ordered[-1])
+        },
+        'busiest_second': {
+            'epoch': int(seconds[busiest]),
+            'events': int(events[busiest]),
+            'bytes': int(table['bytes'][busiest])
+        }
+    }
+
+
+@functools.lru_cache(maxsize=HOST_CACHE_SIZE)
+def parse_url_authority(authority):
+    """Parse the host of the part of a URL before its path, like http://user@example.com:8080 or example.com:443 of CONNECT requests.
+
+    Args:
+        authority (bytes): Scheme and authority of the URL.
+
+    Returns:
+        str: Interned lowercase host without the port and credentials, the authority itself if it has no host.
+    """
+
+    authority = authority.decode(errors='replace')
+    scheme_end = authority.find('://')
+    host = authority[scheme_end + 3:] if scheme_end >= 0 else authority
+    for separator in '?#':
+        host = host.partition(separator)[0]
+    host = host.rpartition('@')[2]
+
+    # addresses of IPv6 hosts are enclosed in brackets
+    if host.startswith('['):
+        host = host[1:].partition(']')[0]
+    else:
+        host = host.partition(':')[0]
+
+    return sys.intern(host.lower().rstrip('.') or authority)
+
+
+def extract_url_host(url):
+    """Extract the host of a URL.
+
+    URLs rarely repeat, but the parts before their paths do, so only those are parsed (and memoized).
+
+    Args:
+        url (bytes or str): The URL.
+
+    Returns:
+        str: Interned lowercase host without the port and credentials.
+    """
+
+    if isinstance(url, str):
+        url = url.encode()
+
+    path_start = url.find(b'/', url.find(b'://') + 3)
+    return parse_url_authority(url if path_start < 0 else url[:path_start])
+
+
+@functools.lru_cache(maxsize=HOST_CACHE_SIZE)
+def extract_destination_host(destination):
+    """Extract the host of a destination like HIER_DIRECT/23.203.248.25.
+
+    Args:
+        destination (bytes or str): Hierarchy code and host of the destination.
+
+    Returns:
+        str: Interned host, - if the request was not forwarded.
+    """
+
+    if isinstance(destination, bytes):
+        destination = destination.decode(errors='replace')
+
+    return sys.intern(destination.partition('/')[2] or destination)
+
+
+@functools.lru_cache(maxsize=HOST_CACHE_SIZE)
+def extract_cache_result(status):
+    """Extract the cache result of a status like TCP_MISS/200.
+
+    Args:
+        status (bytes or str): Cache result and HTTP status code.
+
+    Returns:
+        str: Interned cache result.
+    """
+
+    if isinstance(status, bytes):
+        status = status.decode(errors='replace')
+
+    return sys.intern(status.partition('/')[0])
+
+
+# functions extracting group fields from the values of the fields they come from
+GROUP_EXTRACTORS = {
+    'domain': extract_url_host,
+    'destination_host': extract_destination_host,
+    'result': extract_cache_result
+}
+
+
+def parse_group_by(value):
+    """Parse the fields of a grouping like status,method.
+
+    Args:
+        value (str): Comma separated names of fields (see GROUP_FIELDS).
+
+    Raises:
+        argparse.ArgumentTypeError: If a field is not known or is repeated.
+
+    Returns:
+        list: Names of the fields.
+    """
+
+    fields = [field.strip().lower() for field in value.split(',')]
+    for field in fields:
+        if field not in GROUP_FIELDS:
+            raise argparse.ArgumentTypeError(f'invalid field \'{field}\' (choose from {", ".join(GROUP_FIELDS)})')
+    if len(set(fields)) < len(fields):
+        raise argparse.ArgumentTypeError(f'repeated field in \'{value}\'')
+
+    return fields
+
+
+def parse_aggregations(value):
+    """Parse aggregations of groups like count,sum(body),avg(bytes).
+
+    Args:
+        value (str): Comma separated aggregations - count or a function of a numeric field (see AGGREGATE_FUNCTIONS and AGGREGATE_FIELDS).
+
+    Raises:
+        argparse.ArgumentTypeError: If an aggregation is not valid.
+
+    Returns:
+        list: Aggregations as [function, field] pairs, the field of count is None.
+    """
+
+    aggregations = []
+    for aggregation in value.split(','):
+        match = re.fullmatch(r'(\w+)(?:\((\w+)\))?', aggregation.strip().lower())
+        function, field = match.groups() if match else (None, None)
+
+        if function == 'count' and field is None:
+            aggregations.append([function, None])
+        elif function in AGGREGATE_FUNCTIONS and function != 'count' and field in AGGREGATE_FIELDS:
+            aggregations.append([function, field])
+        else:
+            raise argparse.ArgumentTypeError(f'invalid aggregation \'{aggregation}\' (use count or {"/".join(AGGREGATE_FUNCTIONS[1:])} of {", ".join(AGGREGATE_FIELDS)}, like sum(body))')
+
+    return aggregations
+
+
+def plan_columns(aggregations):
+    """Get the columns accumulated by every group for aggregations.
+
+    Every group accumulates a row of values - the number of events first, then the sums, minimums and maximums
+    needed by the aggregations (averages are computed from the sums), each only once.
+
+    Args:
+        aggregations (list): Aggregations as returned by parse_aggregations().
+
+    Returns:
+        list: Accumulated columns as [function, field] pairs.
+    """
+
+    columns = [['count', None]]
+    for function, field in aggregations:
+        column = ['sum' if function == 'avg' else function, field]
+        if function != 'count' and column not in columns:
+            columns.append(column)
+
+    return columns
+
+
+def plan_groups(operations):
+    """Compile groupings and aggregations into a plan of a single pass over the events.
+
+    Traffic of domains and destinations is aggregated by groupings of their hosts, unless the same grouping is already planned.
+    Percentiles are computed from histograms of the grouping of cache results.
+
+    Args:
+        operations (dict): Operations of the analysis (see DEFAULT_OPERATIONS).
+
+    Returns:
+        dict: The plan - 'groupings' with the names and indexes of the key fields and the accumulated columns (see plan_columns()),
+            all key 'fields' with their indexes and the functions extracting them (see GROUP_EXTRACTORS), the numeric fields 'sizes' needed
+            and whether header sizes are excluded from 'bytes' like from the bytes operation ('exclude_header_sizes').
+    """
+
+    columns = plan_columns(operations['aggregations'])
+    groupings = [(fields, [GROUP_FIELDS[field] for field in fields], columns) for fields in operations['group_by']]
+
+    for field, top in (('domain', operations['top_domains']), ('destination_host', operations['top_destinations'])):
+        if top and ([field], TRAFFIC_COLUMNS) not in [(fields, columns) for fields, _, columns in groupings]:
+            groupings.append(([field], [GROUP_FIELDS[field]], TRAFFIC_COLUMNS))
+
+    if operations['percentiles']:
+        groupings.append((['result'], [GROUP_FIELDS['result']], PERCENTILE_COLUMNS))
+
+    fields = dict.fromkeys(field for fields, _, _ in groupings for field in fields)
+
+    return {
+        'groupings': groupings,
+        'fields': [(field, GROUP_FIELDS[field], GROUP_EXTRACTORS.get(field)) for field in fields],
+        'sizes': list(dict.fromkeys(field for _, _, columns in groupings for _, field in columns[1:])),
+        'exclude_header_sizes': operations['exclude_header_sizes']
+    }
+
+
+def histogram_bucket(value):
+    """Get the bucket of a histogram counting a value.
+
+    Values below 2^HISTOGRAM_PRECISION have their own buckets, higher values share buckets of the same
+    HISTOGRAM_PRECISION most significant bits (like HDR histograms), so the number of buckets is fixed.
+
+    Args:
+        value (int): Non-negative value.
+
+    Returns:
+        int: The bucket.
+    """
+
+    shift = max(value.bit_length() - HISTOGRAM_PRECISION, 0)
+    return (shift << (HISTOGRAM_PRECISION - 1)) + (value >> shift)
+
+
+def histogram_buckets(numpy, values):
+    """Get the buckets of a histogram counting an array of values (see histogram_bucket()).
+
+    Args:
+        numpy (module): The numpy module.
+        values (numpy.ndarray): Array of non-negative int64 values below 2^53.
+
+    Returns:
+        numpy.ndarray: Array of int64 buckets.
+    """
+
+    # frexp returns the number of bits of integers exactly represented by floats
+    shifts = numpy.maximum(numpy.frexp(values.astype(numpy.float64))[1] - HISTOGRAM_PRECISION, 0).astype(numpy.int64)
+    return (shifts << (HISTOGRAM_PRECISION - 1)) + (values >> shifts)
+
+
+def histogram_percentile(histogram, fraction):
+    """Get a nearest-rank percentile of the values counted by a histogram.
+
+    Args:
+        histogram (dict): Counts of values by their buckets.
+        fraction (float): The percentile as a fraction, like 0.99.
+
+    Returns:
+        int: The highest value of the bucket of the percentile, None if the histogram is empty.
+    """
+
+    rank = max(1, math.ceil(fraction * sum(histogram.values())))
+    counted = 0
+    for bucket in sorted(histogram):
+        counted += histogram[bucket]
+        if counted >= rank:
+            break
+    else:
+        return None
+
+    # values of the lowest buckets are exact
+    if bucket < 1 << HISTOGRAM_PRECISION:
+        return bucket
+
+    shift = (bucket >> (HISTOGRAM_PRECISION - 1)) - 1
+    return ((bucket - (shift << (HISTOGRAM_PRECISION - 1)) + 1) << shift) - 1
+
+
+def add_group_row(table, key, row, columns):
+    """Add a row of accumulated values to a group.
+
+    Args:
+        table (dict): Rows of groups by their keys. It is modified in place.
+        key (tuple): Key of the group.
+        row (list): Accumulated values of the events, histograms are counts of values by their buckets.
+        columns (list): Accumulated columns as [function, field] pairs.
+    """
+
+    accumulated = table.get(key)
+    if accumulated is None:
+        table[key] = list(row)
+        return
+
+    for i, (function, _) in enumerate(columns):
+        if function == 'min':
+            accumulated[i] = min(accumulated[i], row[i])
+        elif function == 'max':
+            accumulated[i] = max(accumulated[i], row[i])
+        elif function == 'hist':
+            histogram = accumulated[i]
+            for bucket, count in row[i].items():
+                histogram[bucket] = histogram.get(bucket, 0) + count
+        else:
+            accumulated[i] += row[i]
+
+
+def new_group_batch(plan):
+    """Create an empty batch of events of log lines, which are added to their groups at once.
+
+    Args:
+        plan (dict): Plan as returned by plan_groups().
+
+    Returns:
+        dict: Empty batch with lists of the values of the key fields by their names and of the sizes.
+    """
+
+    return {
+        'events': 0,
+        'values': {field: [] for field, _, _ in plan['fields']},
+        'headers': [],
+        'body': []
+    }
+
+
+def add_group_event(tables, plan, batch, fields):
+    """Collect an event of a log line in a batch, which is added to the groups when it is full.
+
+    Args:
+        tables (list): Rows of groups by their keys for every grouping of the plan. They are modified in place.
+        plan (dict): Plan as returned by plan_groups().
+        batch (dict): Batch as returned by new_group_batch(). It is modified in place.
+        fields (list): Fields of the log line, keys are made of the raw values or of the values extracted from them.
+    """
+
+    values = batch['values']
+    for field, index, extract in plan['fields']:
+        values[field].append(fields[index] if extract is None else extract(fields[index]))
+
+    if plan['sizes']:
+        batch['headers'].append(int(fields[1]))
+        batch['body'].append(int(fields[4]))
+
+    batch['events'] += 1
+    if batch['events'] >= DISTINCT_BATCH:
+        add_group_batch(tables, plan, batch)
+
+
+def add_group_batch(tables, plan, batch):
+    """Add the events of a batch to their groups and empty the batch.
+
+    Args:
+        tables (list): Rows of groups by their keys for every grouping of the plan. They are modified in place.
+        plan (dict): Plan as returned by plan_groups().
+        batch (dict): Batch as returned by new_group_batch(). It is emptied.
+    """
+
+    # sometimes the sizes are -1
+    sizes = {}
+    if plan['sizes']:
+        sizes['headers'] = [size if size > 0 else 0 for size in batch['headers']]
+        sizes['body'] = [size if size > 0 else 0 for size in batch['body']]
+        sizes['bytes'] = sizes['body'] if plan['exclude_header_sizes'] else [headers + body for headers, body in zip(sizes['headers'], sizes['body'])]
+        sizes['elapsed'] = sizes['headers']
+
+    for table, (fields, _, columns) in zip(tables, plan['groupings']):
+        keys = list(zip(*(batch['values'][field] for field in fields)))
+        rows = {key: [count] for key, count in collections.Counter(keys).items()}
+
+        for function, field in columns[1:]:
+            accumulated = {}
+            if function == 'sum':
+                for key, size in zip(keys, sizes[field]):
+                    accumulated[key] = accumulated.get(key, 0) + size
+            elif function == 'min':
+                for key, size in zip(keys, sizes[field]):
+                    if size < accumulated.get(key, math.inf):
+                        accumulated[key] = size
+            elif function == 'hist':
+                for (key, bucket), count in collections.Counter(zip(keys, map(histogram_bucket, sizes[field]))).items():
+                    accumulated.setdefault(key, {})[bucket] = count
+            else:
+                for key, size in zip(keys, sizes[field]):
+                    if size > accumulated.get(key, -math.inf):
+                        accumulated[key] = size
+
+            for key, row in rows.items():
+                row.append(accumulated[key])
+
+        for key, row in rows.items():
+            add_group_row(table, key, row, columns)
+
+    batch['events'] = 0
+    for values in batch['values'].values():
+        values.clear()
+    batch['headers'].clear()
+    batch['body'].clear()
+
+
+def add_group_block(numpy, tables, plan, codes, sizes):
+    """Add dictionary-encoded events of a block to their groups.
+
+    Events are sorted by their keys, so the values of every group are reduced at once.
+
+    Args:
+        numpy (module): The numpy module.
+        tables (list): Rows of groups by their keys for every grouping of the plan, keys are tuples of codes. They are modified in place.
+        plan (dict): Plan as returned by plan_groups().
+        codes (dict): Arrays of codes of the key fields by their names.
+        sizes (dict): Arrays of non-negative int64 numeric fields needed by the plan by their names.
+    """
+
+    for table, (fields, _, columns) in zip(tables, plan['groupings']):
+        keys = [codes[field] for field in fields]
+        order = numpy.lexsort(keys[::-1])
+        keys = [key[order] for key in keys]
+
+        # groups start where any of the keys changes
+        changes = numpy.zeros(len(order), dtype=bool)
+        changes[0] = True
+        for key in keys:
+            changes[1:] |= key[1:] != key[:-1]
+        starts = numpy.flatnonzero(changes)
+
+        reduced = []
+        for function, field in columns:
+            if function == 'count':
+                reduced.append(numpy.diff(starts, append=len(order)))
+            elif function == 'hist':
+                # count the distinct pairs of groups and buckets, buckets of values below 2^53 fit in 16 bits
+                groups, counts = numpy.unique((numpy.cumsum(changes) - 1) << 16 | histogram_buckets(numpy, sizes[field][order]), return_counts=True)
+                histograms = [{} for _ in starts]
+                for group, bucket, count in zip((groups >> 16).tolist(), (groups & 0xFFFF).tolist(), counts.tolist()):
+                    histograms[group][bucket] = count
+                reduced.append(histograms)
+            else:
+                reduce = {'sum': numpy.add, 'min': numpy.minimum, 'max': numpy.maximum}[function]
+                reduced.append(reduce.reduceat(sizes[field][order], starts))
+
+        for key, row in zip(zip(*(key[starts].tolist() for key in keys)), zip(*(column if isinstance(column, list) else column.tolist() for column in reduced))):
+            add_group_row(table, key, row, columns)
+
+
+def pack_groups(plan, tables, decode):
+    """Decode the keys of groups and pack them into the partial aggregate format.
+
+    Args:
+        plan (dict): Plan as returned by plan_groups().
+        tables (list): Rows of groups by their raw keys for every grouping of the plan.
+        decode (function): Function decoding a raw value of a key, called with the name of the field and the value.
+
+    Returns:
+        list: Groupings with the names of their fields ('by'), the accumulated 'columns' and the rows of groups by their keys ('table').
+    """
+
+    groups = []
+    for table, (fields, _, columns) in zip(tables, plan['groupings']):
+        # invalid values may be decoded to the same key
+        decoded = {}
+        for key, row in table.items():
+            add_group_row(decoded, tuple(decode(field, value) for field, value in zip(fields, key)), row, columns)
+
+        groups.append({'by': fields, 'columns': columns, 'table': decoded})
+
+    return groups
+
+
+def merge_groups(first, second):
+    """Merge groups of two partial aggregates.
+
+    Args:
+        first (list): Groupings as returned by pack_groups() or None. It is modified in place.
+        second (list): Groupings as returned by pack_groups() or None.
+
+    Returns:
+        list: The merged groupings.
+    """
+
+    if second is None:
+        return first
+
+    # rows of the merged groups are not shared with other partial aggregates
+    if first is None:
+        first = [dict(grouping, table={}) for grouping in second]
+
+    for grouping, other in zip(first, second):
+        for key, row in other['table'].items():
+            add_group_row(grouping['table'], key, [dict(value) if isinstance(value, dict) else value for value in row], grouping['columns'])
+
+    return first
+
+
+def summarize_groups(result, groups, group_by, aggregations):
+    """Add the aggregated groups to the analysis results.
+
+    Groups are ordered from the one with the most events.
+
+    Args:
+        result (dict): Dictionary containing the analysis results. It is modified in place.
+        groups (list): Groupings as returned by pack_groups() or None.
+        group_by (list): Names of the fields of every grouping.
+        aggregations (list): Aggregations as returned by parse_aggregations().
+    """
+
+    # groupings of traffic by hosts may be left out of the aggregated groupings
+    columns = plan_columns(aggregations)
+    tables = {tuple(grouping['by']): grouping for grouping in groups or [] if grouping['columns'] == columns}
+
+    result['groups'] = {}
+    for fields in group_by:
+        grouping = tables.get(tuple(fields), {'columns': [], 'table': {}})
+        columns = [tuple(column) for column in grouping['columns']]
+        rows = []
+
+        for key, accumulated in sorted(grouping['table'].items(), key=lambda item: (-item[1][0], item[0])):
+            row = dict(zip(fields, key))
+            for function, field in aggregations:
+                if function == 'count':
+                    row['count'] = accumulated[0]
+                elif function == 'avg':
+                    row[f'avg({field})'] = accumulated[columns.index(('sum', field))] / accumulated[0]
+                else:
+                    row[f'{function}({field})'] = accumulated[columns.index((function, field))]
+            rows.append(row)
+
+        result['groups'][','.join(fields)] = rows
+
+
+def summarize_traffic(result, groups, top_domains = 0, top_destinations = 0):
+    """Add the domains and destinations with the most traffic to the analysis results.
+
+    Hosts are ordered from the one with the most bytes, then with the most events.
+
+    Args:
+        result (dict): Dictionary containing the analysis results. It is modified in place.
+        groups (list): Groupings as returned by pack_groups() or None.
+        top_domains (int, optional): Number of domains to report. Defaults to 0.
+        top_destinations (int, optional): Number of destinations to report. Defaults to 0.
+    """
+
+    for name, field, top in (('domain', 'domain', top_domains), ('destination', 'destination_host', top_destinations)):
+        if not top:
+            continue
+
+        table = next((grouping['table'] for grouping in groups or [] if grouping['by'] == [field] and grouping['columns'] == TRAFFIC_COLUMNS), {})
+        ranked = heapq.nsmallest(top, table.items(), key=lambda item: (-item[1][1], -item[1][0], item[0]))
+        result[f'top_{name}s'] = [{name: key[0], 'count': count, 'bytes': size} for key, (count, size) in ranked]
+
+
+def summarize_percentiles(result, groups):
+    """Add the percentiles of elapsed times and body sizes of every cache result and the cache hit ratio to the analysis results.
+
+    Cache results are ordered from the one with the most events. Hits are the events of all results containing HIT
+    (like TCP_HIT, TCP_MEM_HIT or TCP_REFRESH_HIT).
+
+    Args:
+        result (dict): Dictionary containing the analysis results. It is modified in place.
+        groups (list): Groupings as returned by pack_groups() or None.
+    """
+
+    table = next((grouping['table'] for grouping in groups or [] if grouping['by'] == ['result'] and grouping['columns'] == PERCENTILE_COLUMNS), {})
+    events = sum(row[0] for row in table.values())
+    hits = sum(row[0] for key, row in table.items() if 'HIT' in key[0])
+
+    results = {}
+    for key, (count, elapsed, body) in sorted(table.items(), key=lambda item: (-item[1][0], item[0])):
+        results[key[0]] = {
+            'count': count,
+            'elapsed': {f'p{round(fraction * 100)}': histogram_percentile(elapsed, fraction) for fraction in PERCENTILES},
+            'body': {f'p{round(fraction * 100)}': histogram_percentile(body, fraction) for fraction in PERCENTILES}
+        }
+
+    result['percentiles'] = {
+        'hit_ratio': hits / events if events else None,
+        'results': results
+    }
+
+
+def summarize(result, partial, operations):
+    """Add the analyzed operations of a merged partial aggregate to the analysis results.
+
+    Partial aggregates of all engines, stores and merged partial aggregate files are summarized the same way.
+
+    Args:
+        result (dict): Dictionary containing the analysis results. It is modified in place.
+        partial (dict): Merged partial aggregate of all analyzed files.
+        operations (dict): Operations to summarize (see DEFAULT_OPERATIONS), missing ones are not summarized.
+    """
+
+    operations = dict(DEFAULT_OPERATIONS, **operations)
+
+    # count the total number of bytes, header sizes may be counted even when they are excluded (e.g. in cached results)
+    if operations['count_bytes']:
+        result['bytes'] = {'body': partial['bytes_body']}
+        if not operations['exclude_header_sizes']:
+            result['bytes']['headers'] = partial['bytes_headers']
+        result['bytes']['total'] = partial['bytes_body'] + result['bytes'].get('headers', 0)
+
+    # add the most and least frequent IPs to the result
+    if operations['mfip'] or operations['lfip'] or operations['top'] or operations['bottom']:
+        summarize_ips(result, partial['ip_frequencies'], mfip=operations['mfip'], lfip=operations['lfip'], top=operations['top'], bottom=operations['bottom'])
+
+    # add the estimated numbers of distinct values to the result
+    if operations['distinct']:
+        summarize_distinct(result, partial['distinct'], operations['distinct'])
+
+    # add the events and bytes of every time bucket
+    if operations['timeseries']:
+        summarize_timeseries(result, partial['seconds'], operations['timeseries'])
+
+    # add the number of events per second to the result
+    if operations['eps']:
+        result['events'] = {
+            'count': partial['events'],
+            'eps': average_eps(partial['events'], partial['epoch_start'], partial['epoch_end'])
+        }
+
+    # aggregate the groups of events
+    if operations['group_by']:
+        summarize_groups(result, partial['groups'], operations['group_by'], operations['aggregations'])
+
+    # add the domains and destinations with the most traffic
+    summarize_traffic(result, partial['groups'], top_domains=operations['top_domains'], top_destinations=operations['top_destinations'])
+
+    # add the percentiles of every cache result and the cache hit ratio
+    if operations['percentiles']:
+        summarize_percentiles(result, partial['groups'])
+
+
+def serialize_partial(partial):
+    """Convert a partial aggregate to a JSON serializable dictionary.
+
+    Args:
+        partial (dict): Partial aggregate.
+
+    Returns:
+        dict: JSON serializable partial aggregate.
+    """
+
+    data = dict(partial)
+
+    # statistics belong to the run which analyzed the data
+    data.pop('tasks', None)
+
+    # approximate tables are only written with as many addresses as they keep
+    table = partial['ip_frequencies']
+    if table is not None:
+        table = prune_ip_frequencies(table)
+        data['ip_frequencies'] = {
+            'high': table['keys']['high'].tolist(),
+            'low': table['keys']['low'].tolist(),
+            'counts': table['counts'].tolist(),
+            'names': table['names'],
+            'capacity': table['capacity'],
+            'error': int(table['error'])
+        }
+
+    # registers of sketches are stored as base64, they are only a few KB each
+    data['distinct'] = {field: base64.b64encode(registers.tobytes()).decode() for field, registers in partial['distinct'].items()}
+
+    if partial['seconds'] is not None:
+        data['seconds'] = {column: values.tolist() for column, values in partial['seconds'].items()}
+
+    # keys of groups are tuples, which can not be keys of JSON objects
+    if partial['groups'] is not None:
+        # histograms are lists of [bucket, count] pairs, JSON objects only have string keys
+        data['groups'] = [dict(grouping, table=[[list(key), [sorted(value.items()) if function == 'hist' else value for (function, _), value in zip(grouping['columns'], row)]] for key, row in grouping['table'].items()]) for grouping in partial['groups']]
+
+    return data
+
+
+def deserialize_partial(data):
+    """Convert a dictionary created by serialize_partial() back to a partial aggregate.
+
+    Args:
+        data (dict): JSON serializable partial aggregate.
+
+    Returns:
+        dict: Partial aggregate.
+    """
+
+    partial = dict(data)
+
+    table = data['ip_frequencies']
+    if table is not None:
+        import numpy
+
+        keys = numpy.empty(len(table['counts']), dtype=IP_KEY_DTYPE)
+        keys['high'] = table['high']
+        keys['low'] = table['low']
+        partial['ip_frequencies'] = {
+            'keys': keys,
+            'counts': numpy.array(table['counts'], dtype=numpy.int64),
+            'names': table['names'],
+            'capacity': table.get('capacity'),
+            'error': table.get('error', 0)
+        }
+
+    if data.get('distinct'):
+        import numpy
+
+        partial['distinct'] = {field: numpy.frombuffer(base64.b64decode(registers), dtype=numpy.uint8).copy() for field, registers in data['distinct'].items()}
+    else:
+        partial['distinct'] = {}
+
+    if data.get('seconds') is not None:
+        import numpy
+
+        partial['seconds'] = {column: numpy.array(values, dtype=numpy.int64) for column, values in data['seconds'].items()}
+    else:
+        partial['seconds'] = None
+
+    if data.get('groups') is not None:
+        partial['groups'] = [dict(grouping, table={tuple(key): [dict(value) if function == 'hist' else value for (function, _), value in zip(grouping['columns'], row)] for key, row in grouping['table']}) for grouping in data['groups']]
+    else:
+        partial['groups'] = None
+
+    return partial
+
+
+def find_line_start(f, offset):
+    """Find the start of the first line beginning at or after an offset.
+
+    Args:
+        f (io.BufferedReader): File opened in binary mode.
+        offset (int): Byte offset in the file.
+
+    Returns:
+        int: Byte offset of the line start.
+    """
+
+    if offset <= 0:
+        return 0
+
+    # the previous byte tells us if the offset is already at a line start
+    f.seek(offset - 1)
+    f.readline()
+    return f.tell()
+
+
+def detect_compression(path):
+    """Detect the compression of a file by its magic bytes.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        str: Name of the compression (gzip, bz2, xz or zstd) or None if the file is not compressed.
+    """
+
+    # the data of prefetched files are already known
+    if isinstance(path, PrefetchedPath):
+        return path.compression
+
+    with open(path, 'rb') as f:
+        header = f.read(6)
+
+    return match_compression(header)
+
+
+def match_compression(header):
+    """Get the compression of data by their magic bytes.
+
+    Args:
+        header (bytes): First bytes of the data.
+
+    Returns:
+        str: Name of the compression (gzip, bz2, xz or zstd) or None if the data are not compressed.
+    """
+
+    for compression, magic in COMPRESSION_MAGIC.items():
+        if header.startswith(magic):
+            return compression
+
+    return None
+
+
+def open_log(path, compression = None):
+    """Open a log file for reading in binary mode, decompressing it on the fly.
+
+    Args:
+        path (str or io.BufferedIOBase): Path to the log file or a file object with its data.
+        compression (str, optional): Name of the compression as returned by detect_compression(). Defaults to None.
+
+    Raises:
+        RuntimeError: If the file is compressed with zstd and no zstd library is installed.
+
+    Returns:
+        io.BufferedIOBase: File object with decompressed data.
+    """
+
+    if compression == 'gzip':
+        import gzip
+        return gzip.open(path, 'rb')
+
+    if compression == 'bz2':
+        import bz2
+        return bz2.open(path, 'rb')
+
+    if compression == 'xz':
+        import lzma
+        return lzma.open(path, 'rb')
+
+    if compression == 'zstd':
+        # zstd is part of the standard library since Python 3.14
+        try:
+            from compression import zstd
+            return zstd.open(path, 'rb')
+        except ImportError:
+            pass
+
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError(f'Unable to read zstd compressed file \'{path}\' - the zstandard package is not installed!')
+
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb') if isinstance(path, str) else path, read_size=BLOCK_SIZE)
+
+    return open(path, 'rb') if isinstance(path, str) else path
+
+
+def read_blocks(f, end = None, block_size = BLOCK_SIZE):
+    """Read a binary file in blocks of a fixed size.
+
+    Args:
+        f (io.BufferedIOBase): File opened in binary mode.
+        end (int, optional): Byte offset to stop reading at. Defaults to None, which means the end of the file.
+        block_size (int, optional): Size of blocks read from the file in bytes. Defaults to BLOCK_SIZE.
+
+    Yields:
+        bytes: Blocks of data.
+    """
+
+    remaining = None if end is None else end - f.tell()
+
+    while True:
+        # do not read past the end of the byte range
+        size = block_size if remaining is None else min(block_size, remaining)
+        if size <= 0:
+            break
+
+        block = f.read(size)
+        if not block:
+            break
+
+        if remaining is not None:
+            remaining -= len(block)
+
+        yield block
+
+
+def prefetch(iterable, depth = PREFETCH_DEPTH):
+    """Iterate over an iterable in a background thread.
+
+    Decompression releases the GIL, so reading the next blocks in a thread overlaps with parsing the current one.
+
+    Args:
+        iterable (iterable): Iterable to consume in the background.
+        depth (int, optional): Maximum number of items read ahead. Defaults to PREFETCH_DEPTH.
+
+    Yields:
+        object: Items of the iterable in the original order.
+    """
+
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # give up when the consumer has stopped reading
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as ex:
+            put((done, ex))
+            return
+        put((done, None))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item, ex = items.get()
+            if item is done:
+                if ex:
+                    raise ex
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def read_lines(f, end = None, block_size = BLOCK_SIZE, threaded = False):
+    """Read lines from a binary file in blocks of a fixed size.
+
+    Only a few blocks (and an unfinished line) are kept in memory at a time, no matter how big the file is.
+
+    Args:
+        f (io.BufferedIOBase): File opened in binary mode, positioned at the start of a line.
+        end (int, optional): Byte offset to stop reading at. Defaults to None, which means the end of the file.
+        block_size (int, optional): Size of blocks read from the file in bytes. Defaults to BLOCK_SIZE.
+        threaded (bool, optional): Whether to read blocks in a background thread. Defaults to False.
+
+    Yields:
+        bytes: Lines without the trailing newline.
+    """
+
+    blocks = read_blocks(f, end=end, block_size=block_size)
+    if threaded:
+        blocks = prefetch(blocks)
+
+    yield from split_lines(align_blocks(blocks))
+
+
+def align_blocks(blocks):
+    """Cut blocks of data at line boundaries.
+
+    Args:
+        blocks (iterable): Blocks of data.
+
+    Yields:
+        bytes: Blocks of complete lines. Only the last block may not end with a newline.
+    """
+
+    rest = b''
+    for block in blocks:
+        # keep the unfinished line for the next block
+        block = rest + block
+        cut = block.rfind(b'\n') + 1
+        rest = block[cut:]
+        if cut:
+            yield block[:cut]
+
+    if rest:
+        yield rest
+
+
+def map_line_blocks(path, start = 0, end = None, block_size = BLOCK_SIZE):
+    """Read blocks of complete lines of a memory-mapped file without copying.
+
+    The mapping is unmapped once all of the yielded blocks are released, so only read files which are not truncated meanwhile.
+    Pages of blocks which were analyzed are dropped from the mapping, so the resident memory does not grow with the file size.
+
+    Args:
+        path (str): Path to an uncompressed file.
+        start (int, optional): Byte offset to start reading at. Defaults to 0.
+        end (int, optional): Byte offset to stop reading at. Defaults to None, which means the end of the file.
+        block_size (int, optional): Approximate size of the blocks in bytes. Defaults to BLOCK_SIZE.
+
+    Yields:
+        memoryview: Blocks of complete lines. Only the last block may not end with a newline.
+    """
+
+    import mmap
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        end = size if end is None else min(end, size)
+        if end <= start:
+            return
+
+        # the mapping stays valid after the file is closed
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # the file is read from the start to the end
+    if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+
+    # dropped pages are read again from the page cache if they are still used
+    can_release = hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_DONTNEED')
+    released = start - start % mmap.PAGESIZE
+
+    view = memoryview(mapped)
+    position = start
+
+    while position < end:
+        cut = min(position + block_size, end)
+
+        # cut the block after the last newline, or after the first one if the line is longer than the block
+        if cut < end:
+            newline = mapped.rfind(b'\n', position, cut)
+            if newline < 0:
+                newline = mapped.find(b'\n', cut, end)
+            cut = end if newline < 0 else newline + 1
+
+        yield view[position:cut]
+        position = cut
+
+        release = cut - cut % mmap.PAGESIZE
+        if can_release and release > released:
+            mapped.madvise(mmap.MADV_DONTNEED, released, release - released)
+            released = release
+
+
+def read_line_blocks(path, start = 0, end = None, block_size = BLOCK_SIZE, use_mmap = True):
+    """Read blocks of complete lines of a log file.
+
+    Uncompressed files are memory-mapped, compressed files are decompressed in a background thread.
+
+    Args:
+        path (str): Path to the log file.
+        start (int, optional): Byte offset to start reading at. Defaults to 0.
+        end (int, optional): Byte offset to stop reading at. Defaults to None, which means the end of the file.
+        block_size (int, optional): Size of blocks read from the file in bytes. Defaults to BLOCK_SIZE.
+        use_mmap (bool, optional): Whether to memory-map uncompressed files. Defaults to True.
+
+    Yields:
+        bytes: Blocks of complete lines (memoryview objects when memory-mapped). Only the last block may not end with a newline.
+    """
+
+    # compressed files are always read whole
+    compression = detect_compression(path)
+
+    # prefetched data of the byte range are read from memory
+    if isinstance(path, PrefetchedPath):
+        with open_log(io.BytesIO(path.data), compression) as f:
+            yield from align_blocks(read_blocks(f, block_size=block_size))
+        return
+
+    if use_mmap and compression is None:
+        yield from map_line_blocks(path, start, end, block_size)
+        return
+
+    with open_log(path, compression) as f:
+        if start:
+            f.seek(start)
+
+        blocks = read_blocks(f, end=end, block_size=block_size)
+        if compression is not None:
+            blocks = prefetch(blocks)
+
+        yield from align_blocks(blocks)
+
+
+def split_lines(blocks):
+    """Split blocks of complete lines into lines.
+
+    Args:
+        blocks (iterable): Blocks of complete lines as returned by read_line_blocks().
+
+    Yields:
+        bytes: Lines without the trailing newline.
+    """
+
+    for block in blocks:
+        lines = bytes(block).split(b'\n')
+
+        # the block ends with a newline, except for the last line of a file
+        if not lines[-1]:
+            lines.pop()
+
+        yield from lines
+
+
+class RangeReader(io.RawIOBase):
+    """Raw binary reader limited to a byte range of a file.
+
+    Allows libraries that always read until the end of a file (like pandas) to read just a part of it.
+    """
+
+    def __init__(self, path, start = 0, end = None):
+        """Open a file and seek to the start of the byte range.
+
+        Args:
+            path (str): Path to the file.
+            start (int, optional): Byte offset to start reading at. Defaults to 0.
+            end (int, optional): Byte offset to stop reading at. Defaults to None, which means the end of the file.
+        """
+
+        super().__init__()
+        self.f = open(path, 'rb')
+        self.f.seek(start)
+        self.remaining = None if end is None else end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = len(buffer) if self.remaining is None else min(len(buffer), self.remaining)
+        if size <= 0:
+            return 0
+
+        read = self.f.readinto(memoryview(buffer)[:size])
+        if self.remaining is not None:
+            self.remaining -= read
+        return read
+
+    def close(self):
+        self.f.close()
+        super().close()
+
+
+def open_range(path, start = 0, end = None):
+    """Open a byte range of a file for buffered reading.
+
+    Args:
+        path (str): Path to the file.
+        start (int, optional): Byte offset to start reading at. Defaults to 0.
+        end (int, optional): Byte offset to stop reading at. Defaults to None, which means the end of the file.
+
+    Returns:
+        io.BufferedReader: Buffered reader of the byte range.
+    """
+
+    return io.BufferedReader(RangeReader(path, start, end), buffer_size=BLOCK_SIZE)
+
+
+def find_last_line_end(path, size):
+    """Find the end of the last complete line of a file.
+
+    Args:
+        path (str): Path to the file.
+        size (int): Size of the file to consider, data written after it is ignored.
+
+    Returns:
+        int: Byte offset right after the last newline or 0 if there is no complete line.
+    """
+
+    with open(path, 'rb') as f:
+        position = size
+
+        # search for the last newline backwards, one block at a time
+        while position > 0:
+            start = max(0, position - BLOCK_SIZE)
+            f.seek(start)
+            index = f.read(position - start).rfind(b'\n')
+            if index >= 0:
+                return start + index + 1
+            position = start
+
+    return 0
+
+
+def parse_time(value):
+    """Parse a point in time given as an epoch time or an ISO 8601 date and time (local time unless a timezone is given).
+
+    Args:
+        value (str): The point in time.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not valid.
+
+    Returns:
+        float: Epoch time.
+    """
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid time \'{value}\' (use an epoch time or for example 2020-01-23T14:00)')
+
+
+def parse_epoch(line):
+    """Get the epoch time of a log line in whole seconds.
+
+    Args:
+        line (bytes): The log line.
+
+    Returns:
+        int: Epoch time or None if the line does not start with a timestamp.
+    """
+
+    try:
+        return int(line.split(None, 1)[0].split(b'.')[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def read_epoch(f, offset):
+    """Get the epoch time of the first log line with a timestamp at or after an offset.
+
+    Args:
+        f (io.BufferedReader): File opened in binary mode.
+        offset (int): Byte offset of a line start.
+
+    Returns:
+        int: Epoch time or None if there is no such line.
+    """
+
+    f.seek(offset)
+    for line in f:
+        epoch = parse_epoch(line)
+        if epoch is not None:
+            return epoch
+
+    return None
+
+
+def search_epoch(f, size, epoch):
+    """Binary search a log file sorted by time for the first line at or after an epoch time.
+
+    Args:
+        f (io.BufferedReader): File opened in binary mode.
+        size (int): Size of the file.
+        epoch (float): The epoch time.
+
+    Returns:
+        tuple: Line starts before and after the searched line, at most about TIME_SEARCH_GRANULARITY bytes apart.
+    """
+
+    low = 0
+    high = size
+
+    # lines before low are earlier than the epoch time, the line at high is not
+    while high - low > TIME_SEARCH_GRANULARITY:
+        middle = find_line_start(f, (low + high) // 2)
+        if middle >= high:
+            break
+
+        middle_epoch = read_epoch(f, middle)
+        if middle_epoch is not None and middle_epoch < epoch:
+            low = middle
+        else:
+            high = middle
+
+    return find_line_start(f, low), min(find_line_start(f, high), size)
+
+
+def find_time_range(path, since = None, until = None):
+    """Find the byte range of a log file with events of a time window.
+
+    Log files are sorted by time, so the range is found by binary search. Events can be TIME_SLACK seconds
+    out of order, so the range is a little wider and the events still have to be filtered by the parsers.
+
+    Args:
+        path (str): Path to the file.
+        since (float, optional): Start of the time window. Defaults to None.
+        until (float, optional): End of the time window (exclusive). Defaults to None.
+
+    Returns:
+        tuple: Range in the form of (start, end) or None if the file has no events in the window.
+            The end of None means the end of the file.
+    """
+
+    # compressed files can not be searched, they are only skipped if they start after the window
+    compression = detect_compression(path)
+    if compression:
+        with open_log(path, compression) as f:
+            first_epoch = read_epoch(f, 0)
+        if first_epoch is not None and until is not None and first_epoch >= until + TIME_SLACK:
+            return None
+        return 0, None
+
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        first_epoch = read_epoch(f, 0)
+        last_epoch = read_epoch(f, find_line_start(f, max(0, size - TIME_SEARCH_GRANULARITY)))
+        if first_epoch is None:
+            return None
+
+        # the last line with a timestamp is near the end of the file
+        for line in f:
+            epoch = parse_epoch(line)
+            if epoch is not None:
+                last_epoch = epoch
+
+        # skip files outside of the window without reading them, the end is unknown if no line near it has a timestamp
+        if since is not None and last_epoch is not None and last_epoch < since - TIME_SLACK:
+            return None
+        if until is not None and first_epoch >= until + TIME_SLACK:
+            return None
+
+        start = search_epoch(f, size, since - TIME_SLACK)[0] if since is not None else 0
+        end = search_epoch(f, size, until + TIME_SLACK)[1] if until is not None else size
+
+    logger.debug(f'Time window of file \'{path}\' is in bytes {start}-{end} of {size}.')
+
+    return start, end
+
+
+def get_peak_rss(children = False):
+    """Get the peak resident set size of the current process.
+
+    Args:
+        children (bool, optional): Get the largest peak of finished child processes (workers) instead. Defaults to False.
+
+    Returns:
+        int: Peak resident set size in bytes or None if it is not available on this platform.
+    """
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak_rss = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+
+    # the value is in bytes on macOS and in kilobytes elsewhere
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def get_cpu_time():
+    """Get the CPU time used by the current process and its finished child processes (workers).
+
+    Returns:
+        float: CPU time in seconds.
+    """
+
+    try:
+        import resource
+    except ImportError:
+        return time.process_time()
+
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def start_phase():
+    """Start measuring a phase of the analysis.
+
+    Returns:
+        tuple: Wall clock and CPU time at the start of the phase.
+    """
+
+    return time.perf_counter(), get_cpu_time()
+
+
+def end_phase(phases, name, started):
+    """Add the time since the start of a phase to the phase.
+
+    Args:
+        phases (dict): Wall clock and CPU times of phases in seconds by their names. It is modified in place.
+        name (str): Name of the phase.
+        started (tuple): Times returned by start_phase().
+    """
+
+    phase = phases.setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+    phase['wall'] += time.perf_counter() - started[0]
+    phase['cpu'] += get_cpu_time() - started[1]
+
+
+def measure_iterator(iterable, phases, name):
+    """Pass on the items of an iterable and add the time spent getting them to a phase.
+
+    Args:
+        iterable (iterable): Measured iterable, like the files being discovered.
+        phases (dict): Wall clock and CPU times of phases in seconds by their names. It is modified in place.
+        name (str): Name of the phase.
+
+    Yields:
+        object: Items of the iterable.
+    """
+
+    iterator = iter(iterable)
+    while True:
+        started = start_phase()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            end_phase(phases, name, started)
+
+        yield item
+
+
+def measure_task(task, parse_file = None, **kwargs):
+    """Analyze a task and collect statistics of its analysis.
+
+    Args:
+        task (tuple): Task in the form of (path, start, end). The end of None means the end of the file.
+        parse_file (function): Function analyzing the task and returning a partial aggregate.
+        **kwargs: Options passed to the function.
+
+    Returns:
+        dict: Partial aggregate of the task with a list of statistics of the task under the 'tasks' key.
+    """
+
+    path, start, end = task
+    wall = time.perf_counter()
+    cpu = time.process_time()
+
+    partial = parse_file(task, **kwargs)
+
+    # compressed files are measured by the bytes read from the disk, segments of stores by the size of their columns
+    if os.path.isdir(path):
+        size = sum(entry.stat().st_size for entry in os.scandir(path))
+    else:
+        size = (os.path.getsize(path) if end is None else end) - start
+
+    partial['tasks'] = [{
+        'path': path,
+        'bytes': size,
+        'lines': partial['lines'],
+        'matched': partial['events'],
+        'wall': time.perf_counter() - wall,
+        'cpu': time.process_time() - cpu
+    }]
+
+    return partial
+
+
+def summarize_stats(phases, tasks):
+    """Summarize the statistics of the analysis for the _meta section of the results.
+
+    Args:
+        phases (dict): Wall clock and CPU times of phases in seconds by their names.
+        tasks (list): Statistics of analyzed tasks as returned by measure_task().
+
+    Returns:
+        dict: Statistics of the phases, the analyzed files and of all of the analyzed data.
+    """
+
+    # byte ranges of split files are summed up
+    files = {}
+    for task in tasks:
+        stats = files.setdefault(task['path'], {'path': task['path'], 'bytes': 0, 'lines': 0, 'matched': 0, 'skipped': 0, 'wall': 0.0, 'cpu': 0.0, 'cached': task.get('cached', False)})
+        for key in ('bytes', 'lines', 'matched', 'wall', 'cpu'):
+            stats[key] += task[key]
+        stats['skipped'] = stats['lines'] - stats['matched']
+
+    total_bytes = sum(stats['bytes'] for stats in files.values())
+    total_lines = sum(stats['lines'] for stats in files.values())
+    matched = sum(stats['matched'] for stats in files.values())
+    seconds = phases.get('analysis', {}).get('wall')
+
+    # cached files are not read by this run
+    read_bytes = sum(stats['bytes'] for stats in files.values() if not stats['cached'])
+    read_lines = sum(stats['lines'] for stats in files.values() if not stats['cached'])
+
+    return {
+        'phases': phases,
+        'bytes': total_bytes,
+        'lines': total_lines,
+        'matched': matched,
+        'skipped': total_lines - matched,
+        'throughput': {
+            'lines_per_second': read_lines / seconds if seconds else None,
+            'mb_per_second': read_bytes / seconds / 1024 / 1024 if seconds else None
+        },
+        'peak_rss': get_peak_rss(),
+        'peak_rss_workers': get_peak_rss(children=True),
+        'files': list(files.values())
+    }
+
+
+def plan_tasks(to_process, jobs, split_files = True, since = None, until = None):
+    """Split the files to process into tasks for the workers.
+
+    Big files are split at line boundaries into byte ranges, so even a single file can be analyzed in parallel.
+    When a time window is given, only the byte ranges of files with events in the window are analyzed.
+
+    Args:
+        to_process (list): List of file paths to analyze.
+        jobs (int): Number of worker processes.
+        split_files (bool, optional): Whether big files can be split into byte ranges. Defaults to True.
+        since (float, optional): Start of the time window. Defaults to None.
+        until (float, optional): End of the time window (exclusive). Defaults to None.
+
+    Returns:
+        list: List of tasks in the form of (path, start, end) tuples. The end of None means the end of the file.
+    """
+
+    # narrow the files down to the time window
+    ranges = {f: (0, None) for f in to_process}
+    if since is not None or until is not None:
+        ranges = {f: find_time_range(f, since, until) for f in to_process}
+        to_process = [f for f in to_process if ranges[f] is not None and ranges[f][0] != ranges[f][1]]
+
+    if jobs <= 1 or not split_files:
+        return [(f, *ranges[f]) for f in to_process]
+
+    ends = {f: ranges[f][1] if ranges[f][1] is not None else os.path.getsize(f) for f in to_process}
+    chunk_size = max(MIN_CHUNK_SIZE, sum(ends[f] - ranges[f][0] for f in to_process) // (jobs * 4))
+
+    tasks = []
+    for f in to_process:
+        start = ranges[f][0]
+
+        # compressed files can not be split
+        if ends[f] - start <= chunk_size or detect_compression(f):
+            tasks.append((f, *ranges[f]))
+            continue
+
+        # split the file at line boundaries
+        with open(f, 'rb') as ff:
+            boundaries = [start]
+            for offset in range(start + chunk_size, ends[f], chunk_size):
+                line_start = find_line_start(ff, offset)
+                if line_start > boundaries[-1] and line_start < ends[f]:
+                    boundaries.append(line_start)
+            boundaries.append(ends[f])
+
+        for start, end in zip(boundaries, boundaries[1:]):
+            tasks.append((f, start, end))
+
+    return tasks
+
+
+def stream_tasks(files, jobs, split_files = True, since = None, until = None):
+    """Plan tasks of files one file at a time, as they are discovered.
+
+    Args:
+        files (iterable): Iterator of file paths to analyze.
+        jobs (int): Number of worker processes.
+        split_files (bool, optional): Whether big files can be split into byte ranges. Defaults to True.
+        since (float, optional): Start of the time window. Defaults to None.
+        until (float, optional): End of the time window (exclusive). Defaults to None.
+
+    Yields:
+        tuple: Tasks in the form of (path, start, end).
+    """
+
+    for f in files:
+        yield from plan_tasks([f], jobs, split_files=split_files, since=since, until=until)
+
+
+class PrefetchedPath(str):
+    """Path of a log file carrying the data of a task read ahead of its analysis.
+
+    It is used as the path of the task, so parsers can still use it as a path, but read the data from memory.
+    """
+
+    def __new__(cls, path, data, compression = None):
+        prefetched = super().__new__(cls, path)
+        prefetched.data = data
+        prefetched.compression = compression
+        return prefetched
+
+    def __reduce__(self):
+        return PrefetchedPath, (str(self), self.data, self.compression)
+
+
+def read_task(task, max_size = PREFETCH_MAX_SIZE):
+    """Read the data of a task into memory.
+
+    Args:
+        task (tuple): Task in the form of (path, start, end). The end of None means the end of the file.
+        max_size (int, optional): Tasks bigger than this are not read. Defaults to PREFETCH_MAX_SIZE.
+
+    Returns:
+        tuple: The task with a PrefetchedPath, or the original task if it is too big or can not be read.
+    """
+
+    path, start, end = task
+
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            stop = size if end is None else min(end, size)
+            if stop - start > max_size:
+                return task
+
+            f.seek(start)
+            data = f.read(stop - start)
+    except OSError:
+        # the parser reports the error
+        return task
+
+    # compressed files are never split, so only data from the start of a file can be compressed
+    compression = match_compression(data[:6]) if not start else None
+
+    return PrefetchedPath(path, data, compression), start, end
+
+
+def prefetch_tasks(tasks, depth, max_size = PREFETCH_MAX_SIZE):
+    """Read the data of the next tasks concurrently, ahead of their analysis.
+
+    Reading files on network filesystems is mostly waiting for the network, so reading many files at once hides
+    the latency. At most depth tasks are read ahead, the memory used is bounded by depth times max_size.
+
+    Args:
+        tasks (iterable): List or iterator of tasks in the form of (path, start, end).
+        depth (int): Number of tasks read concurrently and ahead of the analysis.
+        max_size (int, optional): Bigger tasks are not read ahead, they are streamed by the parsers. Defaults to PREFETCH_MAX_SIZE.
+
+    Yields:
+        tuple: Tasks in the original order, read tasks with a PrefetchedPath.
+    """
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=depth) as executor:
+        pending = collections.deque()
+        for task in tasks:
+            pending.append(executor.submit(read_task, task, max_size))
+            if len(pending) > depth:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def map_tasks(worker, tasks, jobs = 1, **kwargs):
+    """Analyze all tasks, in parallel if more jobs are allowed.
+
+    Args:
+        worker (function): Function analyzing a single task and returning a partial aggregate.
+        tasks (iterable): List or iterator of tasks to analyze. Tasks of an iterator are analyzed as they come.
+        jobs (int, optional): Number of worker processes. Defaults to 1.
+        **kwargs: Options passed to the worker.
+
+    Yields:
+        dict: Partial aggregates in the order of tasks.
+    """
+
+    task_worker = functools.partial(worker, **kwargs)
+
+    # analyze in this process
+    if jobs <= 1 or (isinstance(tasks, list) and len(tasks) <= 1):
+        for task in tasks:
+            yield task_worker(task)
+        return
+
+    # tasks are submitted while the iterator is consumed, so workers start before all tasks are known
+    workers = min(jobs, len(tasks)) if isinstance(tasks, list) else jobs
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        # only a few tasks per worker are submitted ahead, so the iterator is not consumed faster than the tasks are analyzed
+        pending = collections.deque()
+        for task in tasks:
+            pending.append(executor.submit(task_worker, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def map_partials(worker, tasks, jobs = 1, **kwargs):
+    """Analyze all tasks and merge their partial aggregates.
+
+    Args:
+        worker (function): Function analyzing a single task and returning a partial aggregate.
+        tasks (list): List of tasks to analyze.
+        jobs (int, optional): Number of worker processes. Defaults to 1.
+        **kwargs: Options passed to the worker.
+
+    Returns:
+        dict: Merged partial aggregate.
+    """
+
+    partial = new_partial()
+
+    # results are merged in the order of tasks, so the result is the same as when analyzing serially
+    for task_partial in map_tasks(worker, tasks, jobs=jobs, **kwargs):
+        merge_partials(partial, task_partial)
+
+    return partial
+
+
+def parse_file_pandas(task, operations, chunk_rows = PANDAS_CHUNK_ROWS):
+    """Parse and analyze a single file with pandas.
+
+    The file is read in chunks of rows, every chunk is reduced to a partial aggregate and then discarded.
+
+    Args:
+        task (tuple): Task in the form of (path, start, end). The end of None means the end of the file.
+        operations (dict): Operations to analyze (see DEFAULT_OPERATIONS), missing ones are not analyzed.
+        chunk_rows (int, optional): Number of rows read at once. Defaults to PANDAS_CHUNK_ROWS.
+
+    Returns:
+        dict: Partial aggregate of the file.
+    """
+
+    import numpy
+    import pandas
+
+    operations = dict(DEFAULT_OPERATIONS, **operations)
+    since = operations['since']
+    until = operations['until']
+    timeseries = operations['timeseries']
+    exclude_header_sizes = operations['exclude_header_sizes']
+    ip_capacity = operations['ip_capacity']
+
+    partial = new_partial()
+    ip_tables = []
+
+    count_ips = operations['mfip'] or operations['lfip'] or operations['top'] or operations['bottom']
+    sketches = {field: new_hll(operations['hll_precision']) for field in operations['distinct']}
+
+    plan = plan_groups(operations)
+    group_tables = [{} for _ in plan['groupings']]
+
+    # only read the columns needed by the selected operations
+    columns = set()
+    if operations['eps'] or timeseries or since is not None or until is not None:
+        columns.add('Timestamp')
+    if operations['count_bytes'] or timeseries:
+        columns.add('Body size')
+        if not exclude_header_sizes:
+            columns.add('Headers size')
+    if count_ips:
+        columns.add('Source IP address')
+    for field in operations['distinct']:
+        columns.add(LOG_COLUMNS[DISTINCT_FIELDS[field]])
+    columns.update(LOG_COLUMNS[index] for _, index, _ in plan['fields'])
+    if plan['sizes']:
+        columns.update(['Headers size', 'Body size'])
+
+    # at least one column is needed to count the events
+    if not columns:
+        columns.add('Timestamp')
+
+    # sizes are read as floats, so malformed lines with missing values do not break the analysis
+    dtypes = {column: dtype for column, dtype in LOG_COLUMN_DTYPES.items() if column in columns}
+
+    # keys of groups are always strings, even when all values look like numbers
+    dtypes.update((LOG_COLUMNS[index], 'object') for _, index, _ in plan['fields'])
+
+    # byte ranges are read through a limited reader, whole files are opened (and decompressed) by pandas
+    path, start, end = task
+    if isinstance(path, PrefetchedPath):
+        source = io.BytesIO(path.data)
+        compression = path.compression
+    elif start or end is not None:
+        source = open_range(path, start, end)
+        compression = None
+    else:
+        source = path
+        compression = detect_compression(path)
+
+    # read data from log file
+    chunks = pandas.read_csv(source, delimiter=r'\s+', usecols=[LOG_COLUMNS.index(c) for c in sorted(columns, key=LOG_COLUMNS.index)], names=LOG_COLUMNS, dtype=dtypes, skip_blank_lines=True, chunksize=chunk_rows, compression=compression)
+
+    try:
+        for data in chunks:
+            partial['lines'] += len(data)
+
+            # skip events outside of the time window, compared in whole seconds like the other parsers do
+            if since is not None:
+                data = data[numpy.floor(data['Timestamp']) >= since]
+            if until is not None:
+                data = data[numpy.floor(data['Timestamp']) < until]
+
+            chunk_partial = new_partial()
+            chunk_partial['events'] = len(data)
+            if not len(data):
+                continue
+
+            # count the number of bytes transmitted
+            if operations['count_bytes']:
+                chunk_partial['bytes_body'] = int(data[data['Body size'] > 0]['Body size'].sum())
+
+                if not exclude_header_sizes:
+                    chunk_partial['bytes_headers'] = int(data[data['Headers size'] > 0]['Headers size'].sum())
+
+            # count the occurence of source IP addresses in the order of their first occurence
+            if count_ips:
+                counts = data['Source IP address'].value_counts(sort=False)
+                frequencies = dict(zip(counts.index.tolist(), counts.tolist()))
+                add_ip_table(ip_tables, pack_ip_frequencies(frequencies, capacity=ip_capacity))
+
+            # add the events of the chunk to their groups, missing and negative sizes are not counted
+            if plan['groupings']:
+                sizes = pandas.DataFrame(index=data.index)
+                if plan['sizes']:
+                    sizes['headers'] = data['Headers size'].fillna(0).clip(lower=0).astype('int64')
+                    sizes['body'] = data['Body size'].fillna(0).clip(lower=0).astype('int64')
+                    sizes['bytes'] = sizes['body'] if plan['exclude_header_sizes'] else sizes['headers'] + sizes['body']
+                    sizes['elapsed'] = sizes['headers']
+
+                # fields are extracted once per distinct value of a chunk
+                keys = {}
+                for field, index, extract in plan['fields']:
+                    keys[field] = data[LOG_COLUMNS[index]]
+                    if extract is not None:
+                        keys[field] = keys[field].map({value: extract(value) for value in keys[field].dropna().unique()})
+
+                for table, (fields, _, columns) in zip(group_tables, plan['groupings']):
+                    key_columns = [keys[key_field] for key_field in fields]
+                    grouped = sizes.groupby(key_columns, sort=False)
+
+                    aggregated = []
+                    for function, field in columns:
+                        if function == 'count':
+                            aggregated.append(grouped.size())
+                        elif function == 'hist':
+                            # count the events of every pair of a group and a bucket
+                            counts = sizes.groupby(key_columns + [histogram_buckets(numpy, sizes[field].to_numpy())], sort=False).size()
+                            histograms = {}
+                            for key, count in zip(counts.index, counts.tolist()):
+                                histograms.setdefault(key[:-1] if len(fields) > 1 else key[0], {})[int(key[-1])] = count
+                            aggregated.append([histograms[key] for key in aggregated[0].index])
+                        else:
+                            aggregated.append(grouped[field].agg(function))
+
+                    for key, row in zip(aggregated[0].index, zip(*(column if isinstance(column, list) else column.tolist() for column in aggregated))):
+                        add_group_row(table, key if isinstance(key, tuple) else (key,), row, columns)
+
+            # add distinct values of the chunk to the sketches
+            for field, registers in sketches.items():
+                add_distinct(registers, field, data[LOG_COLUMNS[DISTINCT_FIELDS[field]]].dropna().unique())
+
+            # keep the epoch time start and end of all events, events are grouped by whole seconds
+            if operations['eps'] or timeseries:
+                chunk_partial['epoch_start'] = int(data['Timestamp'].min())
+                chunk_partial['epoch_end'] = int(data['Timestamp'].max())
+
+            # add the events and their bytes to their seconds, missing and negative sizes are not counted
+            if timeseries:
+                timed = data[data['Timestamp'].notna()]
+                sizes = timed['Body size'].fillna(0).clip(lower=0)
+                if not exclude_header_sizes:
+                    sizes = sizes + timed['Headers size'].fillna(0).clip(lower=0)
+                chunk_partial['seconds'] = reduce_seconds(timed['Timestamp'].to_numpy().astype('int64'), numpy.ones(len(timed), dtype=numpy.int64), sizes.to_numpy().astype('int64'))
+
+            merge_partials(partial, chunk_partial)
+    finally:
+        # close the limited reader, pandas closes the files it opened
+        chunks.close()
+        if source is not path:
+            source.close()
+
+    partial['ip_frequencies'] = merge_ip_tables(ip_tables)
+    partial['distinct'] = sketches
+
+    if plan['groupings']:
+        partial['groups'] = pack_groups(plan, group_tables, lambda field, value: value)
+
+    return partial
+
+
+def parse_file_regex(task, operations, block_size = BLOCK_SIZE, use_mmap = True):
+    """Parse and analyze a single file or a byte range of a file with regex.
+
+    Args:
+        task (tuple): Task in the form of (path, start, end). The end of None means the end of the file.
+        operations (dict): Operations to analyze (see DEFAULT_OPERATIONS), missing ones are not analyzed.
+        block_size (int, optional): Size of blocks read from the file in bytes. Defaults to BLOCK_SIZE.
+        use_mmap (bool, optional): Whether to memory-map uncompressed files. Defaults to True.
+
+    Returns:
+        dict: Partial aggregate of the file.
+    """
+
+    path, start, end = task
+
+    # operations are looked up once, not for every line
+    operations = dict(DEFAULT_OPERATIONS, **operations)
+    eps = operations['eps']
+    timeseries = operations['timeseries']
+    count_bytes = operations['count_bytes']
+    exclude_header_sizes = operations['exclude_header_sizes']
+    ip_capacity = operations['ip_capacity']
+    since = operations['since']
+    until = operations['until']
+
+    partial = new_partial()
+    ip_frequencies = {}
+    ip_error = 0
+    ip_tables = []
+
+    # approximate counting prunes the counted addresses when there are twice as many as kept
+    count_ips = operations['mfip'] or operations['lfip'] or operations['top'] or operations['bottom']
+    prune_size = 2 * ip_capacity if ip_capacity else sys.maxsize
+
+    # distinct values are collected in sets and added to the sketches in batches
+    sketches = {field: new_hll(operations['hll_precision']) for field in operations['distinct']}
+    pending = [(field, DISTINCT_FIELDS[field], set()) for field in operations['distinct']]
+
+    # events and bytes of every second of the time series
+    second_events = {}
+    second_bytes = {}
+
+    # rows of groups by their raw keys, which are decoded once per file
+    plan = plan_groups(operations)
+    group_tables = [{} for _ in plan['groupings']]
+    group_batch = new_group_batch(plan)
+
+    # events outside of the time window are skipped
+    filter_time = since is not None or until is not None
+    window_start = since if since is not None else -math.inf
+    window_end = until if until is not None else math.inf
+
+    parse_epochs = eps or timeseries or filter_time
+    parse_bodies = count_bytes or timeseries
+    count_headers = parse_bodies and not exclude_header_sizes
+
+    line_num = 0
+    event_num = 0
+    epoch_start = None
+    epoch_end = 0
+    bytes_body = 0
+    bytes_headers = 0
+
+    # too slow regex
+    #regex_timestmap = r'(\d+.?\d+?)'
+    #regex_ip = r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
+    #regex_http_method = r'(CONNECT|HEAD|OPTIONS|GET|POST|PUT|DELETE|PATCH|TRACE)'
+    #regex_url = r'(((http|https)\:\/\/)?[a-zA-Z0-9\.\/\?\:@\-_=#]+\.([a-zA-Z]){2,6}([a-zA-Z0-9\.\&\/\?\:@\-_=#])*)'
+    # regex = re.compile(r'^' + regex_timestmap + r'\s+(\-?\d+)\s+' + regex_ip + r'\s+([A-Z0-9_/]+)\s+\-?(\d+)\s+' + regex_http_method + r'\s+' + regex_url + r'\s+([a-zA-Z\-_]+)\s+(([A-Z_/]+)' + regex_ip + r')\s+([a-z\-/]+)$')
+    
+    # the regex below this comment should be used, but it does not process a row that has more than 10 fields
+    # https://www.secrepo.com/squid/access.log.gz on line 82948 has two log events merged into one line
+    # and that yields different results, because without the --fast option, it also processes that line
+    # regex = re.compile(r'^(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)$')
+
+    # simpler regex is much faster
+    regex = re.compile(rb'^(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+).*')
+
+    # read data from log file, go through all lines
+    for line in split_lines(read_line_blocks(path, start, end, block_size=block_size, use_mmap=use_mmap)):
+        line_num += 1
+
+        # try to match regex pattern
+        match = regex.search(line)
+
+        # if the line does not match, skip it
+        if not match:
+            continue
+
+        # skip lines with invalid numbers
+        try:
+            if parse_epochs:
+                epoch = int(match.groups()[0].split(b'.')[0])
+            if parse_bodies or plan['sizes']:
+                body = int(match.groups()[4])
+            if count_headers or plan['sizes']:
+                headers = int(match.groups()[1])
+        except ValueError:
+            continue
+
+        if parse_epochs:
+            # skip events outside of the time window
+            if filter_time and not window_start <= epoch < window_end:
+                continue
+
+            # keep the epoch time start and end of all events
+            if not epoch_start or epoch_start > epoch:
+                epoch_start = epoch
+            if epoch > epoch_end:
+                epoch_end = epoch
+
+        # count events
+        event_num += 1
+
+        # count the frequency for IPs
+        if count_ips:
+            if not match.groups()[2] in ip_frequencies:
+                ip_frequencies[match.groups()[2]] = 1
+                if len(ip_frequencies) > prune_size:
+                    ip_error += prune_frequencies(ip_frequencies, ip_capacity)
+                elif len(ip_frequencies) >= IP_BATCH:
+                    add_ip_table(ip_tables, pack_ip_frequencies(ip_frequencies, capacity=ip_capacity, error=ip_error))
+                    ip_frequencies = {}
+                    ip_error = 0
+            else:
+                ip_frequencies[match.groups()[2]] += 1
+
+        # add the event to its groups
+        if plan['groupings']:
+            add_group_event(group_tables, plan, group_batch, match.groups())
+
+        for field, index, values in pending:
+            values.add(match.groups()[index])
+            if len(values) >= DISTINCT_BATCH:
+                add_distinct(sketches[field], field, values)
+                values.clear()
+
+        # add bytes from header and body
+        if parse_bodies:
+            # sometimes the value can be -1
+            body = body if body > 0 else 0
+            headers = headers if count_headers and headers > 0 else 0
+            bytes_body += body
+            bytes_headers += headers
+
+            # add the event and its bytes to its second
+            if timeseries:
+                second_events[epoch] = second_events.get(epoch, 0) + 1
+                second_bytes[epoch] = second_bytes.get(epoch, 0) + body + headers
+
+    # IP addresses are counted in dicts that are packed into tables every IP_BATCH addresses
+    add_ip_table(ip_tables, pack_ip_frequencies(ip_frequencies, capacity=ip_capacity, error=ip_error))
+    partial['ip_frequencies'] = merge_ip_tables(ip_tables)
+
+    for field, index, values in pending:
+        add_distinct(sketches[field], field, values)
+    partial['distinct'] = sketches
+
+    partial['events'] = event_num
+    partial['lines'] = line_num
+    partial['bytes_body'] = bytes_body
+    partial['bytes_headers'] = bytes_headers
+    partial['seconds'] = pack_seconds(second_events, second_bytes)
+
+    if plan['groupings']:
+        add_group_batch(group_tables, plan, group_batch)
+        partial['groups'] = pack_groups(plan, group_tables, lambda field, value: value if field in GROUP_EXTRACTORS else value.decode(errors='replace'))
+
+    if (eps or timeseries) and event_num:
+        partial['epoch_start'] = epoch_start
+        partial['epoch_end'] = epoch_end
+
+    return partial
+
+
+def parse_file_split(task, operations, block_size = BLOCK_SIZE, use_mmap = True):
+    """Parse and analyze a single file or a byte range of a file by splitting lines on whitespace.
+
+    Lines are handled the same way as by the regex parser - lines with less than 10 fields are skipped and
+    fields after the 10th (merged or overlong lines) are ignored. Only the fields needed are converted.
+
+    Args:
+        task (tuple): Task in the form of (path, start, end). The end of None means the end of the file.
+        operations (dict): Operations to analyze (see DEFAULT_OPERATIONS), missing ones are not analyzed.
+        block_size (int, optional): Size of blocks read from the file in bytes. Defaults to BLOCK_SIZE.
+        use_mmap (bool, optional): Whether to memory-map uncompressed files. Defaults to True.
+
+    Returns:
+        dict: Partial aggregate of the file.
+    """
+
+    path, start, end = task
+
+    # operations are looked up once, not for every line
+    operations = dict(DEFAULT_OPERATIONS, **operations)
+    eps = operations['eps']
+    timeseries = operations['timeseries']
+    count_bytes = operations['count_bytes']
+    exclude_header_sizes = operations['exclude_header_sizes']
+    ip_capacity = operations['ip_capacity']
+    since = operations['since']
+    until = operations['until']
+
+    partial = new_partial()
+    ip_frequencies = {}
+    ip_error = 0
+    ip_tables = []
+
+    # events and bytes of every second of the time series
+    second_events = {}
+    second_bytes = {}
+
+    line_num = 0
+    event_num = 0
+    epoch_start = None
+    epoch_end = None
+    bytes_body = 0
+    bytes_headers = 0
+
+    # approximate counting prunes the counted addresses when there are twice as many as kept
+    count_ips = operations['mfip'] or operations['lfip'] or operations['top'] or operations['bottom']
+    prune_size = 2 * ip_capacity if ip_capacity else sys.maxsize
+    # events outside of the time window are skipped
+    filter_time = since is not None or until is not None
+    window_start = since if since is not None else -math.inf
+    window_end = until if until is not None else math.inf
+
+    parse_epochs = eps or timeseries or filter_time
+    parse_bodies = count_bytes or timeseries
+    count_headers = parse_bodies and not exclude_header_sizes
+
+    # distinct values are collected in sets and added to the sketches in batches
+    sketches = {field: new_hll(operations['hll_precision']) for field in operations['distinct']}
+    pending = [(field, DISTINCT_FIELDS[field], set()) for field in operations['distinct']]
+
+    # rows of groups by their raw keys, which are decoded once per file
+    plan = plan_groups(operations)
+    group_tables = [{} for _ in plan['groupings']]
+    group_batch = new_group_batch(plan)
+    group_mimetypes = any(index == GROUP_FIELDS['mimetype'] for _, index, _ in plan['fields'])
+
+    # read data from log file, go through all lines
+    for line in split_lines(read_line_blocks(path, start, end, block_size=block_size, use_mmap=use_mmap)):
+        line_num += 1
+
+        # the 10th item holds the rest of the line, so there are at least 10 fields if it exists
+        fields = line.split(None, 9)
+
+        # skip lines with too few fields or starting with whitespace, like the regex does
+        if len(fields) < 10 or line[:1].isspace():
+            continue
+
+        # skip lines with invalid numbers, ints are parsed from bytes directly
+        try:
+            if parse_epochs:
+                timestamp = fields[0]
+                dot = timestamp.find(b'.')
+                epoch = int(timestamp[:dot] if dot >= 0 else timestamp)
+            if parse_bodies or plan['sizes']:
+                body = int(fields[4])
+            if count_headers or plan['sizes']:
+                headers = int(fields[1])
+        except ValueError:
+            continue
+
+        if parse_epochs:
+            # skip events outside of the time window
+            if filter_time and not window_start <= epoch < window_end:
+                continue
+
+            # keep the epoch time start and end of all events
+            if epoch_start is None or epoch_start > epoch:
+                epoch_start = epoch
+            if epoch_end is None or epoch > epoch_end:
+                epoch_end = epoch
+
+        # count events
+        event_num += 1
+
+        # count the frequency for IPs
+        if count_ips:
+            ip = fields[2]
+            ip_frequencies[ip] = ip_frequencies.get(ip, 0) + 1
+            if len(ip_frequencies) > prune_size:
+                ip_error += prune_frequencies(ip_frequencies, ip_capacity)
+            elif len(ip_frequencies) >= IP_BATCH:
+                add_ip_table(ip_tables, pack_ip_frequencies(ip_frequencies, capacity=ip_capacity, error=ip_error))
+                ip_frequencies = {}
+                ip_error = 0
+
+        # add the event to its groups, the mimetype is the first field of the rest of the line
+        if plan['groupings']:
+            if group_mimetypes:
+                fields[9] = fields[9].split(None, 1)[0]
+            add_group_event(group_tables, plan, group_batch, fields)
+
+        for field, index, values in pending:
+            values.add(fields[index])
+            if len(values) >= DISTINCT_BATCH:
+                add_distinct(sketches[field], field, values)
+                values.clear()
+
+        # add bytes from header and body, sometimes the value can be -1
+        if parse_bodies:
+            if body > 0:
+                bytes_body += body
+            else:
+                body = 0
+
+            if count_headers:
+                if headers > 0:
+                    bytes_headers += headers
+                    body += headers
+
+            # add the event and its bytes to its second
+            if timeseries:
+                second_events[epoch] = second_events.get(epoch, 0) + 1
+                second_bytes[epoch] = second_bytes.get(epoch, 0) + body
+
+    # IP addresses are counted in dicts that are packed into tables every IP_BATCH addresses
+    add_ip_table(ip_tables, pack_ip_frequencies(ip_frequencies, capacity=ip_capacity, error=ip_error))
+    partial['ip_frequencies'] = merge_ip_tables(ip_tables)
+
+    for field, index, values in pending:
+        add_distinct(sketches[field], field, values)
+    partial['distinct'] = sketches
+
+    partial['events'] = event_num
+    partial['lines'] = line_num
+    partial['bytes_body'] = bytes_body
+    partial['bytes_headers'] = bytes_headers
+    partial['seconds'] = pack_seconds(second_events, second_bytes)
+
+    if plan['groupings']:
+        add_group_batch(group_tables, plan, group_batch)
+        partial['groups'] = pack_groups(plan, group_tables, lambda field, value: value if field in GROUP_EXTRACTORS else value.decode(errors='replace'))
+
+    if parse_epochs:
+        partial['epoch_start'] = epoch_start
+        partial['epoch_end'] = epoch_end
+
+    return partial
+
+
+def locate_fields_numpy(numpy, data, fields):
+    """Locate fields of all lines in a block of data with NumPy.
+
+    Lines are handled the same way as by the regex parser - lines with less than 10 fields or starting with
+    whitespace are skipped and fields after the 10th are ignored.
+
+    Args:
+        numpy (module): The numpy module.
+        data (numpy.ndarray): Block of data as an array of bytes ending with a newline.
+        fields (list): Indexes of the fields to locate.
+
+    Returns:
+        tuple: Number of lines, number of valid lines and a dictionary of (starts, ends) arrays of offsets of the fields in valid lines.
+    """
+
+    # whitespace is ' ', '\t', '\n', '\v', '\f' and '\r', the block is surrounded by whitespace
+    space = numpy.ones(len(data) + 2, dtype=bool)
+    numpy.less_equal(data - numpy.uint8(9), 4, out=space[1:-1])
+    space[1:-1] |= data == 32
+
+    # fields start and end where whitespace changes to non-whitespace and back
+    changes = numpy.flatnonzero(space[1:] != space[:-1])
+    starts = changes[0::2]
+    ends = changes[1::2]
+
+    # index of the first field of every line
+    newlines = numpy.flatnonzero(data == 10)
+    line_starts = numpy.empty(len(newlines), dtype=numpy.int64)
+    line_starts[0] = 0
+    line_starts[1:] = newlines[:-1] + 1
+    first = numpy.searchsorted(starts, line_starts)
+    counts = numpy.diff(first, append=len(starts))
+
+    # lines need at least 10 fields and must not start with whitespace
+    valid = counts >= 10
+    valid[valid] = starts[first[valid]] == line_starts[valid]
+    first = first[valid]
+
+    return len(newlines), len(first), {field: (starts[first + field], ends[first + field]) for field in fields}
+
+
+def parse_integers_numpy(numpy, data, starts, ends, fraction = False):
+    """Convert fields of a block of data to integers with NumPy.
+
+    Fields are grouped by their length, so digits of every group can be converted with a single matrix product.
+    Fields which are not valid integers are masked, so their lines can be skipped like by the other parsers.
+
+    Args:
+        numpy (module): The numpy module.
+        data (numpy.ndarray): Block of data as an array of bytes.
+        starts (numpy.ndarray): Offsets of the starts of the fields.
+        ends (numpy.ndarray): Offsets of the ends of the fields.
+        fraction (bool, optional): Whether the fields can have a fractional part, which is cut off. Defaults to False.
+
+    Returns:
+        tuple: Array of int64 values (0 for invalid fields) and a boolean array of the valid fields.
+    """
+
+    values = numpy.zeros(len(starts), dtype=numpy.int64)
+    valid = numpy.ones(len(starts), dtype=bool)
+    if not len(starts):
+        return values, valid
+
+    # cut off everything from the decimal point
+    if fraction:
+        width = int((ends - starts).max())
+        index = starts[:, None] + numpy.arange(width)
+        dots = (data[numpy.minimum(index, len(data) - 1)] == 46) & (index < ends[:, None])
+        ends = numpy.where(dots.any(axis=1), starts + dots.argmax(axis=1), ends)
+
+    # skip the optional minus sign
+    negative = data[starts] == 45
+    digits_start = starts + negative
+    lengths = ends - digits_start
+
+    # fields without digits or with more digits than fit into int64 are invalid
+    valid &= (lengths > 0) & (lengths <= 18)
+
+    for length in numpy.unique(lengths[valid]).tolist():
+        selected = numpy.flatnonzero(lengths == length)
+        digits = data[digits_start[selected, None] + numpy.arange(length)] - numpy.uint8(48)
+        valid[selected[(digits > 9).any(axis=1)]] = False
+
+        values[selected] = digits.astype(numpy.int64) @ (10 ** numpy.arange(length - 1, -1, -1, dtype=numpy.int64))
+
+    values[negative] *= -1
+    values[~valid] = 0
+
+    return values, valid
+
+
+def pack_ips_numpy(numpy, data, starts, ends, names):
+    """Pack the IP addresses of a block of data into keys with NumPy (see pack_ip_key()).
+
+    Dotted IPv4 addresses are packed at once, other addresses and names are packed once per distinct value of a block.
+
+    Args:
+        numpy (module): The numpy module.
+        data (numpy.ndarray): Block of data as an array of bytes.
+        starts (numpy.ndarray): Offsets of the starts of the addresses.
+        ends (numpy.ndarray): Offsets of the ends of the addresses.
+        names (dict): Indexes of the values that are not IP addresses by the values, new values are added with the next index.
+
+    Returns:
+        numpy.ndarray: Packed keys of IP_KEY_DTYPE in the order of the addresses.
+    """
+
+    keys = numpy.zeros(len(starts), dtype=IP_KEY_DTYPE)
+    if not len(starts):
+        return keys
+
+    # bytes after the end of an address are zeros
+    width = int((ends - starts).max())
+    index = starts[:, None] + numpy.arange(width)
+    values = numpy.where(index < ends[:, None], data[numpy.minimum(index, len(data) - 1)], numpy.uint8(0))
+
+    lows, is_ipv4 = pack_ipv4_numpy(numpy, values)
+    keys['low'] = lows
+
+    others = numpy.flatnonzero(~is_ipv4)
+    if len(others):
+        packed = {}
+        for row, value_start, value_end in zip(others.tolist(), starts[others].tolist(), ends[others].tolist()):
+            value = data[value_start:value_end].tobytes()
+            if value not in packed:
+                packed[value] = pack_ip_key(value, names)
+            keys[row] = (packed[value] >> 64, packed[value] & 0xFFFFFFFFFFFFFFFF)
+
+    return keys
+
+
+def count_ips_numpy(numpy, data, starts, ends, capacity = None):
+    """Count the IP addresses of a block of data with NumPy.
+
+    Args:
+        numpy (module): The numpy module.
+        data (numpy.ndarray): Block of data as an array of bytes.
+        starts (numpy.ndarray): Offsets of the starts of the addresses.
+        ends (numpy.ndarray): Offsets of the ends of the addresses.
+        capacity (int, optional): Maximum number of addresses kept by approximate counting. Defaults to None (exact counting).
+
+    Returns:
+        dict: Table of frequencies as returned by pack_ip_frequencies() or None if there are no addresses.
+    """
+
+    if not len(starts):
+        return None
+
+    names = {}
+    keys = pack_ips_numpy(numpy, data, starts, ends, names)
+
+    return pack_ip_table(keys, numpy.ones(len(keys), dtype=numpy.int64), names, capacity=capacity)
+
+
+def pack_ipv4_numpy(numpy, values):
+    """Pack dotted IPv4 addresses into the lower 64 bits of their keys with NumPy (see pack_ip()).
+
+    Only addresses accepted by inet_pton() are packed - four decimal octets up to 255 without leading zeros.
+
+    Args:
+        numpy (module): The numpy module.
+        values (numpy.ndarray): Matrix of bytes of the values, one per row, padded with zeros.
+
+    Returns:
+        tuple: Array of uint64 lower parts of the keys (0 for other values) and a boolean array of the IPv4 addresses.
+    """
+
+    rows = numpy.arange(len(values))
+    octets = numpy.zeros((len(values), 4), dtype=numpy.int64)
+    digits = numpy.zeros((len(values), 4), dtype=numpy.int64)
+    leading_zeros = numpy.zeros((len(values), 4), dtype=bool)
+    dots = numpy.zeros(len(values), dtype=numpy.int64)
+    is_ipv4 = numpy.ones(len(values), dtype=bool)
+
+    # go through the columns of all values at once
+    for column in values.T:
+        is_digit = (column >= 48) & (column <= 57)
+        is_dot = column == 46
+        is_ipv4 &= is_digit | is_dot | (column == 0)
+
+        octet = numpy.minimum(dots, 3)
+        digit_rows = rows[is_digit]
+        digit_octets = octet[is_digit]
+        leading_zeros[digit_rows, digit_octets] |= (digits[digit_rows, digit_octets] == 0) & (column[is_digit] == 48)
+        octets[digit_rows, digit_octets] = octets[digit_rows, digit_octets] * 10 + (column[is_digit] - 48)
+        digits[digit_rows, digit_octets] += 1
+        dots += is_dot
+
+    # octets have 1 to 3 digits, only a single zero can start with zero
+    is_ipv4 &= dots == 3
+    is_ipv4 &= ((digits >= 1) & (digits <= 3) & (octets <= 255) & ~(leading_zeros & (digits > 1))).all(axis=1)
+
+    lows = numpy.zeros(len(values), dtype=numpy.uint64)
+    packed = (octets[is_ipv4] << numpy.array([24, 16, 8, 0])).sum(axis=1) | IPV4_MAPPED
+    lows[is_ipv4] = packed.astype(numpy.uint64)
+
+    return lows, is_ipv4
+
+
+def parse_file_numpy(task, operations, block_size = BLOCK_SIZE, use_mmap = True):
+    """Parse and analyze a single file or a byte range of a file with NumPy.
+
+    Whole blocks of data are parsed at once with vectorized operations, IP addresses are counted per block and only
+    the distinct addresses of a block are packed one by one. Lines with invalid numbers are skipped like by the other parsers.
+
+    Args:
+        task (tuple): Task in the form of (path, start, end). The end of None means the end of the file.
+        operations (dict): Operations to analyze (see DEFAULT_OPERATIONS), missing ones are not analyzed.
+        block_size (int, optional): Size of blocks read from the file in bytes. Defaults to BLOCK_SIZE.
+        use_mmap (bool, optional): Whether to memory-map uncompressed files. Defaults to True.
+
+    Returns:
+        dict: Partial aggregate of the file.
+    """
+
+    import numpy
+
+    path, start, end = task
+
+    operations = dict(DEFAULT_OPERATIONS, **operations)
+    timeseries = operations['timeseries']
+    ip_capacity = operations['ip_capacity']
+    since = operations['since']
+    until = operations['until']
+
+    partial = new_partial()
+
+    # tables of IP addresses of blocks are merged as they grow
+    ip_tables = []
+
+    count_ips = operations['mfip'] or operations['lfip'] or operations['top'] or operations['bottom']
+    filter_time = since is not None or until is not None
+    parse_epochs = operations['eps'] or timeseries or filter_time
+    parse_bodies = operations['count_bytes'] or timeseries
+    count_headers = parse_bodies and not operations['exclude_header_sizes']
+    sketches = {field: new_hll(operations['hll_precision']) for field in operations['distinct']}
+
+    # seconds of blocks are only summed once per file
+    second_tables = []
+
+    # keys of groups are codes of values in dictionaries of the file, which are decoded once per file
+    plan = plan_groups(operations)
+    group_tables = [{} for _ in plan['groupings']]
+    group_dictionaries = {field: {} for field, _, _ in plan['fields']}
+
+    # only locate the fields needed
+    fields = []
+    if parse_epochs:
+        fields.append(0)
+    if count_headers:
+        fields.append(1)
+    if count_ips:
+        fields.append(2)
+    if parse_bodies:
+        fields.append(4)
+    for field in operations['distinct']:
+        if DISTINCT_FIELDS[field] not in fields:
+            fields.append(DISTINCT_FIELDS[field])
+    for index in [index for _, index, _ in plan['fields']] + ([1, 4] if plan['sizes'] else []):
+        if index not in fields:
+            fields.append(index)
+
+    # numbers parsed, lines with an invalid one are skipped
+    number_fields = [field for field in (0, 1, 4) if field in fields]
+
+    def analyze_block(block):
+        data = numpy.frombuffer(block, dtype=numpy.uint8)
+        lines, events, located = locate_fields_numpy(numpy, data, fields)
+        partial['lines'] += lines
+        if not events:
+            return
+
+        valid = numpy.ones(events, dtype=bool)
+        numbers = {}
+        for field in number_fields:
+            numbers[field], field_valid = parse_integers_numpy(numpy, data, *located[field], fraction=field == 0)
+            valid &= field_valid
+
+        # skip events outside of the time window
+        if since is not None:
+            valid &= numbers[0] >= since
+        if until is not None:
+            valid &= numbers[0] < until
+
+        if not valid.all():
+            events = int(valid.sum())
+            if not events:
+                return
+            numbers = {field: field_numbers[valid] for field, field_numbers in numbers.items()}
+            located = {field: (starts[valid], ends[valid]) for field, (starts, ends) in located.items()}
+
+        chunk_partial = new_partial()
+        chunk_partial['events'] = events
+
+        # keep the epoch time start and end of all events
+        if parse_epochs:
+            epochs = numbers[0]
+            chunk_partial['epoch_start'] = int(epochs.min())
+            chunk_partial['epoch_end'] = int(epochs.max())
+
+        # add bytes from header and body, sometimes the value can be -1
+        if parse_bodies:
+            sizes = numpy.maximum(numbers[4], 0)
+            chunk_partial['bytes_body'] = int(sizes.sum())
+
+            if count_headers:
+                headers = numpy.maximum(numbers[1], 0)
+                chunk_partial['bytes_headers'] = int(headers.sum())
+                sizes = sizes + headers
+
+            # add the events and their bytes to their seconds
+            if timeseries:
+                second_tables.append(reduce_seconds(epochs, numpy.ones(events, dtype=numpy.int64), sizes))
+
+        merge_partials(partial, chunk_partial)
+
+        # count the frequency for IPs
+        if count_ips:
+            add_ip_table(ip_tables, count_ips_numpy(numpy, data, *located[2], capacity=ip_capacity))
+
+        # add the events of the block to their groups, values are sliced from a copy of a memory-mapped block
+        if plan['groupings']:
+            values = bytes(block)
+            codes = {field: encode_values(numpy, values, *located[index], group_dictionaries[field], extract) for field, index, extract in plan['fields']}
+
+            sizes = {}
+            if plan['sizes']:
+                sizes['headers'] = numpy.maximum(numbers[1], 0)
+                sizes['body'] = numpy.maximum(numbers[4], 0)
+                sizes['bytes'] = sizes['body'] if plan['exclude_header_sizes'] else sizes['headers'] + sizes['body']
+                sizes['elapsed'] = sizes['headers']
+
+            add_group_block(numpy, group_tables, plan, codes, sizes)
+
+        # add distinct values of the block to the sketches
+        for field, registers in sketches.items():
+            value_starts, value_ends = located[DISTINCT_FIELDS[field]]
+            add_distinct(registers, field, {bytes(block[value_start:value_end]) for value_start, value_end in zip(value_starts.tolist(), value_ends.tolist())})
+
+    # read data from log file
+    for block in read_line_blocks(path, start, end, block_size=block_size, use_mmap=use_mmap):
+        # the last line of a file may not end with a newline
+        if block[-1] != 10:
+            block = bytes(block) + b'\n'
+
+        analyze_block(block)
+
+    partial['ip_frequencies'] = merge_ip_tables(ip_tables)
+    partial['distinct'] = sketches
+
+    if second_tables:
+        partial['seconds'] = reduce_seconds(*(numpy.concatenate([table[column] for table in second_tables]) for column in ('seconds', 'events', 'bytes')))
+
+    if plan['groupings']:
+        group_values = {field: list(dictionary) for field, dictionary in group_dictionaries.items()}
+        partial['groups'] = pack_groups(plan, group_tables, lambda field, code: group_values[field][code] if field in GROUP_EXTRACTORS else group_values[field][code].decode(errors='replace'))
+
+    return partial
+
+
+def parse_file_auto(task, operations, block_size = BLOCK_SIZE, use_mmap = True):
+    """Parse and analyze a single file or a byte range of a file with the engine best suited for its size.
+
+    Small tasks are analyzed by the split parser, so NumPy does not have to be imported. Big tasks are analyzed by
+    the NumPy parser, which is faster once there are enough data to make up for its import. Both yield the same results.
+
+    Args:
+        task (tuple): Task in the form of (path, start, end). The end of None means the end of the file.
+        operations (dict): Operations to analyze (see DEFAULT_OPERATIONS), missing ones are not analyzed.
+        block_size (int, optional): Size of blocks read from the file in bytes. Defaults to BLOCK_SIZE.
+        use_mmap (bool, optional): Whether to memory-map uncompressed files. Defaults to True.
+
+    Returns:
+        dict: Partial aggregate of the file.
+    """
+
+    path, start, end = task
+    size = (os.path.getsize(path) if end is None else end) - start
+    parse_file = parse_file_numpy if size >= AUTO_ENGINE_SIZE else parse_file_split
+
+    return parse_file(task, operations, block_size=block_size, use_mmap=use_mmap)
+
+
+def load_store_dictionary(path, column):
+    """Load the values of a dictionary-encoded column of a store segment.
+
+    Args:
+        path (str): Path to the segment directory.
+        column (str): Name of the column (see STORE_DICTIONARIES).
+
+    Returns:
+        list: Values of the column (bytes) in the order of their codes.
+    """
+
+    with open(os.path.join(path, f'{column}.dict'), 'rb') as f:
+        data = f.read()
+
+    return data.split(b'\n') if data else []
+
+
+def parse_file_store(task, operations):
+    """Analyze a segment of a columnar store created by the ingest command.
+
+    Only the columns needed by the operations are loaded. They are memory-mapped, so repeated analyses of a store
+    scan arrays in the page cache instead of parsing text. Dictionary-encoded values are counted by their codes
+    and only the values that occur are decoded. Clients are counted and grouped by their packed addresses.
+
+    Args:
+        task (tuple): Task in the form of (path, start, end), segments are always analyzed whole.
+        operations (dict): Operations to analyze (see DEFAULT_OPERATIONS), missing ones are not analyzed.
+
+    Returns:
+        dict: Partial aggregate of the segment.
+    """
+
+    import numpy
+
+    operations = dict(DEFAULT_OPERATIONS, **operations)
+    since = operations['since']
+    until = operations['until']
+    timeseries = operations['timeseries']
+    ip_capacity = operations['ip_capacity']
+
+    path = task[0]
+    with open(os.path.join(path, 'segment.json'), 'r') as f:
+        segment = json.load(f)
+
+    partial = new_partial()
+    partial['lines'] = segment['lines']
+    partial['distinct'] = {field: new_hll(operations['hll_precision']) for field in operations['distinct']}
+
+    # empty arrays can not be memory-mapped
+    if not segment['events']:
+        return partial
+
+    window = None
+    epochs = None
+
+    # skip events outside of the time window
+    if since is not None or until is not None:
+        epochs = numpy.load(os.path.join(path, 'epoch.npy'), mmap_mode='r')
+        window = numpy.ones(len(epochs), dtype=bool)
+        if since is not None:
+            window &= epochs >= since
+        if until is not None:
+            window &= epochs < until
+
+        if not window.any():
+            return partial
+        epochs = epochs[window]
+
+    def load_column(column):
+        values = numpy.load(os.path.join(path, f'{column}.npy'), mmap_mode='r')
+        return values if window is None else values[window]
+
+    def load_clients():
+        keys = numpy.empty(partial['events'], dtype=IP_KEY_DTYPE)
+        keys['high'] = load_column('client_high')
+        keys['low'] = load_column('client_low')
+        return keys, [name.decode() for name in load_store_dictionary(path, 'client')]
+
+    partial['events'] = segment['events'] if window is None else int(window.sum())
+
+    # keep the epoch time start and end of all events
+    if operations['eps'] or timeseries:
+        if epochs is None:
+            epochs = load_column('epoch')
+        partial['epoch_start'] = int(epochs.min())
+        partial['epoch_end'] = int(epochs.max())
+
+    # add bytes from header and body, sometimes the value can be -1
+    if operations['count_bytes'] or timeseries:
+        sizes = numpy.maximum(load_column('body'), 0).astype(numpy.int64)
+        partial['bytes_body'] = int(sizes.sum())
+
+        if not operations['exclude_header_sizes']:
+            headers = numpy.maximum(load_column('headers'), 0).astype(numpy.int64)
+            partial['bytes_headers'] = int(headers.sum())
+            sizes += headers
+
+        if timeseries:
+            partial['seconds'] = reduce_seconds(numpy.asarray(epochs), numpy.ones(partial['events'], dtype=numpy.int64), sizes)
+
+    # count the frequency for IPs, addresses are kept in the order of their first events like by the parsers
+    if operations['mfip'] or operations['lfip'] or operations['top'] or operations['bottom']:
+        keys, names = load_clients()
+        partial['ip_frequencies'] = prune_ip_frequencies(pack_ip_table(keys, numpy.ones(len(keys), dtype=numpy.int64), names, capacity=ip_capacity))
+
+    # add the events to their groups, only the values of the keys of the groups are decoded
+    plan = plan_groups(operations)
+    if plan['groupings']:
+        key_columns = {index: column for column, index in STORE_DICTIONARIES.items()}
+        dictionaries = {}
+        codes = {}
+        group_values = {}
+        for field, index, extract in plan['fields']:
+            # clients are grouped by the codes of their distinct keys
+            if index == STORE_CLIENT_FIELD:
+                keys, names = load_clients()
+                unique, codes[field] = numpy.unique(keys, return_inverse=True)
+                group_values[field] = [unpack_ip(key, names).encode() for key in unique]
+                continue
+
+            column = key_columns[index]
+            if column not in dictionaries:
+                dictionaries[column] = load_store_dictionary(path, column)
+            codes[field] = load_column(column)
+            group_values[field] = dictionaries[column]
+
+            # hosts are extracted once per value of the dictionary, their codes replace the codes of the values
+            if extract is not None:
+                hosts = {}
+                host_codes = numpy.fromiter((hosts.setdefault(extract(value), len(hosts)) for value in group_values[field]), dtype=numpy.uint32, count=len(group_values[field]))
+                codes[field] = host_codes[codes[field]]
+                group_values[field] = list(hosts)
+
+        sizes = {}
+        if plan['sizes']:
+            sizes['headers'] = numpy.maximum(load_column('headers'), 0).astype(numpy.int64)
+            sizes['body'] = numpy.maximum(load_column('body'), 0).astype(numpy.int64)
+            sizes['bytes'] = sizes['body'] if plan['exclude_header_sizes'] else sizes['headers'] + sizes['body']
+            sizes['elapsed'] = sizes['headers']
+
+        group_tables = [{} for _ in plan['groupings']]
+        add_group_block(numpy, group_tables, plan, codes, sizes)
+
+        partial['groups'] = pack_groups(plan, group_tables, lambda field, code: group_values[field][code] if field in GROUP_EXTRACTORS else group_values[field][code].decode(errors='replace'))
+
+    # add distinct values of the segment to the sketches
+    for field, registers in partial['distinct'].items():
+        # clients are added by their packed addresses like by normalize_distinct()
+        if DISTINCT_FIELDS[field] == STORE_CLIENT_FIELD:
+            keys, names = load_clients()
+            add_hll(registers, {names[int(key['low'])].encode() if key['high'] == NAME_KEY else ((int(key['high']) << 64) | int(key['low'])).to_bytes(16, 'big') for key in numpy.unique(keys)})
+            continue
+
+        values = load_store_dictionary(path, field)
+
+        # all values of a dictionary occur in the segment, only a time window leaves some out
+        if window is not None:
+            values = [values[code] for code in numpy.unique(load_column(field)).tolist()]
+
+        add_distinct(registers, field, values)
+
+    return partial
+
+
+# parsers analyzing single files, whether big files can be split into byte ranges analyzed in parallel
+# and whether files are read in blocks
+ENGINES = {
+    'auto': {
+        'parse_file': parse_file_auto,
+        'split_files': True,
+        'streaming': True
+    },
+    'pandas': {
+        'parse_file': parse_file_pandas,
+        'split_files': False,
+        'streaming': False
+    },
+    'regex': {
+        'parse_file': parse_file_regex,
+        'split_files': True,
+        'streaming': True
+    },
+    'split': {
+        'parse_file': parse_file_split,
+        'split_files': True,
+        'streaming': True
+    },
+    'numpy': {
+        'parse_file': parse_file_numpy,
+        'split_files': True,
+        'streaming': True
+    },
+    # segments of columnar stores, it is selected by giving stores as the input
+    'store': {
+        'parse_file': parse_file_store,
+        'split_files': False,
+        'streaming': False
+    }
+}
+
+
+def parse_files(engine_name, to_process, operations, jobs = 1, **parser_options):
+    """Parse and analyze files with an engine.
+
+    Args:
+        engine_name (str): Name of the engine from ENGINES.
+        to_process (list): List of file paths to analyze.
+        operations (dict): Operations to analyze (see DEFAULT_OPERATIONS), missing ones are not analyzed.
+        jobs (int, optional): Number of worker processes analyzing files or parts of files in parallel. Defaults to 1.
+        **parser_options: Options passed to the parser, like the block_size and use_mmap of engines reading files in blocks.
+
+    Returns:
+        dict: Dictionary containing the analysis results.
+    """
+
+    engine = ENGINES[engine_name]
+
+    # analyze all files, big files are only split by engines which can analyze byte ranges
+    tasks = plan_tasks(to_process, jobs, split_files=engine['split_files'], since=operations.get('since'), until=operations.get('until'))
+    partial = map_partials(engine['parse_file'], tasks, jobs=jobs, operations=operations, **parser_options)
+
+    result = {}
+    summarize(result, partial, operations)
+
+    return result
+
+
+def get_fingerprint(path, size):
+    """Get a fingerprint of the start of a file to recognize it after it has been rewritten.
+
+    Args:
+        path (str): Path to the file.
+        size (int): Number of bytes already analyzed, only data before it is used.
+
+    Returns:
+        str: Hex digest of the start of the file.
+    """
+
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read(min(size, FINGERPRINT_SIZE))).hexdigest()
+
+
+def load_state(state_path, options):
+    """Load the analysis state saved by a previous run.
+
+    Args:
+        state_path (str): Path to the state file.
+        options (dict): Engine and operations of this run. The state is only used if they are the same.
+
+    Returns:
+        dict: Saved state of analyzed files by their paths. Empty if there is no usable state.
+    """
+
+    if not os.path.exists(state_path):
+        logger.debug(f'State file \'{state_path}\' does not exist yet.')
+        return {}
+
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+    except:
+        logger.warning(f'Unable to read state file \'{state_path}\' - analyzing all data.')
+        return {}
+
+    if state.get('version') != STATE_VERSION or state.get('options') != options:
+        logger.info(f'State file \'{state_path}\' was saved with different options - analyzing all data.')
+        return {}
+
+    return {path: dict(entry, partial=deserialize_partial(entry['partial'])) for path, entry in state['files'].items()}
+
+
+def save_state(state_path, options, files):
+    """Atomically save the analysis state.
+
+    Args:
+        state_path (str): Path to the state file.
+        options (dict): Engine and operations of this run.
+        files (dict): State of analyzed files by their paths.
+    """
+
+    state = {
+        'version': STATE_VERSION,
+        'options': options,
+        'files': {path: dict(entry, partial=serialize_partial(entry['partial'])) for path, entry in files.items()}
+    }
+
+    # write to a temporary file first, so an interrupted run does not leave a broken state
+    temporary_path = f'{state_path}.tmp'
+    try:
+        with open(temporary_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(temporary_path, state_path)
+    except:
+        logger.exception(f'Unable to write state file \'{state_path}\'!')
+        sys.exit(1)
+
+
+def parse_files_incremental(to_process, state_files, parse_file, jobs = 1, discarded = None, **kwargs):
+    """Analyze only the data appended to files since the state was saved.
+
+    Files are recognized by their inode, so a rotated (renamed) file is not analyzed again.
+    Files that were truncated or rewritten are analyzed from the start.
+    The last line of a file is only analyzed once it is complete.
+
+    Args:
+        to_process (list): List of file paths to analyze.
+        state_files (dict): Saved state of analyzed files by their paths.
+        parse_file (function): Function analyzing a single task and returning a partial aggregate.
+        jobs (int, optional): Number of worker processes. Defaults to 1.
+        discarded (list, optional): List to append partial aggregates of files that disappeared or were rewritten to. Defaults to None.
+        **kwargs: Options passed to parse_file.
+
+    Returns:
+        dict: New state of analyzed files by their paths.
+    """
+
+    files = {}
+    tasks = []
+
+    # saved states which were matched to a file and partials which were thrown away
+    used = set()
+    unused = []
+
+    state_inodes = {(entry['device'], entry['inode']): entry for entry in state_files.values()}
+
+    for f in to_process:
+        stat = os.stat(f)
+        compression = detect_compression(f)
+
+        # the file may have been renamed by log rotation
+        previous = state_files.get(f)
+        if not previous or (previous['device'], previous['inode']) != (stat.st_dev, stat.st_ino):
+            previous = state_inodes.get((stat.st_dev, stat.st_ino))
+
+        # compressed files can only be analyzed whole
+        end = stat.st_size if compression else find_last_line_end(f, stat.st_size)
+
+        offset = 0
+        partial = new_partial()
+
+        if previous:
+            used.add(id(previous))
+
+            if previous['offset'] > end or get_fingerprint(f, previous['offset']) != previous['fingerprint']:
+                logger.debug(f'File \'{f}\' was truncated or rewritten - analyzing it from the start.')
+                unused.append(previous['partial'])
+            elif compression and previous['offset'] != end:
+                logger.debug(f'Compressed file \'{f}\' was changed - analyzing it from the start.')
+                unused.append(previous['partial'])
+            else:
+                offset = previous['offset']
+                partial = previous['partial']
+
+        files[f] = {
+            'device': stat.st_dev,
+            'inode': stat.st_ino,
+            'size': stat.st_size,
+            'offset': end,
+            'fingerprint': get_fingerprint(f, end),
+            'partial': partial
+        }
+
+        if end > offset:
+            logger.debug(f'Analyzing \'{f}\' from byte {offset} to {end}.')
+            tasks.append((f, 0, None) if compression else (f, offset, end))
+
+    # merge the new data into the saved state of the files
+    for task, task_partial in zip(tasks, map_tasks(parse_file, tasks, jobs=jobs, **kwargs)):
+        merge_partials(files[task[0]]['partial'], task_partial)
+
+    # keep the results of files which are no longer analyzed
+    if discarded is not None:
+        discarded.extend(unused)
+        discarded.extend(entry['partial'] for entry in state_files.values() if id(entry) not in used)
+
+    return files
+
+
+def get_cache_dir():
+    """Get the default directory of the cache of analyzed files.
+
+    Returns:
+        str: Path to the cache directory.
+    """
+
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+
+    return os.path.join(cache_home, 'squid-log-analyzer')
+
+
+def get_cache_key(path, stat, options):
+    """Get the key of a cache entry of an analyzed file.
+
+    Args:
+        path (str): Path to the file.
+        stat (os.stat_result): Status of the file.
+        options (dict): Engine and options of the parser.
+
+    Returns:
+        str: The key.
+    """
+
+    identity = [CACHE_VERSION, os.path.abspath(path), stat.st_size, stat.st_mtime_ns, options]
+
+    return hashlib.sha1(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+
+def load_cache_entry(cache_dir, key):
+    """Load the partial aggregate of a file from the cache.
+
+    Args:
+        cache_dir (str): Path to the cache directory.
+        key (str): Key of the entry as returned by get_cache_key().
+
+    Returns:
+        dict: Partial aggregate of the file with the statistics of its analysis (see measure_task()) marked as cached
+            or None if it is not cached.
+    """
+
+    entry_path = os.path.join(cache_dir, f'{key}.json')
+    try:
+        with open(entry_path, 'r') as f:
+            entry = json.load(f)
+        partial = deserialize_partial(entry['partial'])
+        partial['tasks'] = [dict(task, cached=True) for task in entry['tasks']]
+    except FileNotFoundError:
+        return None
+    except:
+        logger.warning(f'Unable to read cache entry \'{entry_path}\' - analyzing the file again.')
+        return None
+
+    # the modification time orders the entries from the least recently used
+    try:
+        os.utime(entry_path)
+    except OSError:
+        pass
+
+    return partial
+
+
+def save_cache_entry(cache_dir, key, path, partial):
+    """Atomically save the partial aggregate of a file to the cache.
+
+    The statistics of the analysis are saved with it, so runs with --stats report the same files whether they are cached or not.
+
+    Args:
+        cache_dir (str): Path to the cache directory.
+        key (str): Key of the entry as returned by get_cache_key().
+        path (str): Path to the file.
+        partial (dict): Partial aggregate of the file.
+    """
+
+    entry_path = os.path.join(cache_dir, f'{key}.json')
+    temporary_path = f'{entry_path}.tmp'
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(temporary_path, 'w') as f:
+            json.dump({'path': os.path.abspath(path), 'partial': serialize_partial(partial), 'tasks': partial.get('tasks', [])}, f)
+        os.replace(temporary_path, entry_path)
+    except OSError:
+        logger.warning(f'Unable to write cache entry \'{entry_path}\'.')
+
+
+def evict_cache(cache_dir, max_size = CACHE_MAX_SIZE):
+    """Remove the least recently used cache entries until they fit into the maximum size.
+
+    Args:
+        cache_dir (str): Path to the cache directory.
+        max_size (int, optional): Maximum total size of the entries in bytes. Defaults to CACHE_MAX_SIZE.
+    """
+
+    try:
+        entries = [entry for entry in os.scandir(cache_dir) if entry.name.endswith('.json')]
+    except OSError:
+        return
+
+    stats = {}
+    for entry in entries:
+        try:
+            stats[entry.path] = entry.stat()
+        except OSError:
+            pass
+
+    total = sum(stat.st_size for stat in stats.values())
+    for entry_path in sorted(stats, key=lambda entry_path: stats[entry_path].st_mtime_ns):
+        if total <= max_size:
+            break
+
+        try:
+            os.remove(entry_path)
+            logger.debug(f'Removed cache entry \'{entry_path}\'.')
+        except OSError:
+            pass
+        total -= stats[entry_path].st_size
+
+
+def parse_task_options(item, parse_file = None):
+    """Analyze a task with its own options.
+
+    Args:
+        item (tuple): Task and a dictionary of options passed to parse_file.
+        parse_file (function): Function analyzing a single task and returning a partial aggregate.
+
+    Returns:
+        dict: Partial aggregate of the task.
+    """
+
+    task, options = item
+
+    return parse_file(task, **options)
+
+
+def parse_files_cached(to_process, cache_dir, options, parse_file, operations, jobs = 1, split_files = True, max_size = CACHE_MAX_SIZE, min_size = CACHE_MIN_SIZE, uncached = None, io_depth = 0, **kwargs):
+    """Analyze files, reusing partial aggregates of unchanged files from the cache.
+
+    Entries are keyed by the absolute path, size and modification time of a file and the version and options of the parser,
+    so only new or changed files are analyzed. Small files can be analyzed without the cache with other options.
+
+    Args:
+        to_process (iterable): List or iterator of file paths to analyze. Files are analyzed as they come.
+        cache_dir (str): Path to the cache directory.
+        options (dict): Engine and options of the parser, entries are only used if they are the same.
+        parse_file (function): Function analyzing a single task and returning a partial aggregate.
+        operations (dict): Operations of the cached results (see DEFAULT_OPERATIONS).
+        jobs (int, optional): Number of worker processes. Defaults to 1.
+        split_files (bool, optional): Whether big files can be split into byte ranges. Defaults to True.
+        max_size (int, optional): Maximum total size of cache entries in bytes. Defaults to CACHE_MAX_SIZE.
+        min_size (int, optional): Files smaller than this are not cached when uncached options are given. Defaults to CACHE_MIN_SIZE.
+        uncached (dict, optional): Operations analyzed instead for files which are not cached. Defaults to None, which caches all files.
+        io_depth (int, optional): Number of tasks read ahead concurrently (see prefetch_tasks()). Defaults to 0, which does not read ahead.
+        **kwargs: Other options passed to parse_file.
+
+    Returns:
+        dict: Merged partial aggregate of all files.
+    """
+
+    files = []
+    stats = {}
+    keys = {}
+    partials = {}
+    file_options = {}
+
+    # tasks of files that are not cached, they are remembered until their results arrive
+    submitted = collections.deque()
+
+    def plan_misses():
+        for f in to_process:
+            files.append(f)
+            stats[f] = os.stat(f)
+
+            # small files are only analyzed with the options of this run
+            if uncached is not None and stats[f].st_size < min_size:
+                file_options[f] = dict(kwargs, operations=uncached)
+                for task in plan_tasks([f], jobs, split_files=split_files, since=operations.get('since'), until=operations.get('until')):
+                    submitted.append(task)
+                    yield task
+                continue
+
+            keys[f] = get_cache_key(f, stats[f], options)
+
+            partial = load_cache_entry(cache_dir, keys[f])
+            if partial is not None:
+                logger.debug(f'Using cached results of file \'{f}\'.')
+                partials[f] = partial
+                continue
+
+            file_options[f] = dict(kwargs, operations=operations)
+            for task in plan_tasks([f], jobs, split_files=split_files, since=operations.get('since'), until=operations.get('until')):
+                submitted.append(task)
+                yield task
+
+    tasks = plan_misses()
+    if io_depth:
+        tasks = prefetch_tasks(tasks, io_depth)
+
+    # analyze the other files, parts of split files are merged per file
+    analyzed = {}
+    for task_partial in map_tasks(parse_task_options, ((task, file_options[task[0]]) for task in tasks), jobs=jobs, parse_file=parse_file):
+        f = submitted.popleft()[0]
+        analyzed[f] = merge_partials(analyzed.get(f) or new_partial(), task_partial)
+
+    # files changed during the analysis are not cached
+    saved = False
+    for f, partial in analyzed.items():
+        if f not in keys:
+            continue
+
+        stat = os.stat(f)
+        if (stat.st_size, stat.st_mtime_ns) == (stats[f].st_size, stats[f].st_mtime_ns):
+            save_cache_entry(cache_dir, keys[f], f, partial)
+            saved = True
+    partials.update(analyzed)
+
+    # the cache only grows when entries are saved
+    if saved:
+        evict_cache(cache_dir, max_size)
+
+    # merge in the order of files, so the results are the same as without the cache
+    partial = new_partial()
+    for f in files:
+        if f in partials:
+            merge_partials(partial, partials[f])
+
+    return partial
+
+
+def is_store(path):
+    """Check if a path is a columnar store created by the ingest command.
+
+    Args:
+        path (str): Path to check.
+
+    Returns:
+        bool: True if the path is a store.
+    """
+
+    return os.path.isfile(os.path.join(path, 'store.json'))
+
+
+def get_segment_name(path):
+    """Get the name of the segment of a log file in a store.
+
+    Args:
+        path (str): Path to the log file.
+
+    Returns:
+        str: Name of the segment directory.
+    """
+
+    return hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+
+
+def load_store(store_path):
+    """Load the index of segments of a columnar store.
+
+    Args:
+        store_path (str): Path to the store directory.
+
+    Returns:
+        dict: Index of the store. Empty if the store does not exist yet.
+    """
+
+    if not is_store(store_path):
+        return {'version': STORE_VERSION, 'segments': []}
+
+    try:
+        with open(os.path.join(store_path, 'store.json'), 'r') as f:
+            index = json.load(f)
+    except:
+        logger.exception(f'Unable to read store \'{store_path}\'!')
+        sys.exit(1)
+
+    if index.get('version') != STORE_VERSION:
+        logger.error(f'Store \'{store_path}\' was created by a different version - ingest the logs into a new store!')
+        sys.exit(1)
+
+    return index
+
+
+def save_store(store_path, index):
+    """Atomically save the index of segments of a columnar store.
+
+    Args:
+        store_path (str): Path to the store directory.
+        index (dict): Index of the store.
+    """
+
+    index_path = os.path.join(store_path, 'store.json')
+    temporary_path = f'{index_path}.tmp'
+    try:
+        with open(temporary_path, 'w') as f:
+            json.dump(index, f, indent=4)
+        os.replace(temporary_path, index_path)
+    except:
+        logger.exception(f'Unable to write store \'{store_path}\'!')
+        sys.exit(1)
+
+
+def iter_store_segments(store_paths):
+    """Iterate over the segments of columnar stores.
+
+    Args:
+        store_paths (list): Paths to the store directories.
+
+    Yields:
+        str: Paths to the segment directories in the order the log files were ingested.
+    """
+
+    for store_path in store_paths:
+        for segment in load_store(store_path)['segments']:
+            yield os.path.join(store_path, 'segments', segment['name'])
+
+
+def encode_values(numpy, block, starts, ends, dictionary, extract = None):
+    """Dictionary-encode the values of a field of all lines in a block of data.
+
+    Args:
+        numpy (module): The numpy module.
+        block (bytes): Block of data.
+        starts (numpy.ndarray): Offsets of the starts of the values.
+        ends (numpy.ndarray): Offsets of the ends of the values.
+        dictionary (dict): Codes by the values, new values are added with the next code.
+        extract (function, optional): Function extracting the encoded values from the values of the field. Defaults to None.
+
+    Returns:
+        numpy.ndarray: Array of uint32 codes of the values.
+    """
+
+    if extract is not None:
+        return numpy.fromiter((dictionary.setdefault(extract(block[start:end]), len(dictionary)) for start, end in zip(starts.tolist(), ends.tolist())), dtype=numpy.uint32, count=len(starts))
+
+    return numpy.fromiter((dictionary.setdefault(block[start:end], len(dictionary)) for start, end in zip(starts.tolist(), ends.tolist())), dtype=numpy.uint32, count=len(starts))
+
+
+def save_store_column(numpy, path, column, dtype, stored_dtype, rows):
+    """Convert a column written block by block into a raw file of a segment into a NumPy file.
+
+    The values are converted in slices of rows and appended after the header, so columns of any size are
+    converted in bounded memory.
+
+    Args:
+        numpy (module): The numpy module.
+        path (str): Path to the segment directory.
+        column (str): Name of the column.
+        dtype (numpy.dtype): Type of the values in the raw file.
+        stored_dtype (numpy.dtype): Type of the values in the NumPy file.
+        rows (int): Number of values converted at once.
+    """
+
+    raw_path = os.path.join(path, f'{column}.raw')
+    count = os.path.getsize(raw_path) // numpy.dtype(dtype).itemsize
+    header = {'descr': numpy.lib.format.dtype_to_descr(numpy.dtype(stored_dtype)), 'fortran_order': False, 'shape': (count,)}
+
+    with open(raw_path, 'rb') as source, open(os.path.join(path, f'{column}.npy'), 'wb') as target:
+        numpy.lib.format.write_array_header_1_0(target, header)
+        for _ in range(0, count, rows):
+            target.write(numpy.fromfile(source, dtype=dtype, count=rows).astype(stored_dtype, copy=False).tobytes())
+
+    os.remove(raw_path)
+
+
+def ingest_file(task, store_path = None, block_size = BLOCK_SIZE, use_mmap = True):
+    """Convert a log file into a segment of a columnar store.
+
+    Every column is a NumPy array of the values of valid lines - epoch times as int64, header and body sizes as int32
+    (int64 if they do not fit), client addresses as the uint64 high and low parts of their packed keys and other
+    fields as uint32 codes of a dictionary of their values. Lines are skipped the same way as by the parsers,
+    including lines with invalid numbers. Columns are written block by block, so only the dictionaries are kept
+    in memory. The segment is written next to the old one and replaces it at once.
+
+    Args:
+        task (tuple): Task in the form of (path, start, end), files are always converted whole.
+        store_path (str): Path to the store directory.
+        block_size (int, optional): Size of blocks read from the file in bytes. Defaults to BLOCK_SIZE.
+        use_mmap (bool, optional): Whether to memory-map uncompressed files. Defaults to True.
+
+    Returns:
+        dict: Entry of the segment in the index of the store.
+    """
+
+    import numpy
+    import shutil
+
+    path = task[0]
+    stat = os.stat(path)
+    name = get_segment_name(path)
+    segment_path = os.path.join(store_path, 'segments', name)
+    temporary_path = f'{segment_path}.tmp'
+
+    if os.path.exists(temporary_path):
+        shutil.rmtree(temporary_path)
+    os.makedirs(temporary_path)
+
+    # numbers are written as int64 until their range is known
+    dtypes = {column: numpy.int64 for column in STORE_NUMBERS}
+    dtypes.update({'client_high': numpy.uint64, 'client_low': numpy.uint64})
+    dtypes.update({column: numpy.uint32 for column in STORE_DICTIONARIES})
+
+    fields = list(STORE_NUMBERS.values()) + [STORE_CLIENT_FIELD] + list(STORE_DICTIONARIES.values())
+    ranges = {column: (0, 0) for column in STORE_NUMBERS}
+    client_names = {}
+    dictionaries = {column: {} for column in STORE_DICTIONARIES}
+    lines = 0
+    events = 0
+
+    raw_files = {column: open(os.path.join(temporary_path, f'{column}.raw'), 'wb') for column in dtypes}
+    try:
+        for block in read_line_blocks(path, block_size=block_size, use_mmap=use_mmap):
+            # values are sliced from a copy of the block, slices of memory-mapped blocks can not be dictionary keys
+            block = bytes(block)
+
+            # the last line of a file may not end with a newline
+            if block[-1] != 10:
+                block += b'\n'
+
+            data = numpy.frombuffer(block, dtype=numpy.uint8)
+            block_lines, block_events, located = locate_fields_numpy(numpy, data, fields)
+            lines += block_lines
+            if not block_events:
+                continue
+
+            # lines with invalid numbers are skipped
+            valid = numpy.ones(block_events, dtype=bool)
+            block_numbers = {}
+            for column, field in STORE_NUMBERS.items():
+                block_numbers[column], field_valid = parse_integers_numpy(numpy, data, *located[field], fraction=column == 'epoch')
+                valid &= field_valid
+            if not valid.all():
+                block_events = int(valid.sum())
+                if not block_events:
+                    continue
+                block_numbers = {column: column_numbers[valid] for column, column_numbers in block_numbers.items()}
+                located = {field: (starts[valid], ends[valid]) for field, (starts, ends) in located.items()}
+
+            events += block_events
+            for column, values in block_numbers.items():
+                low, high = ranges[column]
+                ranges[column] = (min(low, int(values.min())), max(high, int(values.max())))
+                raw_files[column].write(values.tobytes())
+
+            keys = pack_ips_numpy(numpy, data, *located[STORE_CLIENT_FIELD], client_names)
+            raw_files['client_high'].write(keys['high'].tobytes())
+            raw_files['client_low'].write(keys['low'].tobytes())
+
+            for column, field in STORE_DICTIONARIES.items():
+                raw_files[column].write(encode_values(numpy, block, *located[field], dictionaries[column]).tobytes())
+    finally:
+        for f in raw_files.values():
+            f.close()
+
+    for column, dtype in dtypes.items():
+        # sizes are stored in 32 bits when they fit
+        stored_dtype = dtype
+        if column in STORE_NUMBERS and column != 'epoch' and ranges[column][0] >= -2 ** 31 and ranges[column][1] < 2 ** 31:
+            stored_dtype = numpy.int32
+
+        save_store_column(numpy, temporary_path, column, dtype, stored_dtype, max(block_size // 8, 1))
+
+    # values never contain whitespace, so they are separated by newlines in the order of their codes
+    dictionaries['client'] = [name.encode() for name in client_names]
+    for column, values in dictionaries.items():
+        with open(os.path.join(temporary_path, f'{column}.dict'), 'wb') as f:
+            f.write(b'\n'.join(values))
+
+    segment = {
+        'name': name,
+        'source': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'lines': lines,
+        'events': events
+    }
+    with open(os.path.join(temporary_path, 'segment.json'), 'w') as f:
+        json.dump(segment, f)
+
+    if os.path.exists(segment_path):
+        shutil.rmtree(segment_path)
+    os.replace(temporary_path, segment_path)
+
+    return segment
+
+
+def ingest(args):
+    """Convert log files into a columnar store with parsed commandline options of the ingest command.
+
+    Files which have not changed since they were ingested are skipped, changed files replace their segments.
+
+    Args:
+        args (argparse.Namespace): Parsed commandline options.
+    """
+
+    if args.block_size <= 0:
+        logger.error('Block size must be a positive number!')
+        sys.exit(1)
+
+    # do not write into directories which are not stores
+    if os.path.exists(args.store) and not is_store(args.store) and (not os.path.isdir(args.store) or os.listdir(args.store)):
+        logger.error(f'\'{args.store}\' is not a store - use a new or empty directory!')
+        sys.exit(1)
+
+    # files of the store itself are never ingested
+    pattern_filter = prepare_filters(args.filter)
+    store_prefix = os.path.join(os.path.abspath(args.store), '')
+    files = [path for path in get_files_from_paths(args.input_paths, recurse=args.recurse, pattern_filter=pattern_filter, include=args.include, exclude=args.exclude) if not os.path.abspath(path).startswith(store_prefix)]
+
+    if not files:
+        logger.warning(f'No log files specified!')
+        sys.exit(1)
+
+    index = load_store(args.store)
+    segments = {segment['name']: segment for segment in index['segments']}
+
+    to_ingest = []
+    for path in files:
+        stat = os.stat(path)
+        segment = segments.get(get_segment_name(path))
+        if segment and (segment['size'], segment['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            logger.debug(f'Skipping \'{path}\' - not changed since it was ingested.')
+            continue
+        to_ingest.append(path)
+
+    # use all CPUs if the number of jobs is 0
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+
+    os.makedirs(os.path.join(args.store, 'segments'), exist_ok=True)
+
+    # new files are added after the ingested ones, changed files keep their place
+    for segment in map_tasks(ingest_file, [(path, 0, None) for path in to_ingest], jobs=jobs, store_path=args.store, block_size=args.block_size, use_mmap=not args.no_mmap):
+        segments[segment['name']] = segment
+        logger.debug(f'Ingested \'{segment["source"]}\' ({segment["events"]} events).')
+
+    index['segments'] = list(segments.values())
+    save_store(args.store, index)
+
+    logger.info(f'Ingested {len(to_ingest)} of {len(files)} files into \'{args.store}\'.')
+
+
+def init_inotify(paths):
+    """Start watching directories of log files for changes with inotify.
+
+    Args:
+        paths (list): Paths to log files or directories containing them.
+
+    Returns:
+        int: File descriptor of the inotify instance or None if inotify is not available.
+    """
+
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except:
+        return None
+
+    if fd < 0:
+        return None
+
+    # watch directories, so new files are noticed after log rotation
+    directories = {os.path.abspath(p) if os.path.isdir(p) else os.path.dirname(os.path.abspath(p)) for p in paths}
+    for directory in directories:
+        if libc.inotify_add_watch(fd, directory.encode(), INOTIFY_MASK) < 0:
+            logger.debug(f'Unable to watch directory \'{directory}\' - falling back to polling.')
+            os.close(fd)
+            return None
+
+    return fd
+
+
+def wait_for_changes(inotify_fd, timeout, stop):
+    """Wait until log files change or a timeout passes.
+
+    Args:
+        inotify_fd (int): File descriptor of the inotify instance or None to poll.
+        timeout (float): Maximum time to wait in seconds.
+        stop (threading.Event): Event stopping the wait early.
+    """
+
+    # poll for changes
+    if inotify_fd is None:
+        stop.wait(min(timeout, POLL_INTERVAL))
+        return
+
+    import select
+
+    if select.select([inotify_fd], [], [], timeout)[0]:
+        # throw away all pending events, the files are checked anyway
+        try:
+            while os.read(inotify_fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+
+def write_result(result, output_file_path):
+    """Atomically write results to the output file.
+
+    Args:
+        result (dict): Analysis results.
+        output_file_path (pathlib.Path): Path to the output file.
+    """
+
+    # write to a temporary file first, so readers never see a partially written file
+    temporary_path = f'{output_file_path}.tmp'
+    try:
+        with open(temporary_path, 'w') as output:
+            output.write(json.dumps(result, indent=4))
+        os.replace(temporary_path, output_file_path)
+    except:
+        logger.debug(f'Unable to write output file \'{output_file_path}\'!')
+        sys.exit(1)
+
+
+def write_partial(partial, engine_name, operations, output_file_path):
+    """Atomically write a partial aggregate, which is combined with others by the merge command.
+
+    The file is compact JSON, compressed with gzip when the name ends with .gz. Its header records the engine, the version
+    of the parsers and the options changing the counts, so the merge command only combines comparable aggregates.
+
+    Args:
+        partial (dict): Partial aggregate of all analyzed files.
+        engine_name (str): Name of the engine which analyzed the files.
+        operations (dict): Operations of the analysis.
+        output_file_path (pathlib.Path): Path to the output file or None to print the partial aggregate to stdout.
+    """
+
+    data = json.dumps({
+        'version': PARTIAL_VERSION,
+        'engine': engine_name,
+        'parser_version': CACHE_VERSION,
+        'options': {'exclude_header_sizes': operations['exclude_header_sizes'], 'ip_capacity': operations['ip_capacity']},
+        'operations': operations,
+        'partial': serialize_partial(partial)
+    }, separators=(',', ':'))
+
+    if not output_file_path:
+        print(data, flush=True)
+        return
+
+    temporary_path = f'{output_file_path}.tmp'
+    try:
+        if str(output_file_path).endswith('.gz'):
+            import gzip
+
+            with gzip.open(temporary_path, 'wt') as output:
+                output.write(data)
+        else:
+            with open(temporary_path, 'w') as output:
+                output.write(data)
+        os.replace(temporary_path, output_file_path)
+    except:
+        logger.exception(f'Unable to write partial aggregate \'{output_file_path}\'!')
+        sys.exit(1)
+
+
+def load_partial(path):
+    """Load a partial aggregate written with --partial.
+
+    Args:
+        path (str): Path to the file, it can be compressed.
+
+    Returns:
+        tuple: Header of the file (see PARTIAL_HEADER) and the partial aggregate.
+    """
+
+    try:
+        with open_log(path, detect_compression(path)) as f:
+            data = json.loads(f.read())
+        version = data.get('version')
+    except:
+        logger.exception(f'Unable to read partial aggregate \'{path}\'!')
+        sys.exit(1)
+
+    if version != PARTIAL_VERSION:
+        logger.error(f'Partial aggregate \'{path}\' has version {version}, but version {PARTIAL_VERSION} is supported - analyze the logs again with this version!')
+        sys.exit(1)
+
+    return {key: data.get(key) for key in PARTIAL_HEADER}, deserialize_partial(data['partial'])
+
+
+def start_http_server(address):
+    """Start an HTTP server serving analysis snapshots in a background thread.
+
+    Args:
+        address (str): Address to listen on in the form of [HOST:]PORT. The host defaults to localhost.
+
+    Returns:
+        http.server.ThreadingHTTPServer: Running HTTP server.
+    """
+
+    # the HTTP server is only imported in --follow mode, it takes long to import
+    import http.server
+
+    class SnapshotHandler(http.server.BaseHTTPRequestHandler):
+        """Serve the latest snapshot of the analysis results as JSON.
+        """
+
+        def do_GET(self):
+            snapshot = self.server.snapshot
+
+            # no data have been analyzed yet
+            if snapshot is None:
+                self.send_error(503, 'No data analyzed yet')
+                return
+
+            body = snapshot.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(f'HTTP: {format % args}')
+
+    host, _, port = address.rpartition(':')
+
+    try:
+        server = http.server.ThreadingHTTPServer((host or '127.0.0.1', int(port)), SnapshotHandler)
+    except Exception as ex:
+        logger.error(f'Unable to start HTTP server on \'{address}\': {ex}')
+        sys.exit(1)
+
+    server.snapshot = None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f'Serving snapshots on http://{server.server_address[0]}:{server.server_address[1]}/')
+
+    return server
+
+
+def follow_files(discover, engine_name, operations, interval = 10, output_file_path = None, http_server = None, state_path = None, jobs = 1, stop = None, **parser_options):
+    """Continuously analyze growing log files and periodically publish snapshots of the results.
+
+    Only data appended since the previous check is analyzed. Results of rotated, truncated or removed files are kept.
+
+    Args:
+        discover (function): Function returning the list of file paths to analyze.
+        engine_name (str): Name of the engine from ENGINES.
+        operations (dict): Operations to analyze.
+        interval (float, optional): Number of seconds between snapshots. Defaults to 10.
+        output_file_path (pathlib.Path, optional): Output file rewritten with every snapshot. Defaults to None, which prints snapshots to stdout.
+        http_server (http.server.HTTPServer, optional): HTTP server to publish snapshots on. Defaults to None.
+        state_path (str, optional): Path to a state file to resume from and to save with every snapshot. Defaults to None.
+        jobs (int, optional): Number of worker processes. Defaults to 1.
+        stop (threading.Event, optional): Event stopping the analysis. Defaults to None, which means running until interrupted.
+        **parser_options: Options passed to the parser.
+    """
+
+    engine = ENGINES[engine_name]
+    stop = stop or threading.Event()
+
+    # followed files are never memory-mapped, reading a mapping of a truncated file crashes the process
+    if engine['streaming']:
+        parser_options['use_mmap'] = False
+
+    state_options = dict(operations, engine=engine_name)
+    state_files = load_state(state_path, state_options) if state_path else {}
+
+    # results of files that are no longer analyzed
+    retired = new_partial()
+
+    inotify_fd = None
+    next_snapshot = time.monotonic()
+
+    try:
+        while not stop.is_set():
+            to_process = discover()
+
+            # watch the files for changes once there are some
+            if inotify_fd is None and to_process:
+                inotify_fd = init_inotify(to_process)
+                logger.debug(f'Watching for changes using {"polling" if inotify_fd is None else "inotify"}.')
+
+            # analyze the appended data
+            discarded = []
+            state_files = parse_files_incremental(to_process, state_files, engine['parse_file'], jobs=jobs, discarded=discarded, operations=operations, **parser_options)
+            for partial in discarded:
+                merge_partials(retired, partial)
+
+            now = time.monotonic()
+            if now >= next_snapshot:
+                next_snapshot = now + interval
+                publish_snapshot(operations, retired, state_files, output_file_path, http_server)
+
+                if state_path:
+                    save_state(state_path, state_options, state_files)
+
+            wait_for_changes(inotify_fd, max(0, next_snapshot - time.monotonic()), stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if inotify_fd is not None:
+            os.close(inotify_fd)
+
+    # publish the final results
+    publish_snapshot(operations, retired, state_files, output_file_path, http_server)
+    if state_path:
+        save_state(state_path, state_options, state_files)
+
+
+def publish_snapshot(operations, retired, state_files, output_file_path = None, http_server = None):
+    """Publish a snapshot of the current analysis results.
+
+    Args:
+        operations (dict): Operations to analyze.
+        retired (dict): Partial aggregate of files that are no longer analyzed.
+        state_files (dict): State of analyzed files by their paths.
+        output_file_path (pathlib.Path, optional): Output file to rewrite. Defaults to None, which prints the snapshot to stdout.
+        http_server (http.server.HTTPServer, optional): HTTP server to publish the snapshot on. Defaults to None.
+    """
+
+    partial = merge_partials(new_partial(), retired)
+    for state_file in state_files.values():
+        merge_partials(partial, state_file['partial'])
+
+    # nothing to summarize yet
+    if not partial['events']:
+        logger.debug('Waiting for data.')
+        return
+
+    result = {}
+    summarize(result, partial, operations)
+
+    if http_server:
+        http_server.snapshot = json.dumps(result, indent=4)
+    elif not output_file_path:
+        print(json.dumps(result), flush=True)
+
+    if output_file_path:
+        write_result(result, output_file_path)
+
+
+def merge(args):
+    """Combine partial aggregates into the results with parsed commandline options of the merge command.
+
+    Partial aggregates are merged in the given order, so the results are the same as of a single run analyzing
+    the log files of all partial aggregates in the same order.
+
+    Args:
+        args (argparse.Namespace): Parsed commandline options.
+    """
+
+    output_file_path = prepare_output_file(args.output_file, args.force)
+
+    header = None
+    partial = new_partial()
+
+    for path in args.partial_files:
+        file_header, file_partial = load_partial(path)
+
+        # the results can only be summarized when every file was analyzed the same way
+        if header is None:
+            header = file_header
+        for key, description in PARTIAL_HEADER.items():
+            if file_header[key] != header[key]:
+                logger.error(f'Partial aggregate \'{path}\' was analyzed with {description} than \'{args.partial_files[0]}\'!')
+                sys.exit(1)
+
+        logger.debug(f'Merging \'{path}\' ({file_partial["events"]} events).')
+        merge_partials(partial, file_partial)
+
+    # there may be no events in the time window
+    if not partial['events']:
+        logger.info('Nothing to do - no events found.')
+        sys.exit(0)
+
+    result = {}
+    summarize(result, partial, header['operations'])
+
+    # print to stdout if '-' was supplied as output file path
+    if not output_file_path:
+        print(json.dumps(result, indent=4), flush=True)
+        sys.exit(0)
+
+    write_result(result, output_file_path)
+
+
+def analyze(args):
+    """Run the analysis with parsed commandline options.
+
+    Args:
+        args (argparse.Namespace): Parsed commandline options.
+    """
+
+    # check if the block size is valid
+    if args.block_size <= 0:
+        logger.error('Block size must be a positive number!')
+        sys.exit(1)
+
+    if args.io_depth < 0:
+        logger.error('I/O depth must not be negative!')
+        sys.exit(1)
+
+    # check if the numbers of IP addresses are valid
+    if args.top < 0 or args.bottom < 0:
+        logger.error('Number of IP addresses must not be negative!')
+        sys.exit(1)
+
+    # check if the numbers of hosts are valid
+    if args.top_domains < 0 or args.top_destinations < 0:
+        logger.error('Number of hosts must not be negative!')
+        sys.exit(1)
+
+    # the least frequent addresses are pruned first, so they can not be counted approximately
+    if args.approx and (args.lfip or args.bottom):
+        logger.error('The least frequent IP addresses can not be approximated - remove --approx or --lfip and --bottom!')
+        sys.exit(1)
+
+    if args.approx and not 0 < args.approx_error < 1:
+        logger.error('Approximation error must be between 0 and 1!')
+        sys.exit(1)
+
+    if args.since is not None and args.until is not None and args.since >= args.until:
+        logger.error('The --since time must be before the --until time!')
+        sys.exit(1)
+
+    if not 4 <= args.hll_precision <= 18:
+        logger.error('HyperLogLog precision must be between 4 and 18!')
+        sys.exit(1)
+
+    if args.agg and not args.group_by:
+        logger.error('Aggregations need groups - add --group-by!')
+        sys.exit(1)
+
+    # check if at least one operation was set
+    if not args.mfip and not args.lfip and not args.eps and not args.bytes and not args.top and not args.bottom and not args.distinct and not args.timeseries and not args.group_by and not args.top_domains and not args.top_destinations and not args.percentiles:
+        logger.info('Nothing to do - no operation supplied.')
+        sys.exit(0)
+
+    # prepare pattern filter
+    pattern_filter = prepare_filters(args.filter)
+
+    # wall clock and CPU times of phases of the analysis, only measured with --stats
+    phases = {}
+
+    # stores created by the ingest command are analyzed instead of log files
+    stores = [path for path in args.input_paths if is_store(path)]
+    if stores and len(stores) < len(args.input_paths):
+        logger.error('Stores and log files can not be analyzed together - ingest the log files into the store!')
+        sys.exit(1)
+
+    if args.partial and args.follow:
+        logger.error('Partial aggregates can not be written in --follow mode!')
+        sys.exit(1)
+
+    if stores and (args.follow or args.state):
+        logger.error('Stores can not be analyzed with --follow or --state - ingest new data into the store instead!')
+        sys.exit(1)
+
+    # files to process are analyzed while they are being discovered
+    if stores:
+        discovered = iter_store_segments(stores)
+    else:
+        discovered = iter_files_from_paths(args.input_paths, recurse=args.recurse, pattern_filter=pattern_filter, include=args.include, exclude=args.exclude)
+    if args.stats:
+        discovered = measure_iterator(discovered, phases, 'discovery')
+    first_file = next(discovered, None)
+
+    # exit if no files were specified
+    if first_file is None:
+        logger.warning(f'No log files specified!')
+        sys.exit(1)
+
+    to_process = itertools.chain([first_file], discovered)
+
+    # get output file path
+    output_file_path = prepare_output_file(args.output_file, args.force)
+
+    # use all CPUs if the number of jobs is 0
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+
+    # use regex parser if --fast option is set, unless an engine is selected explicitly
+    engine_name = 'store' if stores else args.engine or ('regex' if args.fast else 'auto')
+    engine = ENGINES[engine_name]
+
+    operations = {
+        'mfip': args.mfip,
+        'lfip': args.lfip,
+        'eps': args.eps,
+        'count_bytes': args.bytes,
+        'exclude_header_sizes': args.exclude_header_sizes,
+        'top': args.top,
+        'bottom': args.bottom,
+        # keeping 1/epsilon addresses limits the error to epsilon times the number of events
+        'ip_capacity': max(math.ceil(1 / args.approx_error), args.top) if args.approx else None,
+        # every field is only counted once
+        'distinct': list(dict.fromkeys(args.distinct or [])),
+        'hll_precision': args.hll_precision,
+        'timeseries': args.timeseries,
+        'since': args.since,
+        'until': args.until,
+        # every grouping is only aggregated once
+        'group_by': [list(fields) for fields in dict.fromkeys(tuple(fields) for fields in args.group_by or [])],
+        'aggregations': (args.agg or [['count', None]]) if args.group_by else [],
+        'top_domains': args.top_domains,
+        'top_destinations': args.top_destinations,
+        'percentiles': args.percentiles
+    }
+
+    # the block size and memory mapping are only used by the parsers reading files in blocks
+    parser_options = {}
+    if engine['streaming']:
+        parser_options['block_size'] = args.block_size
+        parser_options['use_mmap'] = not args.no_mmap
+
+    if args.follow:
+        # start the HTTP server before the first snapshot
+        http_server = start_http_server(args.http) if args.http else None
+
+        discover = lambda: get_files_from_paths(args.input_paths, recurse=args.recurse, pattern_filter=pattern_filter, include=args.include, exclude=args.exclude)
+        follow_files(discover, engine_name, operations, interval=args.interval, output_file_path=output_file_path, http_server=http_server, state_path=args.state, jobs=jobs, **parser_options)
+        sys.exit(0)
+
+    # the cache is opt-in, runs only write to the cache directory when asked to
+    use_cache = bool(args.cache or args.cache_dir) and not args.state and not stores
+
+    # tasks are analyzed through a wrapper collecting their statistics with --stats, they are also cached with the results
+    parse_file = engine['parse_file']
+    if args.stats or use_cache:
+        parse_file = functools.partial(measure_task, parse_file=parse_file)
+    if args.stats:
+        started = start_phase()
+        discovery = dict(phases['discovery'])
+
+    if args.state:
+        # only analyze data appended since the last run
+        state_options = dict(operations, engine=engine_name)
+        state_files = load_state(args.state, state_options)
+        state_files = parse_files_incremental(list(to_process), state_files, parse_file, jobs=jobs, operations=operations, **parser_options)
+        save_state(args.state, state_options, state_files)
+
+        partial = new_partial()
+        for state_file in state_files.values():
+            merge_partials(partial, state_file['partial'])
+    elif stores:
+        # segments are analyzed whole and faster than their cache entries would be loaded
+        tasks = ((segment, 0, None) for segment in to_process)
+        partial = map_partials(parse_file, tasks, jobs=jobs, operations=operations)
+    elif use_cache:
+        # files are analyzed with all basic operations, so the cached results can be used by runs with other operations
+        cache_operations = dict(operations, mfip=True, lfip=True, eps=True, count_bytes=True, top=0, bottom=0)
+        # the bytes of time series and groups depend on whether header sizes are excluded
+        if not args.timeseries and not plan_groups(operations)['groupings']:
+            cache_operations['exclude_header_sizes'] = False
+
+        cache_dir = args.cache_dir or get_cache_dir()
+        partial = parse_files_cached(to_process, cache_dir, dict(cache_operations, engine=engine_name), parse_file, cache_operations, jobs=jobs, split_files=engine['split_files'], uncached=operations, io_depth=args.io_depth, **parser_options)
+
+        # header sizes are always counted in cached results
+        if args.exclude_header_sizes:
+            partial['bytes_headers'] = 0
+    else:
+        tasks = stream_tasks(to_process, jobs, split_files=engine['split_files'], since=args.since, until=args.until)
+        if args.io_depth:
+            tasks = prefetch_tasks(tasks, args.io_depth)
+        partial = map_partials(parse_file, tasks, jobs=jobs, operations=operations, **parser_options)
+
+    # files are discovered during the analysis, the time spent discovering them is not counted twice
+    if args.stats:
+        end_phase(phases, 'analysis', started)
+        for key in ('wall', 'cpu'):
+            phases['analysis'][key] -= phases['discovery'][key] - discovery[key]
+
+    # the partial aggregate is written even without events, so the merge command gets one from every machine
+    if args.partial:
+        write_partial(partial, engine_name, operations, output_file_path)
+        return
+
+    # there may be no events in the time window
+    if not partial['events']:
+        logger.info('Nothing to do - no events found.')
+        sys.exit(0)
+
+    if args.stats:
+        started = start_phase()
+    result = {}
+    summarize(result, partial, operations)
+    logger.debug(f'Peak memory usage: {get_peak_rss()} bytes.')
+
+    if args.stats:
+        end_phase(phases, 'summary', started)
+
+        # the _meta section can not contain the time of its own output, so the results are encoded once without it
+        started = start_phase()
+        json.dumps(result, indent=4)
+        end_phase(phases, 'output', started)
+
+        result['_meta'] = summarize_stats(phases, partial.get('tasks', []))
+
+    # print to stdout if '-' was supplied as output file path
+    if not output_file_path:
+        print(json.dumps(result, indent=4), flush=True)
+        sys.exit(0)
+
+    # write results to the output file
+    write_result(result, output_file_path)
+
+def run():
+    """Main function for setting up the tool and running the analysis.
+    """
+
+    # the ingest and merge commands have their own arguments
+    commands = {
+        'ingest': (init_ingest_argparser, ingest),
+        'merge': (init_merge_argparser, merge)
+    }
+    if sys.argv[1:2] and sys.argv[1] in commands:
+        init_command_argparser, command = commands[sys.argv[1]]
+        args = init_command_argparser().parse_args(sys.argv[2:])
+        init_logger(logging.DEBUG if args.verbose else logging.INFO)
+        command(args)
+        return
+
+    # initialize argument parser
+    parser = init_argparser()
+    # parse arguments
+    args = parser.parse_args()
+
+    # set up logging
+    init_logger(logging.DEBUG if args.verbose else logging.INFO)
+
+    if not args.profile:
+        analyze(args)
+        return
+
+    # only this process is profiled, workers started with --jobs are not
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(analyze, args)
+    finally:
+        profiler.dump_stats(args.profile)
+        logger.debug(f'Profile written to \'{args.profile}\'.')
 
 if __name__ == '__main__':
     run()
@@ -0,0 +1,126 @@
+#! /usr/bin/env python3
+
+import argparse
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from generate_log import generate_log
+
+# path to the analyzer, it is run in a separate process for every measurement
+ANALYZER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'analyzer.py')
+
+# engines benchmarked by default
+ENGINES = ['auto', 'pandas', 'regex', 'split', 'numpy']
+
+# combinations of operations benchmarked by default, separated by semicolons
+OPERATIONS = '--mfip;--eps;--bytes;--mfip --lfip --eps --bytes'
+
+
+def measure(arguments):
+    """Run the analyzer in a separate process and measure it.
+
+    Args:
+        arguments (list): Command line arguments of the analyzer.
+
+    Raises:
+        RuntimeError: If the analyzer fails.
+
+    Returns:
+        tuple: Wall clock time in seconds and peak resident set size in bytes of the process.
+    """
+
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, ANALYZER] + arguments, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    # wait4() returns the resource usage of this process only
+    _, status, usage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    if process.returncode:
+        raise RuntimeError(f'Analyzer failed: {process.stderr.read().decode()}')
+    process.stderr.close()
+
+    # the value is in bytes on macOS and in kilobytes elsewhere
+    return seconds, usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+
+def run():
+    """Run every engine with every combination of operations on a synthetic log and report the results as JSON.
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmark the engines of the analyzer on a synthetic log.')
+    parser.add_argument('--lines', type=int, default=1000000, help='number of lines of the synthetic log')
+    parser.add_argument('--ips', type=int, default=1000, help='number of distinct client IP addresses')
+    parser.add_argument('--span', type=int, default=86400, help='number of seconds between the first and the last event')
+    parser.add_argument('--malformed', type=float, default=0.0, help='fraction of truncated or merged lines')
+    parser.add_argument('--compression', choices=['gzip', 'bz2', 'xz'], help='compress the synthetic log')
+    parser.add_argument('--engines', type=str, default=','.join(ENGINES), help='comma separated list of engines')
+    parser.add_argument('--operations', type=str, default=OPERATIONS, help='semicolon separated combinations of operations')
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs of every combination, the fastest one is reported')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes of the analyzer')
+    args = parser.parse_args()
+
+    engines = args.engines.split(',')
+    combinations = [operations.split() for operations in args.operations.split(';')]
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        generated = generate_log(os.path.join(directory, 'access.log'), lines=args.lines, ips=args.ips, span=args.span, malformed=args.malformed, compression=args.compression)
+        size = os.path.getsize(generated['path'])
+
+        # startup is measured on a log with a single line
+        tiny = generate_log(os.path.join(directory, 'tiny.log'), lines=1)
+
+        for engine in engines:
+            common = ['--engine', engine, '-j', str(args.jobs)]
+            startup = min(measure([tiny['path'], '-', '--eps'] + common)[0] for _ in range(args.repeat))
+
+            for operations in combinations:
+                # an engine which cannot handle the log (e.g. pandas with a merged first line) is reported, not fatal
+                try:
+                    measurements = [measure([generated['path'], '-'] + operations + common) for _ in range(args.repeat)]
+                except RuntimeError as e:
+                    results.append({'engine': engine, 'operations': ' '.join(operations), 'error': str(e).strip().splitlines()[-1]})
+                    continue
+
+                seconds = min(measurement[0] for measurement in measurements)
+
+                results.append({
+                    'engine': engine,
+                    'operations': ' '.join(operations),
+                    'seconds': seconds,
+                    'lines_per_second': generated['lines'] / seconds,
+                    'mb_per_second': generated['bytes'] / seconds / 1024 / 1024,
+                    'peak_rss': max(measurement[1] for measurement in measurements),
+                    'startup_seconds': startup
+                })
+
+    # speedup against the regex engine with the same operations
+    baseline = {result['operations']: result['seconds'] for result in results if result['engine'] == 'regex' and 'error' not in result}
+    for result in results:
+        if result['operations'] in baseline and 'error' not in result:
+            result['speedup'] = baseline[result['operations']] / result['seconds']
+
+    print(json.dumps({
+        'input': {
+            'lines': generated['lines'],
+            'bytes': generated['bytes'],
+            'file_size': size,
+            'ips': args.ips,
+            'span': args.span,
+            'malformed': args.malformed,
+            'compression': args.compression,
+            'jobs': args.jobs
+        },
+        'results': results
+    }, indent=4))
+
+
+if __name__ == '__main__':
+    run()
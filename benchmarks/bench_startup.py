@@ -0,0 +1,109 @@
+#! /usr/bin/env python3
+
+import argparse
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from generate_log import generate_log
+
+# directory of the analyzer, it is run in a separate process for every measurement
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# commands run as a script and as a module, the module is loaded from the compiled bytecode
+LAUNCHERS = {
+    'script': [sys.executable, os.path.join(ROOT, 'analyzer.py')],
+    'module': [sys.executable, '-m', 'analyzer']
+}
+
+# startup target in milliseconds
+TARGET = 50
+
+
+def measure(command, repeat, env):
+    """Run a command several times and measure the fastest run.
+
+    Args:
+        command (list): Command to run.
+        repeat (int): Number of runs.
+        env (dict): Environment of the command.
+
+    Raises:
+        RuntimeError: If the command fails.
+
+    Returns:
+        float: Wall clock time of the fastest run in milliseconds.
+    """
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, cwd=ROOT, env=env)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        if completed.returncode:
+            raise RuntimeError(f'Command {command} failed: {completed.stderr.decode()}')
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def run():
+    """Measure the startup time of the analyzer on --help and small inputs and report the results as JSON.
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmark the startup time of the analyzer.')
+    parser.add_argument('--lines', type=int, default=1000, help='number of lines of the small log')
+    parser.add_argument('--repeat', type=int, default=10, help='number of runs of every command, the fastest one is reported')
+    parser.add_argument('--target', type=float, default=TARGET, help='startup target in milliseconds')
+    args = parser.parse_args()
+
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        small = generate_log(os.path.join(directory, 'access.log'), lines=args.lines)
+
+        # the cache of the benchmark does not mix with the cache of the user
+        env = dict(os.environ, XDG_CACHE_HOME=os.path.join(directory, 'cache'))
+
+        # compile the bytecode of the module once
+        subprocess.run(LAUNCHERS['module'] + ['--help'], stdout=subprocess.DEVNULL, cwd=ROOT, env=env)
+
+        cases = {
+            'help': ['--help'],
+            'bytes': [small['path'], '-', '--bytes'],
+            'eps_bytes': [small['path'], '-', '--eps', '--bytes'],
+            'eps_bytes_cache': [small['path'], '-', '--eps', '--bytes', '--cache'],
+            'mfip': [small['path'], '-', '--mfip']
+        }
+
+        baseline = measure([sys.executable, '-c', 'pass'], args.repeat, env)
+
+        for launcher, command in LAUNCHERS.items():
+            for case, arguments in cases.items():
+                milliseconds = measure(command + arguments, args.repeat, env)
+                results.append({
+                    'case': case,
+                    'launcher': launcher,
+                    'milliseconds': milliseconds,
+                    # the time of the interpreter itself is not spent by the analyzer
+                    'over_interpreter': milliseconds - baseline,
+                    'within_target': milliseconds <= args.target
+                })
+
+    print(json.dumps({
+        'lines': small['lines'],
+        'target_milliseconds': args.target,
+        'interpreter_milliseconds': baseline,
+        # without writing bytecode the module is compiled by every run, like the script
+        'bytecode_cached': not sys.flags.dont_write_bytecode and not os.environ.get('PYTHONDONTWRITEBYTECODE'),
+        'results': results
+    }, indent=4))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,123 @@
+#! /usr/bin/env python3
+
+import argparse
+import os
+import sys
+import random
+import gzip
+import bz2
+import lzma
+
+
+# openers of compressed log files by the compression name
+OPENERS = {
+    None: open,
+    'gzip': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open
+}
+
+# file name suffixes of compressed log files
+SUFFIXES = {
+    None: '',
+    'gzip': '.gz',
+    'bz2': '.bz2',
+    'xz': '.xz'
+}
+
+# epoch time of the first generated event
+START_EPOCH = 1579776202
+
+# request methods, response codes and mimetypes picked at random
+METHODS = ['GET', 'GET', 'GET', 'POST', 'CONNECT', 'HEAD']
+CODES = ['TCP_MISS/200', 'TCP_MISS/200', 'TCP_HIT/200', 'TCP_TUNNEL/200', 'TCP_MISS/304', 'TCP_DENIED/403', 'TCP_MISS/404']
+MIMETYPES = ['text/html', 'text/plain', 'image/gif', 'application/json', '-']
+
+
+def generate_log(path, lines = None, size = None, ips = 1000, span = 86400, malformed = 0.0, compression = None, seed = 0):
+    """Generate a deterministic synthetic Squid access log.
+
+    Either the number of lines or the (uncompressed) size is given. Events are spread evenly over the time span
+    and client addresses are picked from a fixed pool, a few of them much more often than others.
+
+    Args:
+        path (str): Path to the generated log file (without the compression suffix).
+        lines (int, optional): Number of log lines. Defaults to None.
+        size (int, optional): Size of the uncompressed log in bytes, used when lines is not given. Defaults to None.
+        ips (int, optional): Number of distinct client IP addresses. Defaults to 1000.
+        span (int, optional): Number of seconds between the first and the last event. Defaults to 86400.
+        malformed (float, optional): Fraction of lines which are truncated or merged with the next line. Defaults to 0.0.
+        compression (str, optional): Compression of the log (gzip, bz2 or xz). Defaults to None.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        dict: Path to the generated file, number of lines and number of uncompressed bytes.
+    """
+
+    if lines is None and size is None:
+        raise ValueError('Either the number of lines or the size has to be given!')
+
+    rnd = random.Random(seed)
+    path = path + SUFFIXES[compression]
+
+    # the number of lines is estimated from the size to spread the events over the time span
+    expected_lines = lines if lines is not None else max(1, size // 120)
+
+    written_lines = 0
+    written_bytes = 0
+
+    with OPENERS[compression](path, 'wb') as f:
+        while (written_lines < lines) if lines is not None else (written_bytes < size):
+            epoch = START_EPOCH + written_lines * span // expected_lines
+
+            # a few addresses are heavy hitters, the rest is spread evenly
+            index = rnd.randrange(min(ips, 10)) if rnd.random() < 0.3 else rnd.randrange(ips)
+            ip = f'10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}'
+
+            line = (f'{epoch}.{rnd.randrange(1000):03} {rnd.randrange(-1, 5000):6} {ip} {rnd.choice(CODES)} {rnd.randrange(-1, 100000)} '
+                    f'{rnd.choice(METHODS)} http://host{rnd.randrange(500)}.example.com/{rnd.randrange(10000)} - '
+                    f'HIER_DIRECT/23.203.{rnd.randrange(256)}.{rnd.randrange(256)} {rnd.choice(MIMETYPES)}')
+
+            # truncated lines have too few fields, merged lines miss the newline and are continued by the next line
+            if malformed and rnd.random() < malformed:
+                line = (' '.join(line.split()[:rnd.randrange(1, 9)]) + '\n') if rnd.random() < 0.5 else line + ' '
+                line = line.encode()
+            else:
+                line = line.encode() + b'\n'
+
+            f.write(line)
+            written_lines += 1
+            written_bytes += len(line)
+
+        # the last line always ends with a newline
+        f.write(b'\n')
+        written_bytes += 1
+
+    return {
+        'path': path,
+        'lines': written_lines,
+        'bytes': written_bytes
+    }
+
+
+def run():
+    """Generate a synthetic log from the command line.
+    """
+
+    parser = argparse.ArgumentParser(description='Generate a deterministic synthetic Squid access log.')
+    parser.add_argument('output', metavar='OUTPUT', type=str, help='path to the generated log (the compression suffix is added)')
+    parser.add_argument('--lines', type=int, help='number of log lines')
+    parser.add_argument('--size', type=int, default=100 * 1024 * 1024, help='size of the uncompressed log in bytes, used without --lines')
+    parser.add_argument('--ips', type=int, default=1000, help='number of distinct client IP addresses')
+    parser.add_argument('--span', type=int, default=86400, help='number of seconds between the first and the last event')
+    parser.add_argument('--malformed', type=float, default=0.0, help='fraction of truncated or merged lines')
+    parser.add_argument('--compression', choices=['gzip', 'bz2', 'xz'], help='compress the generated log')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random generator')
+    args = parser.parse_args()
+
+    generated = generate_log(args.output, lines=args.lines, size=args.size, ips=args.ips, span=args.span, malformed=args.malformed, compression=args.compression, seed=args.seed)
+    print(f'Generated {generated["lines"]} lines ({generated["bytes"]} bytes) to \'{generated["path"]}\'.', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    run()
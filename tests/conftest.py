@@ -0,0 +1,25 @@
+import pytest
+
+
+def pytest_addoption(parser):
+    """Add the option running slow tests.
+    """
+    parser.addoption('--run-slow', action='store_true', help='run slow tests on generated large logs')
+
+
+def pytest_configure(config):
+    """Register the marker of slow tests.
+    """
+    config.addinivalue_line('markers', 'slow: slow tests on generated large logs, run with --run-slow')
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip slow tests unless they are run with --run-slow.
+    """
+    if config.getoption('--run-slow'):
+        return
+
+    skip = pytest.mark.skip(reason='slow test, run with --run-slow')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip)
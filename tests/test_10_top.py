@@ -0,0 +1,130 @@
+import analyzer
+import os
+import sys
+import logging
+import random
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+
+def write_skewed_log(path, lines, seed = 1):
+    """Write a log with a few frequent IP addresses and many rare ones.
+
+    Returns:
+        dict: True frequencies of the IP addresses.
+    """
+    rng = random.Random(seed)
+    frequencies = {}
+    with open(path, 'w') as f:
+        for i in range(lines):
+            if rng.random() < 0.3:
+                ip = f'10.0.0.{rng.randrange(5)}'
+            else:
+                ip = f'172.16.{rng.randrange(64)}.{rng.randrange(256)}'
+            frequencies[ip] = frequencies.get(ip, 0) + 1
+            f.write(f'{1579776202 + i // 10}.123 16 {ip} TCP_TUNNEL/200 39 CONNECT b.com:443 - HIER_DIRECT/52.85.43.247 -\n')
+
+    return frequencies
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'regex', 'split', 'numpy'])
+def test_top_bottom(engine):
+    """Top and bottom IP addresses are ordered by counts and then by first occurence, like --mfip and --lfip.
+    """
+    files = analyzer.get_files_from_paths(['tests/files/eps'])
+    result = analyzer.parse_files(engine, files, {'mfip': True, 'lfip': True, 'top': 3, 'bottom': 100000})
+
+    frequencies = analyzer.unpack_ip_frequencies(analyzer.map_partials(analyzer.parse_file_regex, analyzer.plan_tasks(files, 1), operations={'mfip': True})['ip_frequencies'])
+    expected = [{'ip_address': ip, 'count': count} for ip, count in sorted(frequencies.items(), key=lambda item: item[1])]
+
+    assert result['bottom'] == expected
+    assert result['top'] == sorted(expected, key=lambda item: -item['count'])[:3]
+    assert result['top'][0] == result['mfip']
+    assert result['bottom'][0] == result['lfip']
+    assert 'approx' not in result
+
+
+@pytest.mark.parametrize('parse_file, options', [
+    (analyzer.parse_file_pandas, {'chunk_rows': 50}),
+    (analyzer.parse_file_regex, {'block_size': 2000}),
+    (analyzer.parse_file_split, {'block_size': 2000}),
+    (analyzer.parse_file_numpy, {'block_size': 2000})
+])
+def test_ip_batches(tmp_path, monkeypatch, parse_file, options):
+    """Counting IP addresses in many small packed tables gives the same frequencies in the same order.
+    """
+    monkeypatch.setattr(analyzer, 'IP_BATCH', 7)
+    log_file = tmp_path / 'access.log'
+    true_frequencies = write_skewed_log(log_file, 2000)
+
+    partial = parse_file(analyzer.plan_tasks([str(log_file)], 1)[0], {'mfip': True}, **options)
+    frequencies = analyzer.unpack_ip_frequencies(partial['ip_frequencies'])
+    assert frequencies == true_frequencies
+    assert list(frequencies) == list(true_frequencies)
+
+
+def test_prune_frequencies():
+    """Pruning keeps at most the capacity of items and returns the subtracted value.
+    """
+    frequencies = {'a': 5, 'b': 1, 'c': 3, 'd': 2}
+    assert analyzer.prune_frequencies(frequencies, 2) == 2
+    assert frequencies == {'a': 3, 'c': 1}
+    assert analyzer.prune_frequencies(frequencies, 2) == 0
+
+
+@pytest.mark.parametrize('parse_file', [analyzer.parse_file_pandas, analyzer.parse_file_regex, analyzer.parse_file_split, analyzer.parse_file_numpy])
+def test_approx(tmp_path, monkeypatch, parse_file):
+    """Approximate counts stay within the error bound and the number of counted addresses is bounded.
+    """
+    monkeypatch.setattr(analyzer, 'MIN_CHUNK_SIZE', 50000)
+    log_file = tmp_path / 'access.log'
+    true_frequencies = write_skewed_log(log_file, 20000)
+    capacity = 20
+
+    # byte ranges are analyzed and merged separately, which must keep the guarantee
+    tasks = analyzer.plan_tasks([str(log_file)], 4, split_files=parse_file is not analyzer.parse_file_pandas)
+    partial = analyzer.map_partials(parse_file, tasks, operations={'top': 5, 'ip_capacity': capacity})
+    table = partial['ip_frequencies']
+
+    assert len(table['counts']) <= capacity
+    assert 0 < table['error'] <= partial['events'] / (capacity + 1)
+    for ip, count in analyzer.unpack_ip_frequencies(table).items():
+        assert true_frequencies[ip] - table['error'] <= count <= true_frequencies[ip]
+
+    # the frequent addresses are found
+    result = {}
+    analyzer.summarize(result, partial, {'mfip': True, 'top': 5})
+    assert {item['ip_address'] for item in result['top']} == {f'10.0.0.{i}' for i in range(5)}
+    assert result['mfip'] == result['top'][0]
+    assert result['approx'] == {'counters': capacity, 'max_error': table['error']}
+
+    # the approximate state survives serialization
+    restored = analyzer.deserialize_partial(analyzer.serialize_partial(partial))['ip_frequencies']
+    assert restored['capacity'] == capacity
+    assert restored['error'] == table['error']
+
+
+@pytest.mark.parametrize('parse_file', [analyzer.parse_file_pandas, analyzer.parse_file_regex, analyzer.parse_file_split, analyzer.parse_file_numpy])
+def test_mapped_addresses(tmp_path, parse_file):
+    """IPv4 addresses and their IPv4-mapped forms are the same client, within a file and across files.
+    """
+    log_file = tmp_path / 'access.log'
+    with open(log_file, 'w') as f:
+        for i, ip in enumerate(['10.0.0.1', '::ffff:10.0.0.1', '10.0.0.2']):
+            f.write(f'1579776202.{i:03} 16 {ip} TCP_TUNNEL/200 39 CONNECT b.com:443 - HIER_DIRECT/52.85.43.247 -\n')
+
+    operations = {'mfip': True, 'top': 3, 'distinct': ['client']}
+    result = {}
+    analyzer.summarize(result, analyzer.map_partials(parse_file, analyzer.plan_tasks([str(log_file)], 1), operations=operations), operations)
+    assert result['top'] == [{'ip_address': '10.0.0.1', 'count': 2}, {'ip_address': '10.0.0.2', 'count': 1}]
+    assert result['mfip'] == {'ip_address': '10.0.0.1', 'count': 2}
+    assert result['distinct']['counts'] == {'client': 2}
+
+    result = {}
+    analyzer.summarize(result, analyzer.map_partials(parse_file, analyzer.plan_tasks([str(log_file)] * 2, 1), operations=operations), operations)
+    assert result['top'] == [{'ip_address': '10.0.0.1', 'count': 4}, {'ip_address': '10.0.0.2', 'count': 2}]
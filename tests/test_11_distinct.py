@@ -0,0 +1,60 @@
+import analyzer
+import os
+import sys
+import logging
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+
+def test_hll_accuracy():
+    """HyperLogLog estimates stay within a few standard errors and merged sketches estimate the union.
+    """
+    first = analyzer.new_hll(12)
+    second = analyzer.new_hll(12)
+    analyzer.add_hll(first, {f'10.0.{i // 256}.{i % 256}'.encode() for i in range(60000)})
+    analyzer.add_hll(second, {f'10.0.{i // 256}.{i % 256}'.encode() for i in range(30000, 100000)})
+
+    standard_error = 1.04 / 64
+    assert abs(analyzer.count_hll(first) - 60000) < 60000 * 3 * standard_error
+    assert abs(analyzer.count_hll(analyzer.merge_hll(first, second)) - 100000) < 100000 * 3 * standard_error
+
+    # small cardinalities are counted almost exactly
+    small = analyzer.new_hll(12)
+    analyzer.add_hll(small, {b'a', b'b', b'c'})
+    assert analyzer.count_hll(small) == 3
+
+    with pytest.raises(ValueError):
+        analyzer.merge_hll(first, analyzer.new_hll(10))
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'regex', 'split', 'numpy'])
+def test_distinct(monkeypatch, engine):
+    """All engines estimate the same numbers of distinct values, also when analyzing in parallel.
+    """
+    monkeypatch.setattr(analyzer, 'MIN_CHUNK_SIZE', 1000)
+    files = analyzer.get_files_from_paths(['tests/files'], recurse=True)
+    distinct = ['client', 'url', 'destination']
+
+    result = analyzer.parse_files(engine, files, {'distinct': distinct})
+    assert result['distinct']['counts'] == {'client': 3, 'url': 17, 'destination': 14}
+    assert analyzer.parse_files(engine, files, {'distinct': distinct}, jobs=4) == result
+
+
+def test_distinct_serialization():
+    """Sketches survive serialization of partial aggregates.
+    """
+    files = analyzer.get_files_from_paths(['tests/files/eps'])
+    partial = analyzer.map_partials(analyzer.parse_file_regex, analyzer.plan_tasks(files, 1), operations={'distinct': ['url'], 'hll_precision': 6})
+    restored = analyzer.deserialize_partial(analyzer.serialize_partial(partial))
+
+    assert len(restored['distinct']['url']) == 64
+    assert (restored['distinct']['url'] == partial['distinct']['url']).all()
+    result, expected = {}, {}
+    analyzer.summarize(result, restored, {'distinct': ['url']})
+    analyzer.summarize(expected, partial, {'distinct': ['url']})
+    assert result == expected
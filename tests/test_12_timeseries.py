@@ -0,0 +1,74 @@
+import analyzer
+import os
+import sys
+import argparse
+import logging
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+
+def test_parse_resolution():
+    """Resolutions are converted to seconds.
+    """
+    assert analyzer.parse_resolution('30') == 30
+    assert analyzer.parse_resolution('1s') == 1
+    assert analyzer.parse_resolution('5m') == 300
+    assert analyzer.parse_resolution('1h') == 3600
+    for value in ['0', '1w', 'm', '-1s']:
+        with pytest.raises(argparse.ArgumentTypeError):
+            analyzer.parse_resolution(value)
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'regex', 'split', 'numpy'])
+def test_timeseries(tmp_path, engine):
+    """Events and bytes are summed into buckets and the distribution of events per second includes empty seconds.
+    """
+    log_file = tmp_path / 'access.log'
+    lines = []
+    # 3 events at second 100, 1 event at 101, 3 events at 130, nothing in between
+    for epoch, body in [(100, 10), (100, -1), (100, 5), (101, 1), (130, 2), (130, 2), (130, 2)]:
+        lines.append(f'{epoch}.5 7 10.0.0.1 TCP_MISS/200 {body} GET http://a.com/ - HIER_DIRECT/1.2.3.4 text/plain\n')
+    log_file.write_text(''.join(lines))
+
+    result = analyzer.parse_files(engine, [str(log_file)], {'eps': True, 'timeseries': 20})
+    timeseries = result['timeseries']
+
+    assert timeseries['buckets'] == [[100, 4, 16 + 28], [120, 3, 6 + 21]]
+    assert timeseries['eps'] == {'average': result['events']['eps'], 'p50': 0, 'p95': 3, 'p99': 3, 'max': 3}
+    assert timeseries['busiest_second'] == {'epoch': 100, 'events': 3, 'bytes': 15 + 21}
+
+    # header sizes are not counted when excluded
+    assert analyzer.parse_files(engine, [str(log_file)], {'exclude_header_sizes': True, 'timeseries': 20})['timeseries']['buckets'] == [[100, 4, 16], [120, 3, 6]]
+
+
+@pytest.mark.parametrize('engine', ['regex', 'numpy'])
+def test_timeseries_jobs(monkeypatch, engine):
+    """Parallel analysis of overlapping files yields the same time series as serial analysis.
+    """
+    monkeypatch.setattr(analyzer, 'MIN_CHUNK_SIZE', 1000)
+    files = analyzer.get_files_from_paths(['tests/files'], recurse=True)
+    expected = analyzer.parse_files('split', files, {'timeseries': 1})
+    assert analyzer.parse_files(engine, files, {'timeseries': 1}, jobs=4) == expected
+
+    # the time series survives serialization of partial aggregates
+    partial = analyzer.map_partials(analyzer.parse_file_regex, analyzer.plan_tasks(files, 1), operations={'timeseries': 1})
+    restored = analyzer.deserialize_partial(analyzer.serialize_partial(partial))
+    result = {}
+    analyzer.summarize(result, restored, {'timeseries': 1})
+    assert result == expected
+
+
+def test_timeseries_stray_timestamp(tmp_path):
+    """A stray timestamp far from the others adds a single bucket, not all the empty ones in between.
+    """
+    log_file = tmp_path / 'access.log'
+    log_file.write_text(''.join(f'{epoch}.5 7 10.0.0.1 TCP_MISS/200 1 GET http://a.com/ - HIER_DIRECT/1.2.3.4 text/plain\n' for epoch in (0, 1700000000, 1700000001)))
+
+    timeseries = analyzer.parse_files('regex', [str(log_file)], {'timeseries': 1})['timeseries']
+    assert timeseries['buckets'] == [[0, 1, 8], [1700000000, 1, 8], [1700000001, 1, 8]]
+    assert timeseries['eps']['p99'] == 0
@@ -0,0 +1,108 @@
+import analyzer
+import os
+import sys
+import gzip
+import argparse
+import logging
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+START = 1579776000
+
+
+def write_log(path, lines, first = START):
+    """Write a log with one event every second, every 7th event is logged 30 seconds late.
+
+    Returns:
+        list: Epoch times of the events in the order of the lines.
+    """
+    epochs = [first + i - (30 if i % 7 == 3 and i > 30 else 0) for i in range(lines)]
+    with open(path, 'w') as f:
+        for i, epoch in enumerate(epochs):
+            f.write(f'{epoch}.{i % 1000:03} {i % 50} 10.0.{i % 3}.1 TCP_MISS/200 {i % 100} GET http://a.com/{i} - HIER_DIRECT/1.2.3.4 text/plain\n')
+
+    return epochs
+
+
+def test_parse_time():
+    """Times are given as epoch times or ISO 8601 dates.
+    """
+    assert analyzer.parse_time('1579776000.5') == 1579776000.5
+    assert analyzer.parse_time('2020-01-23T10:40:00+00:00') == 1579776000
+    with pytest.raises(argparse.ArgumentTypeError):
+        analyzer.parse_time('yesterday')
+
+
+def test_find_time_range(tmp_path, monkeypatch):
+    """Only a small part of a big file around the time window is read and files outside of the window are skipped.
+    """
+    monkeypatch.setattr(analyzer, 'TIME_SEARCH_GRANULARITY', 4096)
+    log_file = str(tmp_path / 'access.log')
+    write_log(log_file, 50000)
+    size = os.path.getsize(log_file)
+
+    start, end = analyzer.find_time_range(log_file, START + 20000, START + 21000)
+    assert end - start < size / 20
+
+    # the range covers all lines in the window
+    with open(log_file, 'rb') as f:
+        data = f.read()
+    epochs = [analyzer.parse_epoch(line) for line in data[start:end].splitlines()]
+    assert sum(START + 20000 <= epoch < START + 21000 for epoch in epochs) == 1000
+    assert data[start - 1:start] == b'\n'
+
+    assert analyzer.find_time_range(log_file, since=START + 60000) is None
+    assert analyzer.find_time_range(log_file, until=START - 1000) is None
+    assert analyzer.plan_tasks([log_file], 4, since=START + 60000) == []
+
+    # compressed files after the window are skipped without decompressing them
+    gzip_file = str(tmp_path / 'access.log.gz')
+    with open(log_file, 'rb') as f, gzip.open(gzip_file, 'wb') as g:
+        g.write(f.read())
+    assert analyzer.find_time_range(gzip_file, until=START - 1000) is None
+    assert analyzer.find_time_range(gzip_file, until=START + 1000) == (0, None)
+    assert analyzer.plan_tasks([gzip_file], 4, until=START - 1000) == []
+
+
+def test_garbage_tail(tmp_path, monkeypatch):
+    """Files whose end has no timestamped lines are not skipped.
+    """
+    monkeypatch.setattr(analyzer, 'TIME_SEARCH_GRANULARITY', 4096)
+    log_file = str(tmp_path / 'access.log')
+    epochs = write_log(log_file, 5000)
+    with open(log_file, 'a') as f:
+        f.write('garbage\n' * 2000)
+
+    start, end = analyzer.find_time_range(log_file, since=START + 4000)
+    assert end == os.path.getsize(log_file)
+    assert analyzer.find_time_range(log_file, since=START + 10000) is not None
+
+    result = analyzer.parse_files('regex', [log_file], {'eps': True, 'since': START + 4000})
+    assert result['events']['count'] == sum(epoch >= START + 4000 for epoch in epochs)
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'regex', 'split', 'numpy'])
+def test_time_window(tmp_path, monkeypatch, engine):
+    """Only events in the time window are analyzed, also in compressed files and when analyzing in parallel.
+    """
+    monkeypatch.setattr(analyzer, 'TIME_SEARCH_GRANULARITY', 4096)
+    monkeypatch.setattr(analyzer, 'MIN_CHUNK_SIZE', 10000)
+    log_file = str(tmp_path / 'access.log')
+    epochs = write_log(log_file, 20000)
+    with open(log_file, 'rb') as f, gzip.open(log_file + '.gz', 'wb') as g:
+        g.write(f.read())
+
+    since = START + 5000.5
+    until = START + 6000
+    expected = sum(since <= epoch < until for epoch in epochs)
+
+    for files in [[log_file], [log_file + '.gz']]:
+        for jobs in [1, 4]:
+            result = analyzer.parse_files(engine, files, {'eps': True, 'count_bytes': True, 'since': since, 'until': until}, jobs=jobs)
+            assert result['events']['count'] == expected
+            assert result == analyzer.parse_files('regex', files, {'eps': True, 'count_bytes': True, 'since': since, 'until': until})
@@ -0,0 +1,115 @@
+import analyzer
+import os
+import sys
+import json
+import shutil
+import logging
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+OPERATIONS = {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}
+
+
+def test_cache(tmp_path):
+    """Only new or changed files are analyzed and the results are the same as without the cache.
+    """
+    log_dir = tmp_path / 'logs'
+    shutil.copytree('tests/files/eps', log_dir)
+    files = analyzer.get_files_from_paths([str(log_dir)])
+    cache_dir = str(tmp_path / 'cache')
+    options = dict(OPERATIONS, engine='regex')
+
+    analyzed = []
+
+    def parse_file(task, **kwargs):
+        analyzed.append(task[0])
+        return analyzer.parse_file_regex(task, **kwargs)
+
+    def analyze():
+        partial = analyzer.parse_files_cached(files, cache_dir, options, parse_file, OPERATIONS)
+        result = {}
+        analyzer.summarize(result, partial, OPERATIONS)
+        return result
+
+    assert analyze() == analyzer.parse_files('regex', files, OPERATIONS)
+    assert sorted(analyzed) == sorted(files)
+
+    # nothing changed
+    analyzed.clear()
+    assert analyze() == analyzer.parse_files('regex', files, OPERATIONS)
+    assert analyzed == []
+
+    # only the changed file is analyzed again
+    with open(files[0], 'rb') as f:
+        line = f.readline()
+    with open(files[0], 'ab') as f:
+        f.write(line)
+    assert analyze() == analyzer.parse_files('regex', files, OPERATIONS)
+    assert analyzed == [files[0]]
+
+    # other parser options do not use the same entries
+    analyzed.clear()
+    options['engine'] = 'split'
+    analyze()
+    assert len(analyzed) == len(files)
+
+
+def test_evict_cache(tmp_path):
+    """The least recently used entries are removed first.
+    """
+    for index in range(4):
+        entry = tmp_path / f'{index}.json'
+        entry.write_bytes(b'x' * 100)
+        os.utime(entry, ns=(index * 10 ** 9, index * 10 ** 9))
+
+    analyzer.evict_cache(str(tmp_path), max_size=250)
+    assert sorted(os.listdir(tmp_path)) == ['2.json', '3.json']
+
+
+def test_small_files(tmp_path):
+    """Small files are analyzed with the requested operations and are not cached.
+    """
+    files = analyzer.get_files_from_paths(['tests/files/eps'])
+    cache_dir = tmp_path / 'cache'
+    sizes = sorted(os.path.getsize(f) for f in files)
+    requested = {'eps': True}
+
+    partial = analyzer.parse_files_cached(files, str(cache_dir), dict(OPERATIONS, engine='regex'), analyzer.parse_file_regex, OPERATIONS, min_size=sizes[-1], uncached=requested)
+
+    result = {}
+    analyzer.summarize(result, partial, requested)
+    assert result == analyzer.parse_files('regex', files, requested)
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_cache_cli(tmp_path, monkeypatch):
+    """The cache is only written with --cache and cached files have the same statistics as analyzed ones.
+    """
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'home'))
+    log_file = tmp_path / 'access.log'
+    with open('tests/files/eps/5eps.txt', 'rb') as f:
+        data = f.read()
+    log_file.write_bytes(data * (analyzer.CACHE_MIN_SIZE // len(data) + 1))
+
+    def run(name, *options):
+        output_file = tmp_path / f'{name}.json'
+        monkeypatch.setattr(sys, 'argv', ['analyzer.py', str(log_file), str(output_file), '--eps', '--stats', *options])
+        analyzer.run()
+        with open(output_file) as f:
+            return json.load(f)
+
+    run('uncached')
+    assert not os.path.exists(tmp_path / 'home')
+
+    analyzed = run('analyzed', '--cache')
+    cached = run('cached', '--cache')
+    assert os.listdir(tmp_path / 'home' / 'squid-log-analyzer')
+    assert cached['events'] == analyzed['events']
+    for key in ('bytes', 'lines', 'matched', 'skipped'):
+        assert cached['_meta'][key] == analyzed['_meta'][key] > 0
+    assert [f['cached'] for f in analyzed['_meta']['files']] == [False]
+    assert [f['cached'] for f in cached['_meta']['files']] == [True]
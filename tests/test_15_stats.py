@@ -0,0 +1,70 @@
+import analyzer
+import os
+import sys
+import json
+import logging
+import pstats
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+
+@pytest.mark.parametrize('parse_file', [analyzer.parse_file_split, analyzer.parse_file_numpy])
+def test_lines(parse_file):
+    """All block engines read the same number of lines as the regex engine.
+    """
+    files = analyzer.get_files_from_paths(['tests/files'], recurse=True)
+    expected = analyzer.map_partials(analyzer.parse_file_regex, analyzer.plan_tasks(files, 1), operations={'eps': True})
+    partial = analyzer.map_partials(parse_file, analyzer.plan_tasks(files, 1), operations={'eps': True})
+
+    assert partial['lines'] == expected['lines']
+    assert partial['events'] == expected['events']
+    assert expected['lines'] > expected['events']
+
+
+def test_task_stats(monkeypatch):
+    """Statistics of byte ranges are summed up per file and are not serialized.
+    """
+    monkeypatch.setattr(analyzer, 'MIN_CHUNK_SIZE', 1000)
+    files = analyzer.get_files_from_paths(['tests/files'], recurse=True)
+    tasks = analyzer.plan_tasks(files, 4)
+    partial = analyzer.map_partials(analyzer.measure_task, tasks, jobs=4, parse_file=analyzer.parse_file_regex, operations={'mfip': True})
+
+    assert len(partial['tasks']) == len(tasks) > len(files)
+    expected = analyzer.map_partials(analyzer.parse_file_regex, tasks, operations={'mfip': True})
+    assert (partial['events'], partial['lines']) == (expected['events'], expected['lines'])
+    assert analyzer.unpack_ip_frequencies(partial['ip_frequencies']) == analyzer.unpack_ip_frequencies(expected['ip_frequencies'])
+
+    stats = analyzer.summarize_stats({'analysis': {'wall': 2.0, 'cpu': 1.0}}, partial['tasks'])
+    assert [f['path'] for f in stats['files']] == files
+    assert stats['bytes'] == sum(os.path.getsize(f) for f in files)
+    assert stats['lines'] == partial['lines']
+    assert stats['matched'] == partial['events']
+    assert stats['skipped'] == sum(f['skipped'] for f in stats['files']) > 0
+    assert stats['throughput']['lines_per_second'] == stats['lines'] / 2
+
+    assert 'tasks' not in analyzer.serialize_partial(partial)
+
+
+def test_stats_profile(tmp_path, monkeypatch):
+    """--stats adds the _meta section to the results and --profile writes a profile.
+    """
+    output_file = tmp_path / 'report.json'
+    profile_file = tmp_path / 'analyzer.prof'
+    monkeypatch.setattr(sys, 'argv', ['analyzer.py', 'tests/files/eps', str(output_file), '--eps', '--engine', 'numpy', '--stats', '--profile', str(profile_file)])
+    analyzer.run()
+
+    with open(output_file) as f:
+        result = json.load(f)
+
+    meta = result['_meta']
+    assert list(meta['phases']) == ['discovery', 'analysis', 'summary', 'output']
+    assert meta['matched'] == result['events']['count']
+    assert meta['lines'] == meta['matched'] + meta['skipped']
+    assert meta['peak_rss'] > 0
+
+    assert pstats.Stats(str(profile_file)).total_calls > 0
@@ -0,0 +1,68 @@
+import analyzer
+import os
+import sys
+import json
+import logging
+import subprocess
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+HEAVY_MODULES = ['numpy', 'pandas', 'http.server']
+
+
+def run_analyzer(arguments, env = None):
+    """Run the analyzer in a new interpreter and get the heavy modules it imported.
+
+    Returns:
+        list: Names of imported heavy modules.
+    """
+    code = f'''
+import sys, json, analyzer
+sys.argv = ['analyzer.py'] + {arguments!r}
+try:
+    analyzer.run()
+except SystemExit:
+    pass
+print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]), file=sys.stderr)
+'''
+    completed = subprocess.run([sys.executable, '-c', code], capture_output=True, check=True, env=env, text=True)
+    return json.loads(completed.stderr.splitlines()[-1])
+
+
+def test_lazy_imports(tmp_path):
+    """Help and the analysis of small files do not import heavy modules unless an operation needs them.
+    """
+    env = dict(os.environ, XDG_CACHE_HOME=str(tmp_path / 'cache'))
+
+    assert run_analyzer(['--help'], env) == []
+    assert run_analyzer(['tests/files/eps', str(tmp_path / 'report.json'), '--eps', '--bytes'], env) == []
+    assert 'numpy' in run_analyzer(['tests/files/eps', str(tmp_path / 'other.json'), '--mfip'], env)
+    # small files are not cached
+    assert not os.path.exists(tmp_path / 'cache' / 'squid-log-analyzer')
+
+
+@pytest.mark.parametrize('auto_engine_size', [0, 1000, sys.maxsize])
+def test_auto_engine(monkeypatch, auto_engine_size):
+    """Files at least as big as the threshold are analyzed with numpy, smaller ones by splitting lines.
+    """
+    monkeypatch.setattr(analyzer, 'AUTO_ENGINE_SIZE', auto_engine_size)
+    files = analyzer.get_files_from_paths(['tests/files'], recurse=True)
+    engines = {}
+
+    def record(name, parse_file):
+        def parse(task, operations, **kwargs):
+            engines[task[0]] = name
+            return parse_file(task, operations, **kwargs)
+        return parse
+
+    monkeypatch.setattr(analyzer, 'parse_file_numpy', record('numpy', analyzer.parse_file_numpy))
+    monkeypatch.setattr(analyzer, 'parse_file_split', record('split', analyzer.parse_file_split))
+
+    operations = {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}
+    assert analyzer.parse_files('auto', files, operations) == analyzer.parse_files('regex', files, operations)
+    assert engines == {f: 'numpy' if os.path.getsize(f) >= auto_engine_size else 'split' for f in files}
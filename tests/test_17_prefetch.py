@@ -0,0 +1,84 @@
+import analyzer
+import os
+import sys
+import time
+import shutil
+import pickle
+import logging
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+OPERATIONS = {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}
+
+
+def slow_open(latency):
+    """Get a replacement of open() waiting before every opened file, like on a network filesystem.
+    """
+    def open_file(*args, **kwargs):
+        time.sleep(latency)
+        return open(*args, **kwargs)
+
+    return open_file
+
+
+@pytest.mark.parametrize('parse_file', [analyzer.parse_file_pandas, analyzer.parse_file_regex, analyzer.parse_file_split, analyzer.parse_file_numpy])
+def test_prefetched_tasks(parse_file):
+    """Prefetched tasks, also compressed and sent to workers, are analyzed the same as tasks read by the parsers.
+    """
+    files = analyzer.get_files_from_paths(['tests/files'], recurse=True)
+    tasks = analyzer.plan_tasks(files, 1)
+    expected = {}
+    analyzer.summarize(expected, analyzer.map_partials(parse_file, tasks, operations=OPERATIONS), OPERATIONS)
+
+    prefetched = list(analyzer.prefetch_tasks(tasks, 4))
+    assert all(isinstance(task[0], analyzer.PrefetchedPath) for task in prefetched)
+    assert [task[0] for task in prefetched] == [task[0] for task in tasks]
+
+    result = {}
+    analyzer.summarize(result, analyzer.map_partials(parse_file, prefetched, operations=OPERATIONS), OPERATIONS)
+    assert result == expected
+    result = {}
+    analyzer.summarize(result, analyzer.map_partials(parse_file, analyzer.prefetch_tasks(tasks, 4), jobs=2, operations=OPERATIONS), OPERATIONS)
+    assert result == expected
+
+
+def test_prefetch_limits(tmp_path):
+    """Big tasks are left to the parsers and prefetched paths survive pickling.
+    """
+    files = analyzer.get_files_from_paths(['tests/files/eps'])
+    tasks = analyzer.plan_tasks(files, 1)
+    assert list(analyzer.prefetch_tasks(tasks, 2, max_size=0)) == tasks
+
+    path, start, end = next(analyzer.prefetch_tasks(tasks, 2))
+    restored = pickle.loads(pickle.dumps(path))
+    assert isinstance(restored, analyzer.PrefetchedPath)
+    assert (restored, restored.data, restored.compression) == (path, path.data, None)
+
+
+def test_prefetch_latency(tmp_path, monkeypatch):
+    """Reading files ahead concurrently hides the latency of opening them.
+    """
+    for i in range(16):
+        shutil.copy('tests/files/eps/5eps.txt', tmp_path / f'{i:02}.txt')
+    files = analyzer.get_files_from_paths([str(tmp_path)])
+    tasks = analyzer.plan_tasks(files, 1)
+    monkeypatch.setattr(analyzer, 'open', slow_open(0.05), raising=False)
+
+    start = time.perf_counter()
+    expected = analyzer.map_partials(analyzer.parse_file_split, tasks, operations=OPERATIONS)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    partial = analyzer.map_partials(analyzer.parse_file_split, analyzer.prefetch_tasks(tasks, 16), operations=OPERATIONS)
+    prefetched = time.perf_counter() - start
+
+    result, summary = {}, {}
+    analyzer.summarize(result, partial, OPERATIONS)
+    analyzer.summarize(summary, expected, OPERATIONS)
+    assert result == summary
+    assert prefetched < sequential / 3
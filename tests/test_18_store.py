@@ -0,0 +1,145 @@
+import analyzer
+import os
+import sys
+import json
+import shutil
+import logging
+import argparse
+import numpy
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+OPERATIONS = [
+    {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True},
+    {'top': 5, 'bottom': 3, 'count_bytes': True, 'exclude_header_sizes': True},
+    {'distinct': ['client', 'url', 'destination'], 'timeseries': 60},
+    {'mfip': True, 'eps': True, 'count_bytes': True, 'since': 1579776203, 'until': 1579776204},
+    {'mfip': True, 'top': 3, 'ip_capacity': 10}
+]
+
+
+def ingest(input_paths, store):
+    """Ingest log files into a store with the default options of the ingest command.
+    """
+    analyzer.ingest(argparse.Namespace(input_paths=input_paths, store=store, verbose=True, filter=None, include=None, exclude=None, recurse=True, block_size=analyzer.BLOCK_SIZE, no_mmap=False, jobs=1))
+
+
+@pytest.mark.parametrize('operations', OPERATIONS)
+def test_store(tmp_path, operations):
+    """Stores are analyzed the same as the log files they were created from.
+    """
+    store = str(tmp_path / 'store')
+    ingest(['tests/files'], store)
+    assert analyzer.is_store(store)
+
+    files = analyzer.get_files_from_paths(['tests/files'], recurse=True)
+    segments = list(analyzer.iter_store_segments([store]))
+    assert len(segments) == len(files)
+
+    expected = analyzer.map_partials(analyzer.parse_file_regex, analyzer.plan_tasks(files, 1), operations=operations)
+    partial = analyzer.map_partials(analyzer.parse_file_store, [(segment, 0, None) for segment in segments], operations=operations)
+
+    assert (partial['lines'], partial['events']) == (expected['lines'], expected['events'])
+    result, summary = {}, {}
+    analyzer.summarize(result, partial, operations)
+    analyzer.summarize(summary, expected, operations)
+    assert result == summary
+
+
+def test_store_clients(tmp_path):
+    """Clients are stored as packed addresses, also host names and different forms of the same address.
+    """
+    log_dir = tmp_path / 'logs'
+    log_dir.mkdir()
+    with open(log_dir / 'access.log', 'w') as f:
+        for i in range(300):
+            ip = ['10.0.0.1', '::ffff:10.0.0.1', '2001:db8::1', 'proxy.local', f'10.0.1.{i % 7}'][i % 5]
+            f.write(f'{1579776202 + i}.000 {i} {ip} TCP_MISS/200 {i * 10} GET http://a.com/{i % 3} - HIER_DIRECT/1.2.3.4 text/html\n')
+
+    store = str(tmp_path / 'store')
+    analyzer.ingest(argparse.Namespace(input_paths=[str(log_dir)], store=store, verbose=True, filter=None, include=None, exclude=None, recurse=True, block_size=1000, no_mmap=False, jobs=1))
+    segment = next(analyzer.iter_store_segments([store]))
+    assert numpy.load(os.path.join(segment, 'client_low.npy')).dtype == numpy.uint64
+    assert analyzer.load_store_dictionary(segment, 'client') == [b'proxy.local']
+
+    operations = {'mfip': True, 'lfip': True, 'top': 5, 'distinct': ['client'], 'group_by': [['client']]}
+    files = analyzer.get_files_from_paths([str(log_dir)])
+    expected = analyzer.map_partials(analyzer.parse_file_regex, analyzer.plan_tasks(files, 1), operations=operations)
+    partial = analyzer.parse_file_store((segment, 0, None), operations)
+
+    assert analyzer.unpack_ip_frequencies(partial['ip_frequencies']) == analyzer.unpack_ip_frequencies(expected['ip_frequencies'])
+    result, summary = {}, {}
+    analyzer.summarize(result, partial, operations)
+    analyzer.summarize(summary, expected, operations)
+    assert result['distinct'] == summary['distinct']
+    assert result['top'] == summary['top']
+
+
+def test_ingest_changes(tmp_path, monkeypatch):
+    """Only new or changed files are ingested again and their segments keep their place.
+    """
+    log_dir = tmp_path / 'logs'
+    shutil.copytree('tests/files/eps', log_dir)
+    store = str(tmp_path / 'store')
+    ingest([str(log_dir)], store)
+
+    with open(os.path.join(store, 'store.json')) as f:
+        index = json.load(f)
+    names = [segment['name'] for segment in index['segments']]
+
+    files = analyzer.get_files_from_paths([str(log_dir)])
+    with open(files[0], 'ab') as f:
+        f.write(b'1579776999.000      1 10.0.0.1 TCP_MISS/200 100 GET http://example.com/ - HIER_DIRECT/1.2.3.4 text/html\n')
+    shutil.copy(files[0], log_dir / 'new.txt')
+
+    ingested = []
+    ingest_file = analyzer.ingest_file
+
+    def record(task, **kwargs):
+        ingested.append(task[0])
+        return ingest_file(task, **kwargs)
+
+    monkeypatch.setattr(analyzer, 'ingest_file', record)
+    ingest([str(log_dir)], store)
+
+    assert sorted(ingested) == sorted([files[0], str(log_dir / 'new.txt')])
+
+    with open(os.path.join(store, 'store.json')) as f:
+        index = json.load(f)
+    assert [segment['name'] for segment in index['segments']][:len(names)] == names
+    assert len(index['segments']) == len(names) + 1
+
+    files = analyzer.get_files_from_paths([str(log_dir)])
+    partial = analyzer.map_partials(analyzer.parse_file_store, [(segment, 0, None) for segment in analyzer.iter_store_segments([store])], operations={'eps': True, 'mfip': True})
+    result = {}
+    analyzer.summarize(result, partial, {'eps': True, 'mfip': True})
+    assert result == analyzer.parse_files('regex', files, {'eps': True, 'mfip': True})
+
+
+def test_store_cli(tmp_path, monkeypatch):
+    """The ingest command creates a store which the analyzer reads instead of the log files.
+    """
+    store = str(tmp_path / 'store')
+    monkeypatch.setattr(sys, 'argv', ['analyzer.py', 'ingest', 'tests/files/eps', store])
+    analyzer.run()
+
+    results = {}
+    for name, inputs in (('logs', ['tests/files/eps']), ('store', [store])):
+        output_file = tmp_path / f'{name}.json'
+        monkeypatch.setattr(sys, 'argv', ['analyzer.py', *inputs, str(output_file), '--mfip', '--eps', '--bytes'])
+        analyzer.run()
+        with open(output_file) as f:
+            results[name] = json.load(f)
+
+    assert results['store'] == results['logs']
+
+    # log files and stores are not mixed
+    monkeypatch.setattr(sys, 'argv', ['analyzer.py', store, 'tests/files/eps', str(tmp_path / 'mixed.json'), '--mfip'])
+    with pytest.raises(SystemExit) as e:
+        analyzer.run()
+    assert e.value.code == 1
@@ -0,0 +1,105 @@
+import analyzer
+import os
+import sys
+import json
+import logging
+import argparse
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+GROUP_BY = [['status'], ['method', 'mimetype'], ['user'], ['client', 'destination']]
+AGGREGATIONS = analyzer.parse_aggregations('count,sum(body),sum(headers),min(bytes),max(bytes),avg(bytes)')
+
+
+def expected_groups(files, fields, exclude_header_sizes = False):
+    """Aggregate the events of valid log lines in plain Python.
+    """
+    groups = {}
+    for path in files:
+        with analyzer.open_log(path, analyzer.detect_compression(path)) as f:
+            for line in f:
+                values = line.split()
+                if len(values) < 10 or line[:1].isspace():
+                    continue
+
+                headers = max(int(values[1]), 0)
+                body = max(int(values[4]), 0)
+                key = tuple(values[analyzer.GROUP_FIELDS[field]].decode() for field in fields)
+                groups.setdefault(key, []).append((headers, body))
+
+    rows = []
+    for key, sizes in sorted(groups.items(), key=lambda item: (-len(item[1]), item[0])):
+        totals = [body if exclude_header_sizes else headers + body for headers, body in sizes]
+        rows.append(dict(zip(fields, key), **{
+            'count': len(sizes),
+            'sum(body)': sum(body for _, body in sizes),
+            'sum(headers)': sum(headers for headers, _ in sizes),
+            'min(bytes)': min(totals),
+            'max(bytes)': max(totals),
+            'avg(bytes)': sum(totals) / len(sizes)
+        }))
+
+    return rows
+
+
+@pytest.mark.parametrize('exclude_header_sizes', [False, True])
+@pytest.mark.parametrize('parse_file', [analyzer.parse_file_pandas, analyzer.parse_file_regex, analyzer.parse_file_split, analyzer.parse_file_numpy])
+def test_groups(parse_file, exclude_header_sizes):
+    """All engines aggregate the same groups in a single pass, the bytes exclude header sizes like the bytes operation.
+    """
+    files = analyzer.get_files_from_paths(['tests/files/eps', 'tests/files/regex/log.txt'])
+    operations = {'group_by': GROUP_BY, 'aggregations': AGGREGATIONS, 'exclude_header_sizes': exclude_header_sizes}
+    partial = analyzer.map_partials(parse_file, analyzer.plan_tasks(files, 1), operations=operations)
+    result = {}
+    analyzer.summarize(result, partial, operations)
+
+    assert list(result['groups']) == ['status', 'method,mimetype', 'user', 'client,destination']
+    for fields in GROUP_BY:
+        assert result['groups'][','.join(fields)] == expected_groups(files, fields, exclude_header_sizes)
+
+
+def test_groups_store_and_state(tmp_path, monkeypatch):
+    """Groups of stores, split files and serialized partial aggregates are the same.
+    """
+    monkeypatch.setattr(analyzer, 'MIN_CHUNK_SIZE', 1000)
+    files = analyzer.get_files_from_paths(['tests/files'], recurse=True)
+    operations = {'group_by': GROUP_BY, 'aggregations': AGGREGATIONS, 'exclude_header_sizes': True, 'since': 1579776203}
+    expected = analyzer.parse_files('regex', files, operations)
+
+    store = str(tmp_path / 'store')
+    analyzer.ingest(argparse.Namespace(input_paths=['tests/files'], store=store, verbose=False, filter=None, include=None, exclude=None, recurse=True, block_size=analyzer.BLOCK_SIZE, no_mmap=False, jobs=1))
+    partial = analyzer.map_partials(analyzer.parse_file_store, [(segment, 0, None) for segment in analyzer.iter_store_segments([store])], operations=operations)
+    result = {}
+    analyzer.summarize(result, partial, operations)
+    assert result == expected
+
+    partial = analyzer.map_partials(analyzer.parse_file_numpy, analyzer.plan_tasks(files, 4), jobs=2, operations=operations)
+    restored = analyzer.deserialize_partial(json.loads(json.dumps(analyzer.serialize_partial(partial))))
+    result = {}
+    analyzer.summarize(result, restored, operations)
+    assert result == expected
+
+
+def test_group_options(tmp_path, monkeypatch):
+    """Invalid groupings and aggregations are rejected and counts are aggregated by default.
+    """
+    assert analyzer.parse_group_by('Status, method') == ['status', 'method']
+    assert analyzer.plan_columns(analyzer.parse_aggregations('avg(body),sum(body),max(bytes)')) == [['count', None], ['sum', 'body'], ['max', 'bytes']]
+
+    for value in ('host', 'status,status'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            analyzer.parse_group_by(value)
+    for value in ('sum', 'count(body)', 'avg(url)', 'median(body)'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            analyzer.parse_aggregations(value)
+
+    output_file = tmp_path / 'report.json'
+    monkeypatch.setattr(sys, 'argv', ['analyzer.py', 'tests/files/eps/5eps.txt', str(output_file), '--group-by', 'method'])
+    analyzer.run()
+    with open(output_file) as f:
+        assert json.load(f) == {'groups': {'method': [{'method': method, 'count': 5} for method in ('CONNECT', 'GET', 'POST')]}}
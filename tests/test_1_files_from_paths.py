@@ -33,3 +33,41 @@ def test_nested():
     """
     out = analyzer.get_files_from_paths(['tests/files/nested'], recurse = True)
     assert not set(out).difference({os.path.abspath('tests/files/nested/first.txt'), os.path.abspath('tests/files/nested/other/last/last.txt')})
+
+def test_symlinks(tmp_path):
+    """Test for visiting files and directories reached through symlinks only once.
+    """
+    (tmp_path / 'logs').mkdir()
+    (tmp_path / 'logs' / 'access.log').write_text('')
+    os.symlink(tmp_path / 'logs', tmp_path / 'logs' / 'loop')
+    os.symlink(tmp_path / 'logs' / 'access.log', tmp_path / 'logs' / 'link.log')
+
+    out = analyzer.get_files_from_paths([str(tmp_path / 'logs'), str(tmp_path / 'logs' / 'access.log')], recurse = True)
+    assert out == [str(tmp_path / 'logs' / 'access.log')]
+
+    # a file rejected through one path is still accepted through another
+    out = analyzer.get_files_from_paths([str(tmp_path / 'logs' / 'link.log'), str(tmp_path / 'logs' / 'access.log')], exclude = ['link.log'])
+    assert out == [str(tmp_path / 'logs' / 'access.log')]
+
+def test_globs(tmp_path):
+    """Test for including and excluding files and directories with glob-style patterns.
+    """
+    for name in ['access.log', 'access.log.1.gz', 'cache.log', 'old/access.log', 'new/access.log']:
+        (tmp_path / name).parent.mkdir(exist_ok = True)
+        (tmp_path / name).write_text('')
+
+    out = analyzer.get_files_from_paths([str(tmp_path)], recurse = True, include = ['access.log*'], exclude = ['*.gz', 'old'])
+    assert out == [str(tmp_path / 'access.log'), str(tmp_path / 'new' / 'access.log')]
+
+def test_streaming(tmp_path):
+    """Test for yielding files before the whole tree is walked.
+    """
+    (tmp_path / 'a.log').write_text('')
+    (tmp_path / 'sub').mkdir()
+
+    files = analyzer.iter_files_from_paths([str(tmp_path)], recurse = True)
+    assert next(files) == str(tmp_path / 'a.log')
+
+    # the subdirectory has not been walked yet
+    (tmp_path / 'sub' / 'b.log').write_text('')
+    assert list(files) == [str(tmp_path / 'sub' / 'b.log')]
@@ -0,0 +1,112 @@
+import analyzer
+import os
+import sys
+import json
+import gzip
+import shutil
+import logging
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+OPERATIONS = ['--mfip', '--lfip', '--eps', '--bytes', '--top', '3', '--distinct', 'url', '--timeseries', '1m', '--group-by', 'status,method', '--agg', 'count,sum(bytes)']
+
+# log files kept by every simulated proxy
+NODES = {
+    'proxy1': ['tests/files/eps/1eps.txt', 'tests/files/eps/5eps.txt'],
+    'proxy2': ['tests/files/regex/log.txt'],
+    'proxy3': ['tests/files/compressed/5eps_gaps.txt.gz', 'tests/files/one/log.txt']
+}
+
+
+def run(monkeypatch, *arguments):
+    """Run the analyzer with commandline arguments.
+    """
+    monkeypatch.setattr(sys, 'argv', ['analyzer.py', *arguments])
+    analyzer.run()
+
+
+@pytest.mark.parametrize('engine', ['regex', 'split', 'numpy'])
+def test_merge(tmp_path, monkeypatch, engine):
+    """Partial aggregates of several machines are merged into the results of a single run over all their logs.
+    """
+    partial_files = []
+    for node, files in NODES.items():
+        log_dir = tmp_path / node
+        log_dir.mkdir()
+        for path in files:
+            shutil.copy(path, log_dir)
+
+        # compressed partial aggregates are read as well
+        partial_file = str(tmp_path / (f'{node}.partial' + ('.gz' if node == 'proxy2' else '')))
+        run(monkeypatch, str(log_dir), partial_file, *OPERATIONS, '--partial', '--engine', engine)
+        partial_files.append(partial_file)
+
+    with gzip.open(partial_files[1], 'rt') as f:
+        assert json.load(f)['version'] == analyzer.PARTIAL_VERSION
+
+    merged_file = tmp_path / 'merged.json'
+    run(monkeypatch, 'merge', *partial_files, str(merged_file))
+
+    expected_file = tmp_path / 'expected.json'
+    run(monkeypatch, *(str(tmp_path / node) for node in NODES), str(expected_file), *OPERATIONS, '--engine', 'regex')
+
+    with open(merged_file) as f:
+        merged = json.load(f)
+    with open(expected_file) as f:
+        assert merged == json.load(f)
+
+
+@pytest.mark.parametrize('options', [['--eps'], ['--mfip', '--engine', 'numpy'], ['--mfip', '--approx'], ['--mfip', '--exclude-header-sizes']])
+def test_merge_mismatch(tmp_path, monkeypatch, options):
+    """Partial aggregates of other operations, engines, options or versions are not merged.
+    """
+    first = str(tmp_path / 'first.partial')
+    second = str(tmp_path / 'second.partial')
+    run(monkeypatch, 'tests/files/eps', first, '--mfip', '--engine', 'split', '--partial')
+    run(monkeypatch, 'tests/files/eps', second, '--engine', 'split', *options, '--partial')
+
+    with pytest.raises(SystemExit) as e:
+        run(monkeypatch, 'merge', first, second, str(tmp_path / 'merged.json'))
+    assert e.value.code == 1
+
+    with open(first) as f:
+        data = json.load(f)
+    with open(second, 'w') as f:
+        json.dump(dict(data, parser_version=data['parser_version'] + 1), f)
+
+    with pytest.raises(SystemExit) as e:
+        run(monkeypatch, 'merge', first, second, str(tmp_path / 'merged.json'))
+    assert e.value.code == 1
+
+    with open(second) as f:
+        data = json.load(f)
+    with open(second, 'w') as f:
+        json.dump(dict(data, version=analyzer.PARTIAL_VERSION + 1), f)
+
+    with pytest.raises(SystemExit) as e:
+        run(monkeypatch, 'merge', second, str(tmp_path / 'merged.json'))
+    assert e.value.code == 1
+
+
+def test_partial_capacity():
+    """Approximate tables of IP addresses are written with at most their capacity of addresses.
+    """
+    partial = analyzer.map_partials(analyzer.parse_file_regex, analyzer.plan_tasks(analyzer.get_files_from_paths(['tests/files/eps']), 1), operations={'mfip': True})
+    table = partial['ip_frequencies']
+    assert len(table['counts']) > 2
+    partial['ip_frequencies'] = dict(table, capacity=2)
+
+    data = analyzer.serialize_partial(partial)
+    restored = analyzer.deserialize_partial(json.loads(json.dumps(data)))['ip_frequencies']
+    assert len(restored['counts']) == 2
+    assert restored['error'] > 0
+
+    # exact tables are kept whole
+    partial['ip_frequencies'] = table
+    restored = analyzer.deserialize_partial(json.loads(json.dumps(analyzer.serialize_partial(partial))))['ip_frequencies']
+    assert analyzer.unpack_ip_frequencies(restored) == analyzer.unpack_ip_frequencies(table)
@@ -0,0 +1,134 @@
+import analyzer
+import os
+import sys
+import json
+import math
+import random
+import logging
+import argparse
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+OPERATIONS = {'percentiles': True, 'group_by': [['result']], 'aggregations': [['count', None], ['max', 'elapsed']]}
+
+
+def exact_percentiles(files):
+    """Collect the elapsed times and body sizes of every cache result of valid log lines in plain Python.
+    """
+    values = {}
+    for path in files:
+        with analyzer.open_log(path, analyzer.detect_compression(path)) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 10 or line[:1].isspace():
+                    continue
+
+                elapsed, body = values.setdefault(fields[3].split(b'/')[0].decode(), ([], []))
+                elapsed.append(max(int(fields[1]), 0))
+                body.append(max(int(fields[4]), 0))
+
+    return values
+
+
+def test_histograms():
+    """Percentiles of histograms are in the buckets of the exact percentiles, at most 2^-(precision - 1) above them.
+    """
+    random.seed(1)
+    values = [0, 1, 255, 256, 257, 2 ** 31, 2 ** 40 + 1] + [int(random.lognormvariate(6, 3)) for _ in range(10000)]
+
+    numpy = pytest.importorskip('numpy')
+    assert analyzer.histogram_buckets(numpy, numpy.array(values, dtype=numpy.int64)).tolist() == [analyzer.histogram_bucket(value) for value in values]
+
+    histogram = {}
+    for value in values:
+        bucket = analyzer.histogram_bucket(value)
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    values.sort()
+    for fraction in (0.0001, 0.5, 0.9, 0.99, 1):
+        exact = values[max(1, math.ceil(fraction * len(values))) - 1]
+        percentile = analyzer.histogram_percentile(histogram, fraction)
+        assert analyzer.histogram_bucket(percentile) == analyzer.histogram_bucket(exact)
+        assert exact <= percentile <= exact * (1 + 2 ** -(analyzer.HISTOGRAM_PRECISION - 1))
+
+    # buckets of all values below 2^32 fit in the fixed size of a histogram
+    assert analyzer.histogram_bucket(2 ** 32 - 1) < (34 - analyzer.HISTOGRAM_PRECISION) << (analyzer.HISTOGRAM_PRECISION - 1)
+    assert analyzer.histogram_percentile({}, 0.5) is None
+
+
+@pytest.mark.parametrize('parse_file', [analyzer.parse_file_pandas, analyzer.parse_file_regex, analyzer.parse_file_split, analyzer.parse_file_numpy])
+def test_percentiles(parse_file):
+    """All engines report the percentiles of every cache result in the buckets of the exact percentiles.
+    """
+    files = analyzer.get_files_from_paths(['tests/files'], recurse=True)
+    partial = analyzer.map_partials(parse_file, analyzer.plan_tasks(files, 1), operations=OPERATIONS)
+    result = {}
+    analyzer.summarize(result, partial, OPERATIONS)
+
+    expected = exact_percentiles(files)
+    assert list(result['percentiles']['results']) == sorted(expected, key=lambda name: (-len(expected[name][0]), name))
+    assert result['groups']['result'] == [{'result': name, 'count': len(expected[name][0]), 'max(elapsed)': max(expected[name][0])} for name in result['percentiles']['results']]
+
+    for name, (elapsed, body) in expected.items():
+        reported = result['percentiles']['results'][name]
+        assert reported['count'] == len(elapsed)
+        for values, percentiles in ((sorted(elapsed), reported['elapsed']), (sorted(body), reported['body'])):
+            for fraction in analyzer.PERCENTILES:
+                exact = values[math.ceil(fraction * len(values)) - 1]
+                assert analyzer.histogram_bucket(percentiles[f'p{round(fraction * 100)}']) == analyzer.histogram_bucket(exact)
+
+
+def test_percentiles_merged(tmp_path):
+    """Histograms of stores, serialized and merged partial aggregates are the same and merged partial aggregates do not share them.
+    """
+    files = analyzer.get_files_from_paths(['tests/files'], recurse=True)
+    expected = analyzer.parse_files('regex', files, OPERATIONS)
+
+    store = str(tmp_path / 'store')
+    analyzer.ingest(argparse.Namespace(input_paths=['tests/files'], store=store, verbose=False, filter=None, include=None, exclude=None, recurse=True, block_size=analyzer.BLOCK_SIZE, no_mmap=False, jobs=1))
+    partial = analyzer.map_partials(analyzer.parse_file_store, [(segment, 0, None) for segment in analyzer.iter_store_segments([store])], operations=OPERATIONS)
+    result = {}
+    analyzer.summarize(result, partial, OPERATIONS)
+    assert result == expected
+
+    restored = analyzer.deserialize_partial(json.loads(json.dumps(analyzer.serialize_partial(partial))))
+    result = {}
+    analyzer.summarize(result, restored, OPERATIONS)
+    assert result == expected
+
+    first, second = (analyzer.map_partials(analyzer.parse_file_split, analyzer.plan_tasks(files[:1], 1), operations=OPERATIONS) for _ in range(2))
+    merged = analyzer.merge_partials(analyzer.new_partial(), first)
+    analyzer.merge_partials(merged, second)
+    result, expected = {}, {}
+    analyzer.summarize(result, first, OPERATIONS)
+    analyzer.summarize(expected, second, OPERATIONS)
+    assert result == expected
+
+
+def test_percentiles_cli(tmp_path, monkeypatch):
+    """Hits are the events of all cache results containing HIT and small values are exact.
+    """
+    log_file = tmp_path / 'access.log'
+    with open(log_file, 'w') as f:
+        for i, result in enumerate(['TCP_MEM_HIT', 'TCP_MISS', 'TCP_HIT', 'TCP_MEM_HIT']):
+            f.write(f'1579776999.{i:03}    {10 * (i + 1):3} 10.0.0.1 {result}/200 {100 + i} GET http://example.com/ - HIER_DIRECT/1.2.3.4 text/html\n')
+
+    output_file = tmp_path / 'report.json'
+    monkeypatch.setattr(sys, 'argv', ['analyzer.py', str(log_file), str(output_file), '--percentiles'])
+    analyzer.run()
+    with open(output_file) as f:
+        assert json.load(f) == {
+            'percentiles': {
+                'hit_ratio': 0.75,
+                'results': {
+                    'TCP_MEM_HIT': {'count': 2, 'elapsed': {'p50': 10, 'p90': 40, 'p99': 40}, 'body': {'p50': 100, 'p90': 103, 'p99': 103}},
+                    'TCP_HIT': {'count': 1, 'elapsed': {'p50': 30, 'p90': 30, 'p99': 30}, 'body': {'p50': 102, 'p90': 102, 'p99': 102}},
+                    'TCP_MISS': {'count': 1, 'elapsed': {'p50': 20, 'p90': 20, 'p99': 20}, 'body': {'p50': 101, 'p90': 101, 'p99': 101}}
+                }
+            }
+        }
@@ -14,7 +14,7 @@ def test_eps_1():
     """Analysis with pandas for EPS of 1.0.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/1eps.txt'])
-    assert analyzer.parse_files_pandas(files, eps=True) == {
+    assert analyzer.parse_files('pandas', files, {'eps': True}) == {
         'events': {
             'count': 3,
             'eps': 1.0
@@ -26,7 +26,7 @@ def test_eps_5():
     """Analysis with pandas for EPS of 5.0.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/5eps.txt'])
-    assert analyzer.parse_files_pandas(files, eps=True) == {
+    assert analyzer.parse_files('pandas', files, {'eps': True}) == {
         'events': {
             'count': 15,
             'eps': 5.0
@@ -38,7 +38,7 @@ def test_eps_5_w_gaps():
     """Analysis with pandas for complex EPS.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/5eps_gaps.txt'])
-    assert analyzer.parse_files_pandas(files, eps=True) == {
+    assert analyzer.parse_files('pandas', files, {'eps': True}) == {
         'events': {
             'count': 55,
             'eps': 0.16176470588235295
@@ -50,7 +50,7 @@ def test_mfip():
     """Analysis with pandas for the most frequent IP address.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/5eps.txt'])
-    assert analyzer.parse_files_pandas(files, mfip=True) == {
+    assert analyzer.parse_files('pandas', files, {'mfip': True}) == {
         'mfip': {
             'ip_address': '10.10.10.5',
             'count': 11
@@ -62,7 +62,7 @@ def test_lfip():
     """Analysis with pandas for the lest frequent IP address.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/5eps.txt'])
-    assert analyzer.parse_files_regex(files, lfip=True) == {
+    assert analyzer.parse_files('regex', files, {'lfip': True}) == {
         'lfip': {
             'ip_address': '192.168.100.2',
             'count': 1
@@ -74,7 +74,7 @@ def test_bytes():
     """Analysis with pandas for the number of bytes transmitted.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/5eps.txt'])
-    assert analyzer.parse_files_pandas(files, count_bytes=True) == {
+    assert analyzer.parse_files('pandas', files, {'count_bytes': True}) == {
         'bytes': {
             'body': 7480,
             'headers': 1520,
@@ -87,7 +87,7 @@ def test_all():
     """Full analysis with pandas.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/5eps_gaps.txt'])
-    assert analyzer.parse_files_pandas(files, mfip=True, lfip=True, eps=True, count_bytes=True) == {
+    assert analyzer.parse_files('pandas', files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}) == {
         'mfip': {
             'ip_address': '127.0.0.1',
             'count': 55
@@ -106,3 +106,16 @@ def test_all():
             'total': 630822
         }
     }
+
+
+def test_chunks():
+    """Analysis with pandas yields the same results when reading files in small chunks.
+    """
+    files = analyzer.get_files_from_paths(['tests/files/eps'])
+    partial = analyzer.new_partial()
+    chunked = analyzer.new_partial()
+    for f in files:
+        analyzer.merge_partials(partial, analyzer.parse_file_pandas((f, 0, None), {'mfip': True, 'eps': True, 'count_bytes': True}))
+        analyzer.merge_partials(chunked, analyzer.parse_file_pandas((f, 0, None), {'mfip': True, 'eps': True, 'count_bytes': True}, chunk_rows=4))
+    assert analyzer.unpack_ip_frequencies(chunked.pop('ip_frequencies')) == analyzer.unpack_ip_frequencies(partial.pop('ip_frequencies'))
+    assert chunked == partial
@@ -14,7 +14,7 @@ def test_eps_1():
     """Analysis with regex for EPS of 1.0.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/1eps.txt'])
-    assert analyzer.parse_files_regex(files, eps=True) == {
+    assert analyzer.parse_files('regex', files, {'eps': True}) == {
         'events': {
             'count': 3,
             'eps': 1.0
@@ -26,7 +26,7 @@ def test_eps_5():
     """Analysis with regex for EPS of 5.0.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/5eps.txt'])
-    assert analyzer.parse_files_regex(files, eps=True) == {
+    assert analyzer.parse_files('regex', files, {'eps': True}) == {
         'events': {
             'count': 15,
             'eps': 5.0
@@ -38,7 +38,7 @@ def test_eps_5_w_gaps():
     """Analysis with regex for complex EPS.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/5eps_gaps.txt'])
-    assert analyzer.parse_files_regex(files, eps=True) == {
+    assert analyzer.parse_files('regex', files, {'eps': True}) == {
         'events': {
             'count': 55,
             'eps': 0.16176470588235295
@@ -50,7 +50,7 @@ def test_mfip():
     """Analysis with regex for the most frequent IP address.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/5eps.txt'])
-    assert analyzer.parse_files_regex(files, mfip=True) == {
+    assert analyzer.parse_files('regex', files, {'mfip': True}) == {
         'mfip': {
             'ip_address': '10.10.10.5',
             'count': 11
@@ -62,7 +62,7 @@ def test_lfip():
     """Analysis with regex for the lest frequent IP address.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/5eps.txt'])
-    assert analyzer.parse_files_regex(files, lfip=True) == {
+    assert analyzer.parse_files('regex', files, {'lfip': True}) == {
         'lfip': {
             'ip_address': '192.168.100.2',
             'count': 1
@@ -74,7 +74,7 @@ def test_bytes():
     """Analysis with regex for the number of bytes transmitted.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/5eps.txt'])
-    assert analyzer.parse_files_regex(files, count_bytes=True) == {
+    assert analyzer.parse_files('regex', files, {'count_bytes': True}) == {
         'bytes': {
             'body': 7480,
             'headers': 1520,
@@ -87,7 +87,7 @@ def test_all():
     """Full analysis with regex.
     """
     files = analyzer.get_files_from_paths(['tests/files/eps/5eps_gaps.txt'])
-    assert analyzer.parse_files_regex(files, mfip=True, lfip=True, eps=True, count_bytes=True) == {
+    assert analyzer.parse_files('regex', files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}) == {
         'mfip': {
             'ip_address': '127.0.0.1',
             'count': 55
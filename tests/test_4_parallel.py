@@ -0,0 +1,70 @@
+import analyzer
+import os
+import sys
+import logging
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+
+def test_plan_tasks_split(monkeypatch):
+    """Splitting a big file into byte ranges at line boundaries.
+    """
+    monkeypatch.setattr(analyzer, 'MIN_CHUNK_SIZE', 1000)
+    files = analyzer.get_files_from_paths(['tests/files/eps/5eps_gaps.txt'])
+    tasks = analyzer.plan_tasks(files, 4)
+    assert len(tasks) > 1
+
+    # ranges must cover the whole file and start at the beginning of a line
+    assert tasks[0][1] == 0
+    assert tasks[-1][2] == os.path.getsize(files[0])
+    with open(files[0], 'rb') as f:
+        data = f.read()
+    for (_, _, end), (_, start, _) in zip(tasks, tasks[1:]):
+        assert end == start
+        assert data[start - 1:start] == b'\n'
+
+
+def test_regex_jobs(monkeypatch):
+    """Parallel analysis with regex yields the same results as serial analysis.
+    """
+    monkeypatch.setattr(analyzer, 'MIN_CHUNK_SIZE', 1000)
+    files = analyzer.get_files_from_paths(['tests/files/eps'])
+    serial = analyzer.parse_files('regex', files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True})
+    assert analyzer.parse_files('regex', files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}, jobs=4) == serial
+
+
+def test_pandas_jobs():
+    """Parallel analysis with pandas yields the same results as serial analysis.
+    """
+    files = analyzer.get_files_from_paths(['tests/files/eps'])
+    serial = analyzer.parse_files('pandas', files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True})
+    assert analyzer.parse_files('pandas', files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}, jobs=3) == serial
+
+
+def test_merge_partials():
+    """Merging partial aggregates keeps the order of first occurence of IPs.
+    """
+    first = analyzer.new_partial()
+    first.update({'events': 2, 'epoch_start': 10, 'epoch_end': 12, 'ip_frequencies': analyzer.pack_ip_frequencies({'10.0.0.2': 1, 'proxy.local': 1})})
+    second = analyzer.new_partial()
+    second.update({'events': 1, 'epoch_start': 5, 'epoch_end': 6, 'ip_frequencies': analyzer.pack_ip_frequencies({'::1': 1, 'proxy.local': 2, 'cache.local': 1})})
+    merged = analyzer.merge_partials(first, second)
+    assert merged['events'] == 3
+    assert (merged['epoch_start'], merged['epoch_end']) == (5, 12)
+    assert list(analyzer.unpack_ip_frequencies(merged['ip_frequencies']).items()) == [('10.0.0.2', 1), ('proxy.local', 3), ('::1', 1), ('cache.local', 1)]
+
+
+def test_select_ip():
+    """Ties of IP frequencies are broken by the order of first occurence.
+    """
+    table = analyzer.pack_ip_frequencies({'10.0.0.2': 2, '2001:db8::1': 1, '10.0.0.1': 2, '192.168.0.1': 1})
+    assert analyzer.select_ip(table, most_frequent=True) == ('10.0.0.2', 2)
+    assert analyzer.select_ip(table, most_frequent=False) == ('2001:db8::1', 1)
+
+    # serialized tables select the same addresses
+    partial = analyzer.deserialize_partial(analyzer.serialize_partial(dict(analyzer.new_partial(), ip_frequencies=table)))
+    assert analyzer.unpack_ip_frequencies(partial['ip_frequencies']) == analyzer.unpack_ip_frequencies(table)
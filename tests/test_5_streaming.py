@@ -0,0 +1,124 @@
+import analyzer
+import os
+import sys
+import logging
+import tracemalloc
+import subprocess
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+
+def test_read_lines():
+    """Reading lines in small blocks yields the same lines as reading the whole file.
+    """
+    with open('tests/files/eps/5eps_gaps.txt', 'rb') as f:
+        expected = f.read().split(b'\n')
+        if not expected[-1]:
+            expected.pop()
+
+    for block_size in [1, 7, 100, analyzer.BLOCK_SIZE]:
+        with open('tests/files/eps/5eps_gaps.txt', 'rb') as f:
+            assert list(analyzer.read_lines(f, block_size=block_size)) == expected
+
+
+def test_read_lines_range():
+    """Reading lines stops at the end of a byte range.
+    """
+    with open('tests/files/eps/1eps.txt', 'rb') as f:
+        first = f.readline()
+        f.seek(0)
+        assert list(analyzer.read_lines(f, end=len(first), block_size=16)) == [first.rstrip(b'\n')]
+
+
+def test_block_size():
+    """Analysis with regex yields the same results for any block size.
+    """
+    files = analyzer.get_files_from_paths(['tests/files/eps'])
+    expected = analyzer.parse_files('regex', files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True})
+    assert analyzer.parse_files('regex', files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}, block_size=13) == expected
+
+
+def test_memory_ceiling(tmp_path):
+    """Memory used by the regex analysis does not grow with the file size.
+    """
+    line = b'1579776395     43 127.0.0.1 TCP_TUNNEL/200 39 CONNECT www.gstatic.com:443 - HIER_DIRECT/172.217.167.99 -\n'
+    log_file = tmp_path / 'big.log'
+    with open(log_file, 'wb') as f:
+        for _ in range(16):
+            f.write(line * 2048)
+
+    block_size = 16 * 1024
+    tracemalloc.start()
+    result = analyzer.parse_files('regex', [str(log_file)], {'mfip': True, 'eps': True, 'count_bytes': True}, block_size=block_size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert result['events']['count'] == 16 * 2048
+    assert os.path.getsize(log_file) > 100 * block_size
+    assert peak < 10 * block_size
+
+
+def measure_peak_rss(engine, path):
+    """Analyze a log file in a new process.
+
+    Returns:
+        int: Peak resident set size of the process in bytes.
+    """
+    code = f'import analyzer, logging; analyzer.init_logger(logging.WARNING); analyzer.parse_files({engine!r}, [{path!r}], {{\'mfip\': True, \'eps\': True, \'count_bytes\': True}}); print(analyzer.get_peak_rss())'
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True, cwd=os.path.abspath('.')).stdout
+
+    return int(output.split()[-1])
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('engine', ['regex', 'split', 'numpy'])
+def test_memory_ceiling_rss(tmp_path, engine):
+    """The peak resident memory of an analysis of a 1 GiB log is not much higher than of a small one.
+    """
+    if analyzer.get_peak_rss() is None:
+        pytest.skip('peak memory usage is not available on this platform')
+
+    # a thousand addresses, so the counted values stay the same size
+    block = b''.join(f'{1579776000 + i // 100}.123 {i % 50} 10.0.{i % 1000 // 250}.{i % 250} TCP_MISS/200 {i % 1000} GET http://a.com/{i % 100} - HIER_DIRECT/1.2.3.4 text/plain\n'.encode() for i in range(10000))
+    big_file = tmp_path / 'big.log'
+    with open(big_file, 'wb') as f:
+        while f.tell() < 1024 ** 3:
+            f.write(block)
+    small_file = tmp_path / 'small.log'
+    small_file.write_bytes(block)
+
+    small_rss = measure_peak_rss(engine, str(small_file))
+    big_rss = measure_peak_rss(engine, str(big_file))
+    assert big_rss - small_rss < 64 * 1024 ** 2
+
+
+def test_map_line_blocks(tmp_path):
+    """Memory-mapped blocks end at line boundaries, even with lines longer than a block.
+    """
+    log_file = tmp_path / 'access.log'
+    content = b'short\n' + b'x' * 100 + b'\nlast line without newline'
+    log_file.write_bytes(content)
+
+    blocks = [bytes(block) for block in analyzer.map_line_blocks(str(log_file), block_size=8)]
+    assert b''.join(blocks) == content
+    assert all(block.endswith(b'\n') for block in blocks[:-1])
+
+    # byte ranges are respected
+    blocks = [bytes(block) for block in analyzer.map_line_blocks(str(log_file), start=6, end=107, block_size=8)]
+    assert blocks == [b'x' * 100 + b'\n']
+
+
+@pytest.mark.parametrize('engine', ['regex', 'split', 'numpy'])
+def test_mmap(engine, monkeypatch):
+    """Analysis of memory-mapped files yields the same results as of read files.
+    """
+    monkeypatch.setattr(analyzer, 'MIN_CHUNK_SIZE', 1000)
+    files = analyzer.get_files_from_paths(['tests/files/eps', 'tests/files/compressed'])
+    expected = analyzer.parse_files(engine, files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}, use_mmap=False)
+    assert analyzer.parse_files(engine, files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}, block_size=64) == expected
+    assert analyzer.parse_files(engine, files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}, jobs=2) == expected
@@ -0,0 +1,42 @@
+import analyzer
+import os
+import sys
+import logging
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+
+@pytest.mark.parametrize('extension, compression', [('gz', 'gzip'), ('bz2', 'bz2'), ('xz', 'xz')])
+def test_detect_compression(extension, compression):
+    """Detecting the compression of log files by magic bytes.
+    """
+    assert analyzer.detect_compression(f'tests/files/compressed/5eps_gaps.txt.{extension}') == compression
+    assert analyzer.detect_compression('tests/files/eps/5eps_gaps.txt') is None
+
+
+@pytest.mark.parametrize('engine', ['regex', 'pandas'])
+def test_compressed(engine):
+    """Analysis of compressed log files yields the same results as of the plain log file.
+    """
+    expected = analyzer.parse_files(engine, ['tests/files/eps/5eps_gaps.txt'], {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True})
+    for extension in ['gz', 'bz2', 'xz']:
+        files = analyzer.get_files_from_paths([f'tests/files/compressed/5eps_gaps.txt.{extension}'])
+        assert analyzer.parse_files(engine, files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}) == expected
+
+
+def test_prefetch():
+    """Prefetching in a background thread keeps the order and passes exceptions on.
+    """
+    assert list(analyzer.prefetch(iter(range(100)), depth=2)) == list(range(100))
+
+    def failing():
+        yield 1
+        raise ValueError('broken')
+
+    with pytest.raises(ValueError):
+        list(analyzer.prefetch(failing()))
@@ -0,0 +1,81 @@
+import analyzer
+import os
+import sys
+import shutil
+import logging
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+OPERATIONS = {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}
+
+
+def analyze(files, state_path, engine):
+    """Run an incremental analysis and return its results.
+    """
+    options = dict(OPERATIONS, engine=engine)
+    state_files = analyzer.load_state(state_path, options)
+    state_files = analyzer.parse_files_incremental(files, state_files, analyzer.ENGINES[engine]['parse_file'], operations=OPERATIONS)
+    analyzer.save_state(state_path, options, state_files)
+
+    partial = analyzer.new_partial()
+    for state_file in state_files.values():
+        analyzer.merge_partials(partial, state_file['partial'])
+    result = {}
+    analyzer.summarize(result, partial, OPERATIONS)
+    return result, state_files
+
+
+@pytest.mark.parametrize('engine', ['regex', 'pandas'])
+def test_append(tmp_path, engine):
+    """Incremental analysis of a growing log file yields the same results as a full analysis.
+    """
+    with open('tests/files/eps/5eps_gaps.txt', 'rb') as f:
+        lines = f.readlines()
+
+    log_file = str(tmp_path / 'access.log')
+    state_path = str(tmp_path / 'state.json')
+
+    # the last line is written only partially at first
+    with open(log_file, 'wb') as f:
+        f.writelines(lines[:20])
+        f.write(lines[20][:10])
+    _, state_files = analyze([log_file], state_path, engine)
+    assert state_files[log_file]['offset'] == sum(len(line) for line in lines[:20])
+
+    with open(log_file, 'ab') as f:
+        f.write(lines[20][10:])
+        f.writelines(lines[21:])
+    result, _ = analyze([log_file], state_path, engine)
+
+    full = analyzer.map_partials(analyzer.ENGINES[engine]['parse_file'], [(log_file, 0, None)], operations=OPERATIONS)
+    expected = {}
+    analyzer.summarize(expected, full, OPERATIONS)
+    assert result == expected
+
+
+def test_rotation_and_truncation(tmp_path):
+    """Rotated files are recognized by their inode and truncated files are analyzed again.
+    """
+    log_file = str(tmp_path / 'access.log')
+    rotated_file = str(tmp_path / 'access.log.1')
+    state_path = str(tmp_path / 'state.json')
+
+    shutil.copy('tests/files/eps/5eps.txt', log_file)
+    first, _ = analyze([log_file], state_path, 'regex')
+
+    # rotate the file, the rotated file keeps its state
+    os.rename(log_file, rotated_file)
+    shutil.copy('tests/files/eps/1eps.txt', log_file)
+    _, state_files = analyze([rotated_file, log_file], state_path, 'regex')
+    assert state_files[rotated_file]['partial']['events'] == first['events']['count']
+    assert state_files[log_file]['partial']['events'] == 3
+
+    # truncate the file and write a different log into it
+    shutil.copy('tests/files/eps/5eps.txt', log_file)
+    _, state_files = analyze([log_file], state_path, 'regex')
+    assert state_files[log_file]['partial']['events'] == 15
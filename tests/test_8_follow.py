@@ -0,0 +1,89 @@
+import analyzer
+import os
+import sys
+import json
+import time
+import threading
+import logging
+import urllib.request
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+OPERATIONS = {'mfip': False, 'lfip': False, 'eps': True, 'count_bytes': True, 'exclude_header_sizes': False}
+
+
+def wait_for(condition, timeout=10):
+    """Wait until a condition is met.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def read_json(path):
+    """Read a JSON file if it exists.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_follow(tmp_path):
+    """Following a growing log file keeps the results of truncated files and rewrites the output file.
+    """
+    with open('tests/files/eps/5eps.txt', 'rb') as f:
+        lines = f.readlines()
+
+    log_file = tmp_path / 'access.log'
+    output_file = tmp_path / 'output.json'
+    log_file.write_bytes(b''.join(lines[:5]))
+
+    stop = threading.Event()
+    discover = lambda: analyzer.get_files_from_paths([str(tmp_path)], pattern_filter=analyzer.re.compile(r'\.log$'))
+    thread = threading.Thread(target=analyzer.follow_files, args=(discover, 'regex', OPERATIONS), kwargs={'interval': 0.1, 'output_file_path': output_file, 'stop': stop})
+    thread.start()
+
+    try:
+        assert wait_for(lambda: (read_json(output_file) or {}).get('events', {}).get('count') == 5)
+
+        with open(log_file, 'ab') as f:
+            f.writelines(lines[5:])
+        assert wait_for(lambda: read_json(output_file)['events']['count'] == 15)
+
+        # copytruncate log rotation, already analyzed data are kept
+        log_file.write_bytes(b''.join(lines[:3]))
+        assert wait_for(lambda: read_json(output_file)['events']['count'] == 18)
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_http(tmp_path):
+    """Snapshots of the results are served over HTTP.
+    """
+    log_file = tmp_path / 'access.log'
+    log_file.write_bytes(open('tests/files/eps/5eps.txt', 'rb').read())
+
+    server = analyzer.start_http_server('127.0.0.1:0')
+    url = f'http://127.0.0.1:{server.server_address[1]}/'
+
+    stop = threading.Event()
+    thread = threading.Thread(target=analyzer.follow_files, args=(lambda: [str(log_file)], 'regex', OPERATIONS), kwargs={'interval': 0.1, 'http_server': server, 'stop': stop})
+    thread.start()
+
+    try:
+        assert wait_for(lambda: server.snapshot is not None)
+        with urllib.request.urlopen(url) as response:
+            assert json.load(response) == analyzer.parse_files('regex', [str(log_file)], {'eps': True, 'count_bytes': True})
+    finally:
+        stop.set()
+        thread.join()
+        server.shutdown()
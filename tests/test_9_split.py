@@ -0,0 +1,83 @@
+import analyzer
+import os
+import sys
+import logging
+import numpy
+import pytest
+
+sys.path.append(os.path.abspath('.'))
+
+# global variables
+logger = None
+analyzer.init_logger(logging.DEBUG)
+
+
+@pytest.mark.parametrize('engine', ['split', 'numpy'])
+@pytest.mark.parametrize('path', ['tests/files/eps/1eps.txt', 'tests/files/eps/5eps.txt', 'tests/files/eps/5eps_gaps.txt', 'tests/files/compressed/5eps_gaps.txt.gz'])
+def test_same_as_regex(engine, path):
+    """Analysis by splitting lines and with NumPy yields the same results as the regex analysis.
+    """
+    files = analyzer.get_files_from_paths([path])
+    assert analyzer.parse_files(engine, files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}) == analyzer.parse_files('regex', files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True})
+
+
+@pytest.mark.parametrize('engine', ['split', 'numpy'])
+def test_malformed_lines(tmp_path, engine):
+    """Merged, short and indented lines are handled the same way as by the regex analysis.
+    """
+    log_file = tmp_path / 'access.log'
+    log_file.write_bytes(
+        b'1579776202.5     25 127.0.0.1 TCP_MISS/200 509 GET http://a.com/ - HIER_DIRECT/23.203.248.25 text/plain\r\n'
+        b'1579776203 16 10.0.0.1 TCP_TUNNEL/200 39 CONNECT b.com:443 - HIER_DIRECT/52.85.43.247 -1579776204 263 10.0.0.2 TCP_MISS/200 948 POST http://c.com/ - HIER_DIRECT/117.18.237.29 application/ocsp-response\n'
+        b'1579776205 16 10.0.0.3 TCP_TUNNEL/200 39 CONNECT b.com:443 - HIER_DIRECT/52.85.43.247\n'
+        b' 1579776206 16 10.0.0.4 TCP_TUNNEL/200 -1 CONNECT b.com:443 - HIER_DIRECT/52.85.43.247 -\n'
+        b'\n'
+        b'1579776207\t-1\t10.0.0.1\tTCP_TUNNEL/200\t-1\tCONNECT\tb.com:443\t-\tHIER_DIRECT/52.85.43.247\t-'
+    )
+
+    files = [str(log_file)]
+    expected = analyzer.parse_files('regex', files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True})
+    assert expected['events']['count'] == 3
+    assert analyzer.parse_files(engine, files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}) == expected
+
+
+@pytest.mark.parametrize('engine', ['split', 'numpy'])
+def test_invalid_numbers(tmp_path, engine):
+    """Lines with invalid numbers are skipped the same way as by the regex analysis.
+    """
+    log_file = tmp_path / 'access.log'
+    log_file.write_bytes(
+        b'1579776202.5 25 127.0.0.1 TCP_MISS/200 509 GET http://a.com/ - HIER_DIRECT/23.203.248.25 text/plain\n'
+        b'abc 25 10.0.0.1 TCP_MISS/200 509 GET http://a.com/ - HIER_DIRECT/23.203.248.25 text/plain\n'
+        b'1579776203 2x5 10.0.0.2 TCP_MISS/200 509 GET http://a.com/ - HIER_DIRECT/23.203.248.25 text/plain\n'
+        b'1579776204 25 10.0.0.3 TCP_MISS/200 - GET http://a.com/ - HIER_DIRECT/23.203.248.25 text/plain\n'
+        b'1579776206 -1 127.0.0.1 TCP_MISS/200 10 GET http://a.com/ - HIER_DIRECT/23.203.248.25 text/plain\n'
+    )
+
+    files = [str(log_file)]
+    operations = {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}
+    expected = analyzer.parse_files('regex', files, operations)
+    assert expected['events']['count'] == 2
+    assert analyzer.parse_files(engine, files, operations) == expected
+
+
+def test_parse_integers_numpy():
+    """Invalid integers are masked instead of failing the whole block.
+    """
+    data = numpy.frombuffer(b'12 -3 4.5 x 1-2 - 1234567890123456789', dtype=numpy.uint8)
+    starts = numpy.array([0, 3, 6, 10, 12, 16, 18])
+    ends = numpy.array([2, 5, 9, 11, 15, 17, 37])
+
+    values, valid = analyzer.parse_integers_numpy(numpy, data, starts, ends, fraction=True)
+    assert valid.tolist() == [True, True, True, False, False, False, False]
+    assert values.tolist() == [12, -3, 4, 0, 0, 0, 0]
+
+
+def test_numpy_blocks(monkeypatch):
+    """Analysis with NumPy yields the same results for any block size, also when the tables of IP addresses of blocks are merged.
+    """
+    monkeypatch.setattr(analyzer, 'IP_BATCH', 2)
+    files = analyzer.get_files_from_paths(['tests/files/eps'])
+    expected = analyzer.parse_files('regex', files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True})
+    for block_size in [1, 100, 1000]:
+        assert analyzer.parse_files('numpy', files, {'mfip': True, 'lfip': True, 'eps': True, 'count_bytes': True}, block_size=block_size) == expected